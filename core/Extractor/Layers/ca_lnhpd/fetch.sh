@@ -111,8 +111,13 @@ if [[ "$WITH_INGREDIENTS" != "false" ]]; then
       exit 1
     }
 
+  # 下載完成後已壓縮，實際檔名以 latest-ingredients.jsonl 連結為準
+  if [[ -L "$RAW_DIR/latest-ingredients.jsonl" ]]; then
+    INGREDIENTS_JSONL="$(readlink -f "$RAW_DIR/latest-ingredients.jsonl")"
+  fi
+
   if [[ -f "$INGREDIENTS_JSONL" ]]; then
-    INGREDIENTS_COUNT="$(wc -l < "$INGREDIENTS_JSONL" | tr -d ' ')"
+    INGREDIENTS_COUNT="$(jsonl_count "$INGREDIENTS_JSONL")"
     echo "✅ 成分：${INGREDIENTS_COUNT} 筆"
   fi
 fi
@@ -124,7 +129,7 @@ DELTA_COUNT="$PRODUCT_COUNT"
 if [[ "$FULL_UPDATE" == "false" ]] && [[ -L "$LATEST_LINK" ]] && [[ -f "$LATEST_LINK" ]]; then
   PREV_JSONL="$(readlink -f "$LATEST_LINK")"
 
-  if [[ "$PREV_JSONL" != "$PRODUCT_JSONL" ]] && [[ -f "$PREV_JSONL" ]]; then
+  if [[ "$PREV_JSONL" != "$PRODUCT_JSONL" ]] && [[ "$PREV_JSONL" != "$PRODUCT_JSONL.zst" ]] && [[ -f "$PREV_JSONL" ]]; then
     echo ""
     echo "🔍 比對差異（與上次擷取比較）..."
     echo "   舊檔：$PREV_JSONL"
@@ -158,7 +163,13 @@ else
   fi
 fi
 
-# === 步驟三：更新符號連結 ===
+# === 步驟三：壓縮快照（.jsonl.zst）並更新符號連結 ===
+COMPRESSED_JSONL="$(jsonl_compress "$PRODUCT_JSONL")"
+if [[ "$OUTPUT_JSONL" == "$PRODUCT_JSONL" ]]; then
+  OUTPUT_JSONL="$COMPRESSED_JSONL"
+fi
+PRODUCT_JSONL="$COMPRESSED_JSONL"
+
 ln -sf "$PRODUCT_JSONL" "$LATEST_LINK"
 echo "🔗 更新 latest.jsonl → $(basename "$PRODUCT_JSONL")"
 
@@ -195,57 +195,40 @@ while [[ $batch_start -lt $total_files ]]; do
 
   echo "需處理：${#indices_to_process[@]} 個檔案"
 
-  # === Phase 3: 提取文本與 metadata ===
+  # === Phase 3: 提取文本與 metadata（每個檔案只讀一次，整批輸出）===
   tmp_texts_file="$(mktemp)"
-  declare -a process_metadata=()
-
-  jq -n '[]' > "$tmp_texts_file"
-
+  tmp_metadata_file="$(mktemp)"
+  declare -a process_files=()
   for idx in "${indices_to_process[@]}"; do
-    file="${batch_files[$idx]}"
-    SOURCE_ID="$(sed -n 's/^source_id: *"\{0,1\}\([^"]*\)"\{0,1\} *$/\1/p' "$file" | head -1)"
-    DRUG="$(sed -n 's/^drug: *"\{0,1\}\([^"]*\)"\{0,1\} *$/\1/p' "$file" | head -1)"
-    FOOD="$(sed -n 's/^food: *"\{0,1\}\([^"]*\)"\{0,1\} *$/\1/p' "$file" | head -1)"
-    FOOD_CATEGORY="$(sed -n 's/^food_category: *"\{0,1\}\([^"]*\)"\{0,1\} *$/\1/p' "$file" | head -1)"
-    EFFECT_TYPE="$(sed -n 's/^effect_type: *"\{0,1\}\([^"]*\)"\{0,1\} *$/\1/p' "$file" | head -1)"
-    SEVERITY="$(sed -n 's/^severity: *"\{0,1\}\([^"]*\)"\{0,1\} *$/\1/p' "$file" | head -1)"
-    SOURCE_URL="$(sed -n 's/^source_url: *"\{0,1\}\([^"]*\)"\{0,1\} *$/\1/p' "$file" | head -1)"
-    PUB_DATE="$(sed -n 's/^pub_date: *"\{0,1\}\([^"]*\)"\{0,1\} *$/\1/p' "$file" | head -1)"
-    FETCHED_AT="$(sed -n 's/^fetched_at: *"\{0,1\}\([^"]*\)"\{0,1\} *$/\1/p' "$file" | head -1)"
-
-    BODY_TEXT="$(sed -n '/^---$/,/^---$/!p' "$file" | head -500)"
-
-    jq --arg text "$BODY_TEXT" '. += [$text]' "$tmp_texts_file" > "${tmp_texts_file}.tmp"
-    mv "${tmp_texts_file}.tmp" "$tmp_texts_file"
-
-    METADATA="$(jq -nc \
-      --arg source_id "$SOURCE_ID" \
-      --arg drug "$DRUG" \
-      --arg food "$FOOD" \
-      --arg food_category "$FOOD_CATEGORY" \
-      --arg effect_type "$EFFECT_TYPE" \
-      --arg severity "$SEVERITY" \
-      --arg source_url "$SOURCE_URL" \
-      --arg pub_date "$PUB_DATE" \
-      --arg fetched_at "$FETCHED_AT" \
-      '{
-        source_id: $source_id,
-        source_layer: "dfi",
-        interaction_type: "DFI",
-        source_url: $source_url,
-        market: "global",
-        drug: $drug,
-        food: $food,
-        food_category: $food_category,
-        effect_type: $effect_type,
-        severity: $severity,
-        date_entered: $pub_date,
-        fetched_at: $fetched_at
-      }'
-    )"
-    process_metadata+=("$METADATA")
+    process_files+=("${batch_files[$idx]}")
   done
 
+  if ! python3 "$PROJECT_ROOT/scripts/embed_payload.py" \
+    --texts "$tmp_texts_file" --metadata "$tmp_metadata_file" \
+    --meta source_id \
+    --meta source_layer=:dfi \
+    --meta interaction_type=:DFI \
+    --meta source_url \
+    --meta market=:global \
+    --meta drug \
+    --meta food \
+    --meta food_category \
+    --meta effect_type \
+    --meta severity \
+    --meta date_entered=pub_date \
+    --meta fetched_at \
+    "${process_files[@]}"; then
+    echo "❌ 產生 embedding 輸入失敗，本批次計入錯誤" >&2
+    ((ERRORS+=${#indices_to_process[@]})) || true
+    rm -f "$tmp_texts_file" "$tmp_metadata_file"
+    batch_start=$batch_end
+    continue
+  fi
+
+  declare -a process_metadata=()  # 儲存 metadata JSON strings（單行）
+  mapfile -t process_metadata < "$tmp_metadata_file"
+  rm -f "$tmp_metadata_file"
+
   # === Phase 4: 批次 embedding ===
   echo "產生 embeddings..."
   tmp_embeddings_file="$(mktemp)"
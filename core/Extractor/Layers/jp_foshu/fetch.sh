@@ -134,6 +134,9 @@ print(count)
 PYEOF
 )
 
+# === 壓縮快照（.jsonl.zst）===
+OUTPUT_JSONL="$(jsonl_compress "$OUTPUT_JSONL")"
+
 # === 更新 .last_fetch ===
 echo "$TODAY" > "$LAST_FETCH_FILE"
 
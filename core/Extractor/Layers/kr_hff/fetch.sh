@@ -6,7 +6,9 @@
 #   ./fetch.sh              # 增量更新（比對差異，只處理變更）
 #   ./fetch.sh --full       # 全量更新（處理所有產品）
 #   ./fetch.sh --limit 100  # 限制筆數（測試用）
-#   ./fetch.sh --resume     # 續傳模式（從既有 JSONL 繼續）
+#   ./fetch.sh --resume     # 續傳模式（沿用已完成的分頁，只下載缺少的頁面）
+#   ./fetch.sh --rps 3      # 每秒請求數上限（預設 5，亦可設定 MFDS_RPS）
+#   ./fetch.sh --workers 4  # 同時下載的頁數（預設 8）
 #
 # 需要 .env 設定：
 #   MFDS_API_KEY=...  (data.go.kr 服務金鑰)
@@ -45,6 +47,8 @@ parse_args "$@"
 arg_optional "limit" FETCH_LIMIT "0"
 arg_optional "full" FULL_UPDATE "false"
 arg_optional "resume" RESUME_MODE "false"
+arg_optional "rps" FETCH_RPS "${MFDS_RPS:-5}"
+arg_optional "workers" FETCH_WORKERS "8"
 
 TODAY="$(date +%Y-%m-%d)"
 OUTPUT_JSONL="$RAW_DIR/hff-${TODAY}.jsonl"
@@ -65,95 +69,28 @@ fi
 if [[ "$FETCH_LIMIT" -gt 0 ]]; then
   echo "   限制：${FETCH_LIMIT} 筆（測試用）"
 fi
+echo "   並行：${FETCH_WORKERS} 個連線，每秒最多 ${FETCH_RPS} 次請求"
 echo "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
 
 # === 分頁擷取 ===
-# 檢查是否有既有資料，支援續傳
-if [[ "$RESUME_MODE" != "false" ]] && [[ -f "$OUTPUT_JSONL" ]] && [[ -s "$OUTPUT_JSONL" ]]; then
-  EXISTING_LINES="$(wc -l < "$OUTPUT_JSONL" | tr -d ' ')"
-  FETCHED=$EXISTING_LINES
-  PAGE=$(( (EXISTING_LINES / PAGE_SIZE) + 1 ))
-  echo ""
-  echo "📎 續傳模式：偵測到既有資料 ${EXISTING_LINES} 筆，從第 ${PAGE} 頁繼續" >&2
-else
-  > "$OUTPUT_JSONL"
-  PAGE=1
-  FETCHED=0
-fi
-TOTAL=-1
-
+# 第 1 頁取得總筆數後，其餘頁面平行下載（共用每秒請求數上限），
+# 各頁寫入分頁檔後依序組合；續傳模式沿用已完成的分頁檔
 echo ""
 echo "📥 開始分頁擷取..."
 
-while true; do
-  TMP_PAGE="$(mktemp)"
-
-  FETCH_URL="${MFDS_API_BASE}?serviceKey=${MFDS_API_KEY}&pageNo=${PAGE}&numOfRows=${PAGE_SIZE}&type=json"
-
-  # 重試邏輯
-  MAX_RETRIES=5
-  RETRY_OK=false
-
-  for ((retry=1; retry<=MAX_RETRIES; retry++)); do
-    if curl -sS -L \
-      -H "User-Agent: SupplementProductIntelligence/1.0" \
-      --connect-timeout 30 \
-      --max-time 120 \
-      -o "$TMP_PAGE" \
-      "$FETCH_URL" 2>/dev/null; then
-
-      # 檢查回應是否為有效 JSON
-      if jq -e . < "$TMP_PAGE" >/dev/null 2>&1; then
-        RETRY_OK=true
-        break
-      else
-        echo "⚠️  第 ${PAGE} 頁回應非 JSON，重試 ${retry}/${MAX_RETRIES}..." >&2
-      fi
-    else
-      echo "⚠️  第 ${PAGE} 頁下載失敗，重試 ${retry}/${MAX_RETRIES}..." >&2
-    fi
-
-    sleep $((retry * 3))  # 遞增延遲：3, 6, 9, 12, 15 秒
-  done
-
-  if [[ "$RETRY_OK" != "true" ]]; then
-    echo "❌ 第 ${PAGE} 頁下載失敗（已重試 ${MAX_RETRIES} 次）" >&2
-    echo "💡 可使用 --resume 參數從目前進度繼續" >&2
-    rm -f "$TMP_PAGE"
-    break
-  fi
-
-  # 第一頁取得總筆數
-  if [[ $TOTAL -lt 0 ]]; then
-    TOTAL="$(jq -r '.body.totalCount // 0' < "$TMP_PAGE" 2>/dev/null)"
-    echo "📊 總筆數: ${TOTAL}" >&2
-  fi
-
-  # 提取 items
-  PAGE_COUNT="$(jq -c '.body.items[]' < "$TMP_PAGE" 2>/dev/null | tee -a "$OUTPUT_JSONL" | wc -l | tr -d ' ')"
-
-  FETCHED=$((FETCHED + PAGE_COUNT))
-  echo "📥 已擷取: ${FETCHED}/${TOTAL} (page=${PAGE})" >&2
-
-  rm -f "$TMP_PAGE"
-
-  # 檢查是否結束
-  if [[ "$PAGE_COUNT" -eq 0 ]] || [[ $FETCHED -ge $TOTAL ]]; then
-    break
-  fi
-
-  # 限量模式
-  if [[ "$FETCH_LIMIT" -gt 0 ]] && [[ $FETCHED -ge $FETCH_LIMIT ]]; then
-    TMP="$(mktemp)"
-    head -n "$FETCH_LIMIT" "$OUTPUT_JSONL" > "$TMP"
-    mv "$TMP" "$OUTPUT_JSONL"
-    FETCHED="$FETCH_LIMIT"
-    break
-  fi
+FETCH_ARGS=(--output "$OUTPUT_JSONL" --rps "$FETCH_RPS" --workers "$FETCH_WORKERS" --page-size "$PAGE_SIZE")
+if [[ "$FETCH_LIMIT" -gt 0 ]]; then
+  FETCH_ARGS+=(--limit "$FETCH_LIMIT")
+fi
+if [[ "$RESUME_MODE" != "false" ]]; then
+  FETCH_ARGS+=(--resume)
+fi
 
-  PAGE=$((PAGE + 1))
-  sleep 1.5
-done
+if ! python3 "$PROJECT_ROOT/scripts/fetch_kr_hff.py" "${FETCH_ARGS[@]}"; then
+  echo "❌ 下載未完成" >&2
+  echo "💡 可使用 --resume 參數從目前進度繼續" >&2
+  exit 1
+fi
 
 FINAL_COUNT="$(wc -l < "$OUTPUT_JSONL" | tr -d ' ')"
 echo ""
@@ -165,7 +102,7 @@ DELTA_COUNT="$FINAL_COUNT"
 if [[ "$FULL_UPDATE" == "false" ]] && [[ -L "$LATEST_LINK" ]] && [[ -f "$LATEST_LINK" ]]; then
   PREV_JSONL="$(readlink -f "$LATEST_LINK")"
 
-  if [[ "$PREV_JSONL" != "$OUTPUT_JSONL" ]] && [[ -f "$PREV_JSONL" ]]; then
+  if [[ "$PREV_JSONL" != "$OUTPUT_JSONL" ]] && [[ "$PREV_JSONL" != "$OUTPUT_JSONL.zst" ]] && [[ -f "$PREV_JSONL" ]]; then
     echo ""
     echo "🔍 比對差異（與上次擷取比較）..."
     echo "   舊檔：$PREV_JSONL"
@@ -198,6 +135,9 @@ else
   fi
 fi
 
+# === 壓縮快照（.jsonl.zst）===
+OUTPUT_JSONL="$(jsonl_compress "$OUTPUT_JSONL")"
+
 # === 更新符號連結 ===
 ln -sf "$OUTPUT_JSONL" "$LATEST_LINK"
 echo "🔗 更新 latest.jsonl → $(basename "$OUTPUT_JSONL")"
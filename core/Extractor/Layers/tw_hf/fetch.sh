@@ -118,6 +118,9 @@ PYEOF
 # 清理暫存檔
 rm -f "$TEMP_JSON"
 
+# === 壓縮快照（.jsonl.zst）===
+OUTPUT_JSONL="$(jsonl_compress "$OUTPUT_JSONL")"
+
 # === 更新 .last_fetch ===
 echo "$TODAY" > "$LAST_FETCH_FILE"
 
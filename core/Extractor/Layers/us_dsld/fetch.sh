@@ -11,6 +11,7 @@
 # 資料來源：
 #   - Bulk Download: https://api.ods.od.nih.gov/dsld/s3/data/DSLD-full-database-JSON.zip
 #   - 完整資料庫約 214,000+ 筆產品
+#   - ZIP 不解壓縮，由 convert_dsld_bulk_to_jsonl.py 直接串流讀取各項目
 
 set -euo pipefail
 
@@ -23,7 +24,6 @@ source "$PROJECT_ROOT/lib/api.sh"
 
 require_cmd jq
 require_cmd python3
-require_cmd unzip
 
 LAYER_NAME="us_dsld"
 RAW_DIR="$PROJECT_ROOT/docs/Extractor/$LAYER_NAME/raw"
@@ -49,7 +49,6 @@ OUTPUT_JSONL="$RAW_DIR/dsld-${TODAY}.jsonl"
 DELTA_DIR="$RAW_DIR/delta-${TODAY}"
 DELTA_JSONL="$DELTA_DIR/delta.jsonl"
 ZIP_FILE="$RAW_DIR/DSLD-full-database-JSON.zip"
-EXTRACT_DIR="$RAW_DIR/DSLD-full-database-JSON"
 
 echo "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
 echo "📡 DSLD 資料擷取"
@@ -94,21 +93,15 @@ else
   # Bulk Download 模式（推薦）
   echo ""
   echo "📥 下載完整資料庫 ZIP..."
-  curl -L -o "$ZIP_FILE" "$DSLD_BULK_URL" --progress-bar
+  curl -fL -o "$ZIP_FILE" "$DSLD_BULK_URL" --progress-bar
 
   echo ""
-  echo "📦 解壓縮..."
-  rm -rf "$EXTRACT_DIR"
-  unzip -q -o "$ZIP_FILE" -d "$RAW_DIR"
-
-  echo ""
-  echo "🔄 轉換為 JSONL 格式..."
+  echo "🔄 轉換為 JSONL 格式（直接讀取 ZIP，不解壓縮）..."
   python3 "$PROJECT_ROOT/scripts/convert_dsld_bulk_to_jsonl.py" \
-    "$EXTRACT_DIR" "$OUTPUT_JSONL"
+    "$ZIP_FILE" "$OUTPUT_JSONL"
 
   echo ""
   echo "🧹 清理暫存檔案..."
-  rm -rf "$EXTRACT_DIR"
   rm -f "$ZIP_FILE"
 fi
 
@@ -121,7 +114,7 @@ DELTA_COUNT="$TOTAL"
 if [[ "$FULL_UPDATE" == "false" ]] && [[ -L "$LATEST_LINK" ]] && [[ -f "$LATEST_LINK" ]]; then
   PREV_JSONL="$(readlink -f "$LATEST_LINK")"
 
-  if [[ "$PREV_JSONL" != "$OUTPUT_JSONL" ]] && [[ -f "$PREV_JSONL" ]]; then
+  if [[ "$PREV_JSONL" != "$OUTPUT_JSONL" ]] && [[ "$PREV_JSONL" != "$OUTPUT_JSONL.zst" ]] && [[ -f "$PREV_JSONL" ]]; then
     echo ""
     echo "🔍 比對差異（與上次擷取比較）..."
     echo "   舊檔：$PREV_JSONL"
@@ -154,6 +147,9 @@ else
   fi
 fi
 
+# === 壓縮快照（.jsonl.zst）===
+OUTPUT_JSONL="$(jsonl_compress "$OUTPUT_JSONL")"
+
 # === 更新符號連結 ===
 ln -sf "$OUTPUT_JSONL" "$LATEST_LINK"
 echo "🔗 更新 latest.jsonl → $(basename "$OUTPUT_JSONL")"
@@ -24,7 +24,7 @@ LAST_UPDATE_FILE="$DOCS_DIR/.last_qdrant_update"
 parse_args "$@"
 arg_optional "full" FULL_MODE "false"
 
-# 確保分類子目錄存在
+# 確保分類子目錄存在（分片配置下的分片目錄由萃取時建立）
 for category in vitamins_minerals botanicals protein_amino probiotics omega_fatty_acids specialty sports_fitness other; do
   mkdir -p "$DOCS_DIR/$category"
 done
@@ -53,8 +53,13 @@ for line in sys.stdin:
 MD_FILES=()
 POSITIONAL_ARGS=("${POSITIONAL_ARGS[@]:-}")
 if [[ ${#POSITIONAL_ARGS[@]} -gt 0 ]]; then
-  # 有傳入檔案清單
-  MD_FILES=("${POSITIONAL_ARGS[@]}")
+  # 有傳入檔案清單（實際路徑，或 category/檔名 邏輯位址，依目錄配置解析）
+  for f in "${POSITIONAL_ARGS[@]}"; do
+    if [[ ! -f "$f" ]] && resolved="$(python3 "$PROJECT_ROOT/scripts/product_layout.py" resolve "$LAYER_NAME" "$f" 2>/dev/null)"; then
+      f="$resolved"
+    fi
+    MD_FILES+=("$f")
+  done
 elif [[ "$FULL_MODE" != "false" ]] || [[ ! -f "$LAST_UPDATE_FILE" ]]; then
   # 全量模式：處理所有檔案
   echo "📂 全量模式：掃描所有 .md 檔案"
@@ -203,58 +208,39 @@ while [[ $batch_start -lt $total_files ]]; do
 
   echo "需處理：${#indices_to_process[@]} 個檔案"
 
-  # === Phase 3: 提取文本與 metadata ===
+  # === Phase 3: 提取文本與 metadata（每個檔案只讀一次，整批輸出）===
   tmp_texts_file="$(mktemp)"
-  declare -a process_metadata=()  # 儲存 metadata JSON strings
-
-  jq -n '[]' > "$tmp_texts_file"  # 初始化為空 array
-
+  tmp_metadata_file="$(mktemp)"
+  declare -a process_files=()
   for idx in "${indices_to_process[@]}"; do
-    file="${batch_files[$idx]}"
-    # 提取 frontmatter 欄位
-    SOURCE_ID="$(sed -n 's/^source_id: *"\{0,1\}\([^"]*\)"\{0,1\} *$/\1/p' "$file" | head -1)"
-    PRODUCT_NAME="$(sed -n 's/^product_name: *"\{0,1\}\([^"]*\)"\{0,1\} *$/\1/p' "$file" | head -1)"
-    BRAND="$(sed -n 's/^brand: *"\{0,1\}\([^"]*\)"\{0,1\} *$/\1/p' "$file" | head -1)"
-    CATEGORY="$(sed -n 's/^category: *"\{0,1\}\([^"]*\)"\{0,1\} *$/\1/p' "$file" | head -1)"
-    PRODUCT_FORM="$(sed -n 's/^product_form: *"\{0,1\}\([^"]*\)"\{0,1\} *$/\1/p' "$file" | head -1)"
-    SOURCE_URL="$(sed -n 's/^source_url: *"\{0,1\}\([^"]*\)"\{0,1\} *$/\1/p' "$file" | head -1)"
-    DATE_ENTERED="$(sed -n 's/^date_entered: *"\{0,1\}\([^"]*\)"\{0,1\} *$/\1/p' "$file" | head -1)"
-    FETCHED_AT="$(sed -n 's/^fetched_at: *"\{0,1\}\([^"]*\)"\{0,1\} *$/\1/p' "$file" | head -1)"
-
-    # 提取 body text (跳過 frontmatter，取前 500 行)
-    BODY_TEXT="$(sed -n '/^---$/,/^---$/!p' "$file" | head -500)"
-
-    # 將 body text 加入 texts array
-    jq --arg text "$BODY_TEXT" '. += [$text]' "$tmp_texts_file" > "${tmp_texts_file}.tmp"
-    mv "${tmp_texts_file}.tmp" "$tmp_texts_file"
-
-    # 儲存 metadata (使用 -c 產生單行 JSON)
-    METADATA="$(jq -nc \
-      --arg source_id "$SOURCE_ID" \
-      --arg product_name "$PRODUCT_NAME" \
-      --arg brand "$BRAND" \
-      --arg category "$CATEGORY" \
-      --arg product_form "$PRODUCT_FORM" \
-      --arg source_url "$SOURCE_URL" \
-      --arg date_entered "$DATE_ENTERED" \
-      --arg fetched_at "$FETCHED_AT" \
-      '{
-        source_id: $source_id,
-        source_layer: "us_dsld",
-        source_url: $source_url,
-        market: "us",
-        product_name: $product_name,
-        brand: $brand,
-        manufacturer: $brand,
-        category: $category,
-        product_form: $product_form,
-        date_entered: $date_entered,
-        fetched_at: $fetched_at
-      }'
-    )"
-    process_metadata+=("$METADATA")
+    process_files+=("${batch_files[$idx]}")
   done
 
+  if ! python3 "$PROJECT_ROOT/scripts/embed_payload.py" \
+    --texts "$tmp_texts_file" --metadata "$tmp_metadata_file" \
+    --meta source_id \
+    --meta source_layer=:us_dsld \
+    --meta source_url \
+    --meta market=:us \
+    --meta product_name \
+    --meta brand \
+    --meta manufacturer=brand \
+    --meta category \
+    --meta product_form \
+    --meta date_entered \
+    --meta fetched_at \
+    "${process_files[@]}"; then
+    echo "❌ 產生 embedding 輸入失敗，本批次計入錯誤" >&2
+    ((ERRORS+=${#indices_to_process[@]})) || true
+    rm -f "$tmp_texts_file" "$tmp_metadata_file"
+    batch_start=$batch_end
+    continue
+  fi
+
+  declare -a process_metadata=()  # 儲存 metadata JSON strings（單行）
+  mapfile -t process_metadata < "$tmp_metadata_file"
+  rm -f "$tmp_metadata_file"
+
   # === Phase 4: 批次 embedding ===
   echo "產生 embeddings..."
   tmp_embeddings_file="$(mktemp)"
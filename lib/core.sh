@@ -5,6 +5,8 @@
 # 通用輔助函式：
 #   - require_cmd <cmd>  檢查必要指令是否存在，並給出安裝提示
 #   - require_dep <path> 檢查必要檔案是否存在，回傳實際路徑
+#   - jsonl_compress <file> 壓縮原始快照為 .jsonl.zst，回傳壓縮後路徑
+#   - jsonl_count <file>    計算 JSONL 快照行數（支援 .zst）
 #
 # 使用方式（在入口腳本中）：
 #   source ./lib/core.sh
@@ -146,3 +148,14 @@ require_dep() {
   echo "💥 任務停止"
   exit 1
 }
+
+# 壓縮原始快照為 .jsonl.zst，輸出壓縮後路徑
+# （未安裝 zstandard 或 RAW_SNAPSHOT_COMPRESSION=off 時輸出原路徑）
+jsonl_compress() {
+  python3 "$_core_project_root/scripts/jsonl_io.py" compress "$1"
+}
+
+# 計算 JSONL 快照行數（支援 .zst）
+jsonl_count() {
+  python3 "$_core_project_root/scripts/jsonl_io.py" count "$1"
+}
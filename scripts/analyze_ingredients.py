@@ -9,7 +9,8 @@ import re
 from pathlib import Path
 from collections import defaultdict, Counter
 from datetime import datetime
-import yaml
+
+from product_reader import ProductDocument
 
 # Ingredient normalization mapping
 INGREDIENT_MAPPING = {
@@ -162,22 +163,27 @@ def normalize_ingredient(ingredient_raw):
     # Return title-cased original if no mapping found
     return ingredient.title() if ingredient else None
 
+US_INGREDIENT_RE = re.compile(r'-\s*([^(（—]+)')
+KR_BRACKET_RE = re.compile(r'\[([^\]]+)\]')
+KR_SPEC_RE = re.compile(r'[①②③④⑤⑥⑦⑧⑨⑩]\s*([^:：\s]+)\s*[:：]')
+CFU_RE = re.compile(r'\d+\s*(\*|×|x)\s*10\s*\^\s*\d+\s*CFU', re.I)
+
 def extract_ingredients_from_file(filepath):
     """Extract ingredients from a markdown file"""
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
+        doc = ProductDocument.from_file(filepath)
+        if doc is None:
+            return None, None, None
 
         # Check for REVIEW_NEEDED
-        if '[REVIEW_NEEDED]' in content:
+        if '[REVIEW_NEEDED]' in doc.content:
             return None, None, None
 
         # Extract frontmatter
-        match = re.match(r'^---\n(.*?)\n---', content, re.DOTALL)
-        if not match:
+        if not doc.content.startswith('---'):
             return None, None, None
 
-        frontmatter = yaml.safe_load(match.group(1))
+        frontmatter = doc.frontmatter
         category = frontmatter.get('category', 'other')
         market = frontmatter.get('market', 'unknown')
 
@@ -185,109 +191,99 @@ def extract_ingredients_from_file(filepath):
         ingredients = []
 
         # For us_dsld and ca_lnhpd: look for "## 成分"
-        if '## 成分' in content:
-            section_match = re.search(r'## 成分\n(.*?)(?=\n##|\Z)', content, re.DOTALL)
-            if section_match:
-                section = section_match.group(1)
-                # Extract ingredient lines (starting with -)
+        section = doc.ingredients_text
+        if section is not None:
+            # Extract ingredient lines (starting with -)
+            for line in section.split('\n'):
+                line = line.strip()
+                if line.startswith('-'):
+                    # Extract ingredient name (before （ or — symbol)
+                    ingredient_match = US_INGREDIENT_RE.match(line)
+                    if ingredient_match:
+                        ingredient_raw = ingredient_match.group(1).strip()
+                        # Skip placeholder text
+                        if ingredient_raw in ['成分資料需額外擷取', '']:
+                            continue
+                        if '參見' in ingredient_raw or 'API' in ingredient_raw:
+                            continue
+                        # Skip nutritional values that aren't real supplements
+                        skip_items = ['calories', 'calories from fat', 'total fat', 'total carbohydrates',
+                                    'sodium', 'potassium', 'protein', 'dietary fiber', 'sugars', 'cholesterol']
+                        if ingredient_raw.lower() in skip_items:
+                            continue
+                        ingredients.append(ingredient_raw)
+
+        # For jp_foshu, jp_fnfc: look for "## 機能性成分"
+        section = doc.functional_ingredients
+        if section is not None:
+            section = section.strip()
+            # For single ingredient
+            if section and not section.startswith('-'):
+                ingredients.append(section)
+            # For multiple ingredients (list)
+            else:
                 for line in section.split('\n'):
                     line = line.strip()
                     if line.startswith('-'):
-                        # Extract ingredient name (before （ or — symbol)
-                        ingredient_match = re.match(r'-\s*([^(（—]+)', line)
-                        if ingredient_match:
-                            ingredient_raw = ingredient_match.group(1).strip()
-                            # Skip placeholder text
-                            if ingredient_raw in ['成分資料需額外擷取', '']:
-                                continue
-                            if '參見' in ingredient_raw or 'API' in ingredient_raw:
-                                continue
-                            # Skip nutritional values that aren't real supplements
-                            skip_items = ['calories', 'calories from fat', 'total fat', 'total carbohydrates',
-                                        'sodium', 'potassium', 'protein', 'dietary fiber', 'sugars', 'cholesterol']
-                            if ingredient_raw.lower() in skip_items:
-                                continue
-                            ingredients.append(ingredient_raw)
-
-        # For jp_foshu, jp_fnfc: look for "## 機能性成分"
-        if '## 機能性成分' in content:
-            section_match = re.search(r'## 機能性成分\n(.*?)(?=\n##|\Z)', content, re.DOTALL)
-            if section_match:
-                section = section_match.group(1).strip()
-                # For single ingredient
-                if section and not section.startswith('-'):
-                    ingredients.append(section)
-                # For multiple ingredients (list)
-                else:
-                    for line in section.split('\n'):
-                        line = line.strip()
-                        if line.startswith('-'):
-                            ingredient = line.lstrip('-').strip()
-                            if ingredient:
-                                ingredients.append(ingredient)
+                        ingredient = line.lstrip('-').strip()
+                        if ingredient:
+                            ingredients.append(ingredient)
 
         # For kr_hff: extract from "## 主要功能" (Main Function) section
         # Korean products list ingredients in square brackets like [비타민E], [유산균]
-        if market == 'kr' and '## 主要功能' in content:
-            section_match = re.search(r'## 主要功能\n(.*?)(?=\n##|\Z)', content, re.DOTALL)
-            if section_match:
-                section = section_match.group(1)
-                # Extract ingredients in square brackets
-                kr_ingredients = re.findall(r'\[([^\]]+)\]', section)
-                for ing in kr_ingredients:
-                    ing = ing.strip()
-                    if ing:
-                        ingredients.append(ing)
+        section = doc.main_function if market == 'kr' else None
+        if section is not None:
+            # Extract ingredients in square brackets
+            for ing in KR_BRACKET_RE.findall(section):
+                ing = ing.strip()
+                if ing:
+                    ingredients.append(ing)
 
         # Also extract from "## 規格基準" (Specification Standard) for Korean products
-        if market == 'kr' and '## 規格基準' in content:
-            section_match = re.search(r'## 規格基準\n(.*?)(?=\n##|\Z)', content, re.DOTALL)
-            if section_match:
-                section = section_match.group(1)
-                # Extract ingredients from lines like "② 비타민B1 : 표시량의..."
-                spec_ingredients = re.findall(r'[①②③④⑤⑥⑦⑧⑨⑩]\s*([^:：\s]+)\s*[:：]', section)
-                for ing in spec_ingredients:
-                    ing = ing.strip()
-                    # Skip non-ingredient items
-                    if ing not in ['성상', '헥산', '납', '카드뮴', '수은', '비소', '대장균군', '붕해', '붕해시험',
-                                   '세균수', '대장균', '황색포도상구균', '살모넬라', '아플라톡신']:
-                        if ing not in ingredients:  # Avoid duplicates
-                            ingredients.append(ing)
+        section = doc.specification if market == 'kr' else None
+        if section is not None:
+            # Extract ingredients from lines like "② 비타민B1 : 표시량의..."
+            for ing in KR_SPEC_RE.findall(section):
+                ing = ing.strip()
+                # Skip non-ingredient items
+                if ing not in ['성상', '헥산', '납', '카드뮴', '수은', '비소', '대장균군', '붕해', '붕해시험',
+                               '세균수', '대장균', '황색포도상구균', '살모넬라', '아플라톡신']:
+                    if ing not in ingredients:  # Avoid duplicates
+                        ingredients.append(ing)
 
         # For tw_hf: look for "## 保健功效成分"
-        if market == 'tw' and '## 保健功效成分' in content:
-            section_match = re.search(r'## 保健功效成分\n(.*?)(?=\n##|\Z)', content, re.DOTALL)
-            if section_match:
-                section = section_match.group(1).strip()
-                if section and section != '（無資料）':
-                    # Taiwan health food ingredient format is usually plain text
-                    # Look for common keywords and extract them
-                    tw_keywords = {
-                        "紅麴": "Red Yeast Rice", "monacolin": "Monacolin K",
-                        "魚油": "Fish Oil", "DHA": "DHA", "EPA": "EPA",
-                        "葉黃素": "Lutein", "玉米黃素": "Zeaxanthin",
-                        "益生菌": "Probiotics", "乳酸菌": "Lactobacillus",
-                        "雙歧桿菌": "Bifidobacterium", "比菲德氏菌": "Bifidobacterium",
-                        "雷特氏B菌": "Bifidobacterium",
-                        "膳食纖維": "Dietary Fiber", "難消化性麥芽糊精": "Indigestible Dextrin",
-                        "茶多酚": "Tea Polyphenols", "兒茶素": "Catechins",
-                        "鈣": "Calcium", "鐵": "Iron", "鋅": "Zinc",
-                        "維生素": "Vitamins (General)", "維他命": "Vitamins (General)",
-                        "葡萄糖胺": "Glucosamine", "膠原蛋白": "Collagen",
-                        "大豆異黃酮": "Isoflavone", "輔酵素Q10": "Coenzyme Q10",
-                        "牛磺酸": "Taurine", "精胺酸": "Arginine",
-                        "綠茶萃取": "Green Tea Extract", "薑黃": "Turmeric",
-                        "人參": "Ginseng", "靈芝": "Reishi",
-                        "納豆激酶": "Nattokinase", "卵磷脂": "Lecithin",
-                    }
-                    for kw, std in tw_keywords.items():
-                        if kw.lower() in section.lower():
-                            if std not in ingredients:
-                                ingredients.append(std)
-                    # Also check for CFU counts (probiotics)
-                    if re.search(r'\d+\s*(\*|×|x)\s*10\s*\^\s*\d+\s*CFU', section, re.I):
-                        if "Probiotics" not in ingredients:
-                            ingredients.append("Probiotics")
+        section = doc.health_ingredients if market == 'tw' else None
+        if section is not None:
+            section = section.strip()
+            if section and section != '（無資料）':
+                # Taiwan health food ingredient format is usually plain text
+                # Look for common keywords and extract them
+                tw_keywords = {
+                    "紅麴": "Red Yeast Rice", "monacolin": "Monacolin K",
+                    "魚油": "Fish Oil", "DHA": "DHA", "EPA": "EPA",
+                    "葉黃素": "Lutein", "玉米黃素": "Zeaxanthin",
+                    "益生菌": "Probiotics", "乳酸菌": "Lactobacillus",
+                    "雙歧桿菌": "Bifidobacterium", "比菲德氏菌": "Bifidobacterium",
+                    "雷特氏B菌": "Bifidobacterium",
+                    "膳食纖維": "Dietary Fiber", "難消化性麥芽糊精": "Indigestible Dextrin",
+                    "茶多酚": "Tea Polyphenols", "兒茶素": "Catechins",
+                    "鈣": "Calcium", "鐵": "Iron", "鋅": "Zinc",
+                    "維生素": "Vitamins (General)", "維他命": "Vitamins (General)",
+                    "葡萄糖胺": "Glucosamine", "膠原蛋白": "Collagen",
+                    "大豆異黃酮": "Isoflavone", "輔酵素Q10": "Coenzyme Q10",
+                    "牛磺酸": "Taurine", "精胺酸": "Arginine",
+                    "綠茶萃取": "Green Tea Extract", "薑黃": "Turmeric",
+                    "人參": "Ginseng", "靈芝": "Reishi",
+                    "納豆激酶": "Nattokinase", "卵磷脂": "Lecithin",
+                }
+                for kw, std in tw_keywords.items():
+                    if kw.lower() in section.lower():
+                        if std not in ingredients:
+                            ingredients.append(std)
+                # Also check for CFU counts (probiotics)
+                if CFU_RE.search(section):
+                    if "Probiotics" not in ingredients:
+                        ingredients.append("Probiotics")
 
         return ingredients, category, market
 
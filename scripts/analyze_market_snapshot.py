@@ -11,6 +11,8 @@ from datetime import datetime, timedelta
 from collections import defaultdict
 import json
 
+from product_layout import iter_category_files
+
 # Define category mapping
 CATEGORIES = [
     'vitamins_minerals',
@@ -63,7 +65,7 @@ def count_products(base_path, layer, start_date, end_date):
         category = category_dir.name
 
         # Count .md files in this category
-        for md_file in category_dir.glob('*.md'):
+        for md_file in iter_category_files(category_dir):
             try:
                 content = md_file.read_text(encoding='utf-8')
 
@@ -117,7 +119,7 @@ def get_sample_products(base_path, layer, count=3):
         if not category_dir.is_dir() or len(samples) >= count:
             break
 
-        for md_file in list(category_dir.glob('*.md'))[:2]:
+        for md_file in list(iter_category_files(category_dir))[:2]:
             if len(samples) >= count:
                 break
 
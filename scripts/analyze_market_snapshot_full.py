@@ -11,6 +11,8 @@ from datetime import datetime
 from collections import defaultdict
 import json
 
+from product_layout import iter_category_files
+
 # Define category mapping
 CATEGORIES = [
     'vitamins_minerals',
@@ -48,7 +50,7 @@ def count_all_products(base_path, layer):
         category = category_dir.name
 
         # Count .md files in this category
-        for md_file in category_dir.glob('*.md'):
+        for md_file in iter_category_files(category_dir):
             try:
                 content = md_file.read_text(encoding='utf-8')
 
@@ -79,7 +81,7 @@ def get_sample_products(base_path, layer, count=3):
         if not category_dir.is_dir() or len(samples) >= count:
             break
 
-        for md_file in list(category_dir.glob('*.md'))[:2]:
+        for md_file in list(iter_category_files(category_dir))[:2]:
             if len(samples) >= count:
                 break
 
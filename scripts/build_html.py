@@ -34,10 +34,8 @@ except ImportError:
     print("Error: 'jinja2' package not found. Install with: pip install jinja2")
     sys.exit(1)
 
-try:
-    import yaml
-except ImportError:
-    yaml = None  # YAML frontmatter is optional
+# YAML frontmatter is optional (frontmatter.py falls back to yaml when installed)
+from frontmatter import load_frontmatter
 
 
 # =========================================
@@ -107,11 +105,7 @@ class MarkdownProcessor:
         if text.startswith('---'):
             parts = text.split('---', 2)
             if len(parts) >= 3:
-                if yaml:
-                    try:
-                        frontmatter = yaml.safe_load(parts[1]) or {}
-                    except yaml.YAMLError:
-                        pass
+                frontmatter = load_frontmatter(parts[1])
                 content = parts[2].strip()
 
         # Convert markdown
@@ -3,17 +3,19 @@
 import os, re, json
 from collections import Counter, defaultdict
 
+from product_reader import ProductDocument
+
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 EXTRACTOR_DIR = os.path.join(BASE_DIR, "docs/Extractor")
 
 # Ingredient section headers per layer
 INGREDIENT_SECTIONS = {
-    "us_dsld": "## 成分",
-    "ca_lnhpd": "## 成分",
-    "kr_hff": "## 主要功能",
-    "jp_foshu": "## 機能性成分",
-    "jp_fnfc": "## 機能性成分",
-    "tw_hf": "## 保健功效成分",
+    "us_dsld": "成分",
+    "ca_lnhpd": "成分",
+    "kr_hff": "主要功能",
+    "jp_foshu": "機能性成分",
+    "jp_fnfc": "機能性成分",
+    "tw_hf": "保健功效成分",
 }
 
 # Synonym mapping for standardization (from ingredient_radar CLAUDE.md)
@@ -154,24 +156,6 @@ def extract_ingredients_tw(section_text):
             ingredients.append("Probiotics")
     return ingredients if ingredients else []
 
-def extract_section(content, section_header):
-    """Extract content of a markdown section."""
-    lines = content.split("\n")
-    in_section = False
-    section_lines = []
-    for line in lines:
-        if line.strip() == section_header:
-            in_section = True
-            continue
-        if in_section:
-            if line.startswith("## ") and line.strip() != section_header:
-                break
-            section_lines.append(line)
-    return "\n".join(section_lines)
-
-def is_review_needed(content):
-    return content.strip().startswith("[REVIEW_NEEDED]")
-
 def get_category_from_path(filepath):
     parts = filepath.split(os.sep)
     for i, p in enumerate(parts):
@@ -202,20 +186,18 @@ def process():
                 if not fname.endswith(".md"):
                     continue
                 filepath = os.path.join(root, fname)
-                try:
-                    with open(filepath, "r", encoding="utf-8") as f:
-                        content = f.read()
-                except:
+                doc = ProductDocument.from_file(filepath)
+                if doc is None:
                     continue
 
                 total_products[layer] += 1
 
-                if is_review_needed(content):
+                if doc.review_needed:
                     review_needed[layer] += 1
                     continue
 
                 category = get_category_from_path(filepath)
-                section = extract_section(content, section_header)
+                section = doc.section(section_header) or ""
 
                 if layer in ("us_dsld", "ca_lnhpd"):
                     ingredients = extract_ingredients_us_dsld(section)
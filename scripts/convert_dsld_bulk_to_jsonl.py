@@ -2,14 +2,41 @@
 """
 將 DSLD 完整資料庫的個別 JSON 檔案轉換為萃取腳本所需的 JSONL 格式
 
+來源可為 Bulk Download 的 ZIP 檔或已解壓縮的目錄。ZIP 不需解壓縮：
+各工作行程直接從壓縮檔讀取項目，免去約 21 萬個暫存小檔。項目依產品 ID
+排序後分批交給多個行程轉換，結果經有上限的重排緩衝區依批次順序寫出，
+輸出順序與行程數無關。
+
+有 orjson 時以其解析 JSON（輸出仍使用標準 json，格式與行程數、
+解析後端皆無關）。
+
 用法：
-  python3 convert_dsld_bulk_to_jsonl.py <json_dir> <output.jsonl>
-  python3 convert_dsld_bulk_to_jsonl.py DSLD-full-database-JSON dsld-full-2026-02-04.jsonl
+  python3 convert_dsld_bulk_to_jsonl.py <zip|json_dir> <output.jsonl>
+  python3 convert_dsld_bulk_to_jsonl.py DSLD-full-database-JSON.zip dsld-full-2026-02-04.jsonl
+  python3 convert_dsld_bulk_to_jsonl.py DSLD-full-database-JSON dsld-full.jsonl --jobs 8
 """
+import argparse
 import json
 import os
 import sys
-from pathlib import Path
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path, PurePosixPath
+
+try:
+    import orjson
+    json_loads = orjson.loads
+    JSON_BACKEND = "orjson"
+except ImportError:
+    json_loads = json.loads
+    JSON_BACKEND = "json"
+
+
+# 每批項目數
+DEFAULT_BATCH_SIZE = 500
+
+# 進度回報間隔（筆）
+PROGRESS_INTERVAL = 10000
 
 
 def convert_ingredient_rows_to_all_ingredients(ingredient_rows):
@@ -73,46 +100,161 @@ def convert_single_json(json_data):
     return converted
 
 
-def main():
-    if len(sys.argv) < 3:
-        print("用法: python3 convert_dsld_bulk_to_jsonl.py <json_dir> <output.jsonl>")
-        print("範例: python3 convert_dsld_bulk_to_jsonl.py DSLD-full-database-JSON dsld-full.jsonl")
-        sys.exit(1)
+def entry_sort_key(name: str):
+    """依產品 ID（檔名數字）排序；非數字檔名排在後面"""
+    stem = PurePosixPath(name).stem
+    return (0, int(stem), name) if stem.isdigit() else (1, 0, name)
 
-    json_dir = Path(sys.argv[1])
-    output_file = Path(sys.argv[2])
 
-    if not json_dir.is_dir():
-        print(f"❌ 目錄不存在: {json_dir}", file=sys.stderr)
-        sys.exit(1)
+def list_entries(source: Path) -> list[str]:
+    """列出來源中的 JSON 項目（ZIP 內路徑或目錄內檔名），依產品 ID 排序"""
+    if source.is_dir():
+        names = [
+            entry.name for entry in os.scandir(source)
+            if entry.name.endswith(".json") and entry.is_file()
+        ]
+    else:
+        with zipfile.ZipFile(source) as zf:
+            names = [
+                info.filename for info in zf.infolist()
+                if not info.is_dir()
+                and info.filename.endswith(".json")
+                and not info.filename.startswith("__MACOSX/")
+                and not PurePosixPath(info.filename).name.startswith("._")
+            ]
+    return sorted(names, key=entry_sort_key)
 
-    json_files = list(json_dir.glob("*.json"))
-    total = len(json_files)
 
-    print(f"📂 來源目錄：{json_dir}")
-    print(f"📄 JSON 檔案數：{total}")
-    print(f"📝 輸出檔案：{output_file}")
+# 每個工作行程各自開啟一次 ZIP
+_zip_handles = {}
+
+
+def read_entry(source: str, name: str) -> bytes:
+    """讀取單一項目的原始位元組"""
+    if os.path.isdir(source):
+        with open(os.path.join(source, name), "rb") as f:
+            return f.read()
+    zf = _zip_handles.get(source)
+    if zf is None:
+        zf = _zip_handles[source] = zipfile.ZipFile(source)
+    return zf.read(name)
+
+
+def convert_batch(task):
+    """轉換一批項目，回傳 (批次序號, JSONL 文字, 成功筆數, 錯誤訊息)"""
+    index, source, names = task
+    lines = []
+    errors = []
+    for name in names:
+        try:
+            data = json_loads(read_entry(source, name))
+            lines.append(json.dumps(convert_single_json(data), ensure_ascii=False) + "\n")
+        except Exception as e:
+            errors.append(f"{PurePosixPath(name).name}: {e}")
+    return index, "".join(lines), len(lines), errors
+
+
+def iter_results(tasks: list, jobs: int, max_pending: int):
+    """依批次順序產出轉換結果
+
+    最多 max_pending 個批次同時處於執行中或等待寫出，
+    先完成的批次暫存在重排緩衝區，直到前面的批次都已產出。
+    """
+    if jobs <= 1 or len(tasks) <= 1:
+        for task in tasks:
+            yield convert_batch(task)
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        running = set()
+        buffer = {}
+        next_submit = 0
+        next_yield = 0
+        while next_yield < len(tasks):
+            while next_submit < len(tasks) and next_submit - next_yield < max_pending:
+                running.add(executor.submit(convert_batch, tasks[next_submit]))
+                next_submit += 1
+
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                buffer[result[0]] = result
+
+            while next_yield in buffer:
+                yield buffer.pop(next_yield)
+                next_yield += 1
+
+
+def convert(source: Path, output_file: Path, jobs: int = 1,
+            batch_size: int = DEFAULT_BATCH_SIZE) -> tuple[int, int]:
+    """轉換來源為 JSONL（先寫暫存檔再替換），回傳 (成功筆數, 錯誤筆數)"""
+    names = list_entries(source)
+    total = len(names)
+    tasks = [
+        (i, str(source), names[start:start + batch_size])
+        for i, start in enumerate(range(0, total, batch_size))
+    ]
+
+    print(f"📄 JSON 項目數：{total:,}")
+    print(f"⚙️  行程數：{jobs}，每批 {batch_size} 筆，JSON 解析：{JSON_BACKEND}")
     print()
 
     converted = 0
     errors = 0
+    next_report = PROGRESS_INTERVAL
+    tmp_file = output_file.with_name(output_file.name + ".tmp")
+
+    with open(tmp_file, "w", encoding="utf-8") as out:
+        for _, text, count, batch_errors in iter_results(tasks, jobs, max_pending=jobs * 4):
+            out.write(text)
+            converted += count
+            errors += len(batch_errors)
+            for message in batch_errors:
+                print(f"  ⚠️ 錯誤處理 {message}", file=sys.stderr)
 
-    with open(output_file, "w", encoding="utf-8") as out:
-        for i, json_file in enumerate(sorted(json_files), 1):
-            try:
-                with open(json_file, "r", encoding="utf-8") as f:
-                    data = json.load(f)
+            if converted >= next_report:
+                print(f"  進度：{converted:,}/{total:,} ({converted*100/total:.1f}%)")
+                next_report += PROGRESS_INTERVAL
 
-                converted_data = convert_single_json(data)
-                out.write(json.dumps(converted_data, ensure_ascii=False) + "\n")
-                converted += 1
+    os.replace(tmp_file, output_file)
+    return converted, errors
 
-                if converted % 10000 == 0:
-                    print(f"  進度：{converted:,}/{total:,} ({converted*100/total:.1f}%)")
 
-            except Exception as e:
-                print(f"  ⚠️ 錯誤處理 {json_file.name}: {e}", file=sys.stderr)
-                errors += 1
+def main():
+    parser = argparse.ArgumentParser(description="DSLD Bulk JSON 轉換為 JSONL")
+    parser.add_argument("source", help="Bulk Download ZIP 檔或解壓縮後的 JSON 目錄")
+    parser.add_argument("output", help="輸出 JSONL 檔案")
+    parser.add_argument("--jobs", "-j", type=int, default=os.cpu_count() or 1,
+                        help="轉換行程數（預設：CPU 核心數，1 = 單行程）")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"每批項目數（預設：{DEFAULT_BATCH_SIZE}）")
+    args = parser.parse_args()
+
+    source = Path(args.source)
+    output_file = Path(args.output)
+
+    if source.is_dir():
+        source_type = "目錄"
+    elif source.is_file() and zipfile.is_zipfile(source):
+        source_type = "ZIP"
+    else:
+        print(f"❌ 來源不存在或不是 ZIP/目錄: {source}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"📂 來源{source_type}：{source}")
+    print(f"📝 輸出檔案：{output_file}")
+
+    try:
+        converted, errors = convert(source, output_file, jobs=max(1, args.jobs), batch_size=max(1, args.batch_size))
+    except zipfile.BadZipFile as e:
+        print(f"❌ ZIP 檔損毀（下載可能不完整）: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    # 空輸出會讓增量比對把所有產品視為移除，直接中止
+    if converted == 0:
+        output_file.unlink(missing_ok=True)
+        print("❌ 沒有成功轉換任何產品", file=sys.stderr)
+        sys.exit(1)
 
     print()
     print(f"━━━ 轉換完成 ━━━")
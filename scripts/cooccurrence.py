@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+成分共現矩陣
+
+以整數 ID 編碼成分，將每筆產品（或文獻）的成分集合累積為共現矩陣，
+提供兩兩組合的次數、lift 與 PMI 查詢：
+
+- count：同時含 A、B 的筆數
+- lift：count × N / (count(A) × count(B))，>1 表示比獨立出現更常搭配
+- pmi：log2(lift)
+
+依市場、品類分組記錄，查詢時可取任意切片（例如 us × probiotics）。
+有 scipy 時以稀疏矩陣 XᵀX 計算配對次數並以 NumPy 排序，
+否則使用等價的純 Python 計數；兩者結果相同。
+
+用法：
+    from cooccurrence import CooccurrenceEngine
+
+    engine = CooccurrenceEngine()
+    engine.add(["EPA", "DHA"], market="us", category="omega_fatty_acids")
+    matrix = engine.matrix(market="us")
+    matrix.top_pairs(10, metric="lift", min_count=20)
+    matrix.partners("EPA", 5)
+"""
+
+import math
+from collections import Counter
+from itertools import combinations
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:
+    np = None
+    sparse = None  # 使用純 Python 實作
+
+
+METRICS = ("count", "lift", "pmi")
+
+
+class CooccurrenceEngine:
+    """依市場/品類分組累積成分集合"""
+
+    def __init__(self):
+        self.vocab = {}          # 成分 → ID
+        self.names = []          # ID → 成分
+        self._transactions = []  # 每筆的成分 ID（已去重）
+        self._markets = []
+        self._categories = []
+        self._cache = {}
+
+    def __len__(self):
+        return len(self._transactions)
+
+    def add(self, ingredients, market: str = "", category: str = ""):
+        """加入一筆成分集合（重複成分只計一次）"""
+        ids = set()
+        for name in ingredients:
+            if not name:
+                continue
+            item_id = self.vocab.get(name)
+            if item_id is None:
+                item_id = self.vocab[name] = len(self.names)
+                self.names.append(name)
+            ids.add(item_id)
+        self._transactions.append(tuple(sorted(ids)))
+        self._markets.append(market)
+        self._categories.append(category)
+        self._cache.clear()
+
+    def matrix(self, market: str = None, category: str = None) -> "CooccurrenceMatrix":
+        """取得指定市場/品類切片的共現矩陣（None 表示不限）"""
+        key = (market, category)
+        if key not in self._cache:
+            rows = [
+                ids for ids, m, c in zip(self._transactions, self._markets, self._categories)
+                if (market is None or m == market) and (category is None or c == category)
+            ]
+            self._cache[key] = CooccurrenceMatrix(self.names, self.vocab, rows)
+        return self._cache[key]
+
+    @property
+    def markets(self) -> list[str]:
+        return sorted(set(self._markets))
+
+    @property
+    def categories(self) -> list[str]:
+        return sorted(set(self._categories))
+
+
+class CooccurrenceMatrix:
+    """單一切片的成分共現統計（上三角配對）"""
+
+    def __init__(self, names: list[str], vocab: dict, transactions: list[tuple]):
+        # 複製詞彙，之後加入的成分不影響已建立的矩陣
+        self.names = list(names)
+        self.vocab = dict(vocab)
+        self.total = len(transactions)
+        # 依名稱排序的位次：配對方向與同分排序皆以此為準（與 sorted() 一致）
+        order = sorted(range(len(self.names)), key=self.names.__getitem__)
+        self._position = [0] * len(self.names)
+        for pos, item_id in enumerate(order):
+            self._position[item_id] = pos
+
+        if sparse is not None:
+            self._build_sparse(transactions)
+        else:
+            self._build_python(transactions)
+
+    # ------------------------------------------------------------------
+    # 建立
+    # ------------------------------------------------------------------
+
+    def _build_sparse(self, transactions: list[tuple]):
+        size = len(self.names)
+        indptr = np.zeros(len(transactions) + 1, dtype=np.int64)
+        np.cumsum([len(ids) for ids in transactions], out=indptr[1:])
+        indices = np.fromiter((i for ids in transactions for i in ids), dtype=np.int64, count=int(indptr[-1]))
+        data = np.ones(len(indices), dtype=np.int64)
+        x = sparse.csr_matrix((data, indices, indptr), shape=(len(transactions), size))
+
+        self.item_counts = np.asarray(x.sum(axis=0)).ravel()
+        pairs = sparse.triu(x.T @ x, k=1).tocoo()
+        position = np.asarray(self._position, dtype=np.int64)
+        swap = position[pairs.row] > position[pairs.col]
+        self.rows = np.where(swap, pairs.col, pairs.row).astype(np.int64)
+        self.cols = np.where(swap, pairs.row, pairs.col).astype(np.int64)
+        self.counts = pairs.data.astype(np.int64)
+        self._position_array = position
+
+    def _build_python(self, transactions: list[tuple]):
+        item_counts = [0] * len(self.names)
+        pair_counts = Counter()
+        position = self._position
+        for ids in transactions:
+            for i in ids:
+                item_counts[i] += 1
+            if len(ids) > 1:
+                pair_counts.update(combinations(sorted(ids, key=position.__getitem__), 2))
+        self.item_counts = item_counts
+        self.rows = [pair[0] for pair in pair_counts]
+        self.cols = [pair[1] for pair in pair_counts]
+        self.counts = list(pair_counts.values())
+
+    # ------------------------------------------------------------------
+    # 指標
+    # ------------------------------------------------------------------
+
+    def _metric_values(self, metric: str, rows, cols, counts):
+        if metric == "count":
+            return counts
+        if sparse is not None:
+            lift = counts * self.total / (self.item_counts[rows] * self.item_counts[cols])
+            return np.log2(lift) if metric == "pmi" else lift
+        ic = self.item_counts
+        lift = [c * self.total / (ic[r] * ic[k]) for r, k, c in zip(rows, cols, counts)]
+        return [math.log2(v) for v in lift] if metric == "pmi" else lift
+
+    def _pair_dict(self, row: int, col: int, count: int) -> dict:
+        lift = count * self.total / (self.item_counts[row] * self.item_counts[col])
+        return {
+            "pair": (self.names[row], self.names[col]),
+            "count": int(count),
+            "lift": round(float(lift), 4),
+            "pmi": round(math.log2(lift), 4),
+        }
+
+    def _select(self, mask_fn, k: int, metric: str, min_count: int) -> list[dict]:
+        """依指標遞減取前 k 組；同分依次數、名稱排序"""
+        if metric not in METRICS:
+            raise ValueError(f"未知指標：{metric}（可用：{', '.join(METRICS)}）")
+
+        if sparse is not None:
+            mask = self.counts >= min_count
+            if mask_fn is not None:
+                mask &= mask_fn(self.rows, self.cols)
+            rows, cols, counts = self.rows[mask], self.cols[mask], self.counts[mask]
+            values = self._metric_values(metric, rows, cols, counts)
+            position = self._position_array
+            order = np.lexsort((position[cols], position[rows], -counts, -values))[:k]
+            return [self._pair_dict(rows[i], cols[i], counts[i]) for i in order]
+
+        selected = [
+            (r, c, n) for r, c, n in zip(self.rows, self.cols, self.counts)
+            if n >= min_count and (mask_fn is None or mask_fn(r, c))
+        ]
+        if not selected:
+            return []
+        rows, cols, counts = zip(*selected)
+        values = self._metric_values(metric, rows, cols, counts)
+        position = self._position
+        order = sorted(
+            range(len(selected)),
+            key=lambda i: (-values[i], -counts[i], position[rows[i]], position[cols[i]]),
+        )[:k]
+        return [self._pair_dict(rows[i], cols[i], counts[i]) for i in order]
+
+    # ------------------------------------------------------------------
+    # 查詢
+    # ------------------------------------------------------------------
+
+    def __len__(self):
+        return len(self.counts)
+
+    def count(self, name: str) -> int:
+        """含該成分的筆數"""
+        item_id = self.vocab.get(name)
+        return int(self.item_counts[item_id]) if item_id is not None else 0
+
+    def top_pairs(self, k: int = 10, metric: str = "count", min_count: int = 1) -> list[dict]:
+        """前 k 個成分組合
+
+        Returns:
+            [{"pair": (A, B), "count": n, "lift": x, "pmi": y}, ...]，A、B 依名稱排序
+        """
+        return self._select(None, k, metric, min_count)
+
+    def partners(self, name: str, k: int = 10, metric: str = "count", min_count: int = 1) -> list[dict]:
+        """與指定成分最常搭配的前 k 個成分"""
+        item_id = self.vocab.get(name)
+        if item_id is None:
+            return []
+        # 條件式同時適用 NumPy 陣列與純 Python 純量
+        return self._select(lambda r, c: (r == item_id) | (c == item_id), k, metric, min_count)
+
+    def pair(self, a: str, b: str) -> dict:
+        """單一組合的次數、lift 與 PMI；未共同出現時 count 為 0"""
+        id_a, id_b = self.vocab.get(a), self.vocab.get(b)
+        if id_a is not None and id_b is not None and id_a != id_b:
+            found = self._select(
+                lambda r, c: ((r == id_a) & (c == id_b)) | ((r == id_b) & (c == id_a)), 1, "count", 1
+            )
+            if found:
+                return found[0]
+        return {"pair": tuple(sorted((a, b))), "count": 0, "lift": 0.0, "pmi": None}
@@ -19,6 +19,8 @@ import sys
 import os
 from datetime import datetime
 
+from jsonl_io import open_jsonl
+
 def load_jsonl_index(filepath):
     """
     載入 JSONL 並建立索引
@@ -28,7 +30,7 @@ def load_jsonl_index(filepath):
     if not os.path.exists(filepath):
         return index
 
-    with open(filepath, 'r', encoding='utf-8') as f:
+    with open_jsonl(filepath) as f:
         for line in f:
             line = line.strip()
             if not line:
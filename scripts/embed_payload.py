@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+update.sh 批次 embedding 輸入產生器
+
+各 Layer 的 update.sh 在 Phase 3 需要每個 .md 檔的 body 文字（送 embedding）
+與 frontmatter 欄位（Qdrant payload）。原本每個檔案以 8 次 sed 讀取欄位、
+再以 jq '. += [$text]' 重寫整個 texts 陣列，一個批次為 O(n²)。
+
+本工具每個檔案只讀一次，一次輸出整批結果：
+- texts：JSON array（chatgpt_embed_batch 的輸入），依檔案順序
+- metadata：JSONL，每行一個 payload（單行 JSON），依檔案順序
+
+擷取規則與原本的 sed 相同：
+- 欄位：第一個符合 ^{欄位}: *"?([^"]*)"? *$ 的行，找不到時為空字串
+- body：排除 --- 與 --- 之間（含）的行，取前 500 行，去除結尾換行
+
+metadata 欄位以 --meta 依序指定：
+  key          取 frontmatter 的 key 欄位
+  key=field    取 frontmatter 的 field 欄位（如 manufacturer=brand）
+  key=:value   固定值（如 source_layer=:us_dsld）
+
+用法：
+  python3 scripts/embed_payload.py --texts texts.json --metadata meta.jsonl \\
+    --meta source_id --meta source_layer=:us_dsld --meta manufacturer=brand \\
+    docs/Extractor/us_dsld/botanicals/123.md ...
+"""
+
+import argparse
+import json
+import re
+import sys
+
+
+# body 取前幾行（與原本 head -500 相同）
+BODY_MAX_LINES = 500
+
+FENCE = "---"
+
+
+def parse_spec(spec: str) -> tuple:
+    """--meta 規格 → (key, frontmatter 欄位或 None, 固定值或 None)"""
+    key, sep, source = spec.partition("=")
+    if not key:
+        raise ValueError(f"無效的 --meta：{spec}")
+    if not sep:
+        return key, key, None
+    if source.startswith(":"):
+        return key, None, source[1:]
+    return key, source, None
+
+
+def field_pattern(fields) -> re.Pattern:
+    """sed 's/^{欄位}: *"\\{0,1\\}\\([^"]*\\)"\\{0,1\\} *$/\\1/p' 的對應"""
+    names = "|".join(re.escape(f) for f in sorted(set(fields), key=len, reverse=True))
+    return re.compile(f'^({names}): *"?([^"]*)"? *$')
+
+
+def read_document(path: str, pattern, fields) -> tuple[dict, str]:
+    """讀取一個檔案，回傳 (欄位值, body 文字)"""
+    values = {}
+    body = []
+    in_fence = False
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace", newline="") as f:
+            text = f.read()
+    except OSError as e:
+        print(f"⚠️  無法讀取：{path}（{e}）", file=sys.stderr)
+        return {field: "" for field in fields}, ""
+
+    lines = text.split("\n")
+    if lines and lines[-1] == "":
+        lines.pop()
+    for line in lines:
+        match = pattern.match(line) if pattern else None
+        if match and match.group(1) not in values:
+            values[match.group(1)] = match.group(2)
+
+        # sed -n '/^---$/,/^---$/!p'：範圍起訖行與其間的行都不輸出
+        if in_fence:
+            if line == FENCE:
+                in_fence = False
+        elif line == FENCE:
+            in_fence = True
+        elif len(body) < BODY_MAX_LINES:
+            body.append(line)
+
+    for field in fields:
+        values.setdefault(field, "")
+    # $(...) 會去除結尾的換行
+    return values, "\n".join(body).rstrip("\n")
+
+
+def build_payload(files, specs) -> tuple[list, list]:
+    """回傳 (texts, metadata 清單)"""
+    fields = [field for _, field, _ in specs if field]
+    pattern = field_pattern(fields) if fields else None
+    texts, metadata = [], []
+    for path in files:
+        values, body = read_document(path, pattern, fields)
+        texts.append(body)
+        metadata.append({
+            key: values[field] if field else constant
+            for key, field, constant in specs
+        })
+    return texts, metadata
+
+
+def main():
+    parser = argparse.ArgumentParser(description="update.sh 批次 embedding 輸入產生器")
+    parser.add_argument("files", nargs="*", help=".md 檔案（依序）")
+    parser.add_argument("--texts", required=True, help="輸出 texts JSON array 的路徑")
+    parser.add_argument("--metadata", required=True, help="輸出 metadata JSONL 的路徑")
+    parser.add_argument("--meta", action="append", default=[], metavar="KEY[=FIELD|=:VALUE]",
+                        help="metadata 欄位（依序，可重複）")
+    args = parser.parse_args()
+
+    try:
+        specs = [parse_spec(spec) for spec in args.meta]
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+
+    texts, metadata = build_payload(args.files, specs)
+
+    with open(args.texts, "w", encoding="utf-8") as f:
+        json.dump(texts, f, ensure_ascii=False)
+    with open(args.metadata, "w", encoding="utf-8") as f:
+        for item in metadata:
+            f.write(json.dumps(item, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+
+if __name__ == "__main__":
+    main()
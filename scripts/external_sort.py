@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+JSONL 外部排序與合併連接
+
+大型 JSONL（如 LNHPD 約 81 萬筆成分）無法整批載入記憶體時，
+依鍵值分段排序寫出暫存檔（run），再以 heapq.merge 串流合併：
+
+- sort_jsonl()：依鍵值排序逐行產出 (key, 行號, 原始行)，同鍵值維持原檔順序
+- merge_join()：兩個已排序串流的左外連接，右側同鍵值的紀錄成組提供
+
+記憶體用量只與分段大小（chunk_lines）有關，不隨檔案大小成長。
+
+用法：
+    from external_sort import sort_jsonl, merge_join
+
+    products = sort_jsonl("products.jsonl", key=lambda r: str(r.get("lnhpd_id", "")))
+    ingredients = sort_jsonl("ingredients.jsonl", key=lambda r: str(r.get("lnhpd_id", "")))
+    for key, line_num, line, matches in merge_join(products, ingredients):
+        ...
+"""
+
+import heapq
+import json
+import os
+import tempfile
+
+from jsonl_io import open_jsonl
+
+
+# 每個排序分段的行數
+DEFAULT_CHUNK_LINES = 100_000
+
+
+def _record_key(line: str, key) -> str:
+    """解析失敗或空行的鍵值為空字串（排在最前面，交由呼叫端處理）"""
+    if not line.strip():
+        return ""
+    try:
+        return key(json.loads(line))
+    except (json.JSONDecodeError, AttributeError):
+        return ""
+
+
+def _write_run(rows: list, tmp_dir: str, index: int) -> str:
+    rows.sort(key=lambda row: (row[0], row[1]))
+    path = os.path.join(tmp_dir, f"run-{index:05d}.tsv")
+    with open(path, "w", encoding="utf-8") as f:
+        for key, line_num, line in rows:
+            # json.dumps 會跳脫鍵值中的 tab，可安全以 tab 分隔
+            f.write(f"{json.dumps(key, ensure_ascii=False)}\t{line_num}\t{line}\n")
+    return path
+
+
+def _read_run(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        for row in f:
+            key, line_num, line = row.rstrip("\n").split("\t", 2)
+            yield json.loads(key), int(line_num), line
+
+
+def sort_jsonl(path, key, chunk_lines: int = DEFAULT_CHUNK_LINES, tmp_dir: str = None):
+    """依鍵值排序 JSONL，逐筆產出 (key, 行號, 原始行)
+
+    Args:
+        path: JSONL 檔案（支援 .zst）
+        key: 由解析後紀錄取得排序鍵（字串）的函式
+        chunk_lines: 每個排序分段的行數
+        tmp_dir: 暫存目錄所在位置（預設為系統暫存目錄）
+    """
+    with tempfile.TemporaryDirectory(prefix="jsonl-sort-", dir=tmp_dir) as work_dir:
+        runs = []
+        rows = []
+        with open_jsonl(path) as f:
+            for line_num, line in enumerate(f, 1):
+                line = line.rstrip("\r\n")
+                rows.append((_record_key(line, key), line_num, line))
+                if len(rows) >= chunk_lines:
+                    runs.append(_write_run(rows, work_dir, len(runs)))
+                    rows = []
+
+        # 只有一段時不需寫出暫存檔
+        if not runs:
+            rows.sort(key=lambda row: (row[0], row[1]))
+            yield from rows
+            return
+        if rows:
+            runs.append(_write_run(rows, work_dir, len(runs)))
+            rows = []
+
+        yield from heapq.merge(*(_read_run(run) for run in runs), key=lambda row: (row[0], row[1]))
+
+
+def merge_join(left, right):
+    """已排序串流的左外連接
+
+    Args:
+        left: 依鍵值排序的 (key, 行號, 原始行)
+        right: 依鍵值排序的 (key, 行號, 原始行)
+
+    Yields:
+        (key, 行號, 原始行, 右側同鍵值的原始行清單)；無對應時為空清單
+    """
+    right = iter(right)
+    pending = next(right, None)
+    group_key, group = None, []
+
+    for key, line_num, line in left:
+        if key != group_key:
+            group_key, group = key, []
+            # 略過右側較小的鍵值，收集相同鍵值
+            while pending is not None and pending[0] < key:
+                pending = next(right, None)
+            while pending is not None and pending[0] == key:
+                group.append(pending[2])
+                pending = next(right, None)
+        yield key, line_num, line, group if key else []
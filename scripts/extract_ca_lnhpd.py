@@ -7,10 +7,19 @@
     python3 scripts/extract_ca_lnhpd.py <products.jsonl>
     python3 scripts/extract_ca_lnhpd.py --ingredients <ingredients.jsonl> <products.jsonl>
     python3 scripts/extract_ca_lnhpd.py --delta --ingredients <ingredients.jsonl> <delta.jsonl>
+    python3 scripts/extract_ca_lnhpd.py --join memory --ingredients <ingredients.jsonl> <products.jsonl>
+
+成分整合預設以 merge 模式進行：產品與成分 JSONL 皆依 lnhpd_id 外部排序後
+串流合併，記憶體用量固定；memory 模式則將全部成分載入記憶體索引。
 """
-import json, os, sys, re
-from datetime import datetime, timezone
+import json, os, sys
 from collections import defaultdict
+from datetime import datetime, timezone
+
+import extract_runtime
+from external_sort import DEFAULT_CHUNK_LINES, merge_join, sort_jsonl
+from jsonl_io import open_jsonl
+from rule_engine import KeywordRules
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 OUTPUT_DIR = os.path.join(BASE_DIR, "docs/Extractor/ca_lnhpd")
@@ -38,6 +47,11 @@ FORM_MAPPING = {
     "lotion": "other",
 }
 
+# 編譯後的規則（FORM_MAPPING 依序比對，第一個命中者為準）
+FORM_RULES = [([key], value) for key, value in FORM_MAPPING.items()]
+CATEGORY_MATCHER = KeywordRules(CATEGORY_RULES)
+FORM_MATCHER = KeywordRules(FORM_RULES)
+
 def s(val):
     """Safely convert to string, handling None."""
     return str(val).strip() if val is not None else ""
@@ -60,7 +74,7 @@ def load_ingredients_index(ingredients_file: str) -> dict:
     index = defaultdict(list)
     count = 0
 
-    with open(ingredients_file, "r", encoding="utf-8") as f:
+    with open_jsonl(ingredients_file) as f:
         for line in f:
             if not line.strip():
                 continue
@@ -77,6 +91,25 @@ def load_ingredients_index(ingredients_file: str) -> dict:
     return dict(index)
 
 
+def iter_products_joined(jsonl_file: str, ingredients_file: str,
+                         chunk_lines: int = DEFAULT_CHUNK_LINES, tmp_dir: str = None):
+    """
+    以 lnhpd_id 排序合併產品與成分（merge join）。
+
+    兩個檔案皆外部排序後串流比對，同一時間只保留一個產品的成分。
+
+    Yields:
+        (行號, 產品 JSON 行, 該產品的成分 JSON 行列表)
+    """
+    products = sort_jsonl(jsonl_file, key=lambda r: s(r.get("lnhpd_id", "")),
+                          chunk_lines=chunk_lines, tmp_dir=tmp_dir)
+    ingredients = sort_jsonl(ingredients_file, key=lambda r: str(r.get("lnhpd_id", "")),
+                             chunk_lines=chunk_lines, tmp_dir=tmp_dir)
+
+    for _, line_num, line, matches in merge_join(products, ingredients):
+        yield line_num, line, matches
+
+
 def format_ingredients(ingredients: list) -> str:
     """
     格式化成分清單為 Markdown。
@@ -129,31 +162,13 @@ def infer_category(product_name):
     """依產品名稱推斷 category"""
     if not product_name:
         return "other"
-    name_lower = product_name.lower()
-    matched_cats = set()
-    
-    for keywords, cat in CATEGORY_RULES:
-        for kw in keywords:
-            if kw in name_lower:
-                matched_cats.add(cat)
-                break
-    
-    if len(matched_cats) == 0:
-        return "other"
-    if len(matched_cats) == 1:
-        return matched_cats.pop()
-    return "specialty"
+    return CATEGORY_MATCHER.classify(product_name.lower())
 
 def map_product_form(dosage_form):
     """映射 LNHPD dosage_form 到統一格式"""
     if not dosage_form:
         return "other"
-    form_lower = dosage_form.lower()
-    
-    for key, value in FORM_MAPPING.items():
-        if key in form_lower:
-            return value
-    return "other"
+    return FORM_MATCHER.first(dosage_form.lower())
 
 def check_review_needed(data, category):
     """檢查是否需要標記 REVIEW_NEEDED"""
@@ -180,34 +195,35 @@ def check_review_needed(data, category):
     
     return reasons
 
-def extract_product(line_num, line_content, ingredients_index=None):
-    """萃取單一產品
+def source_id_of(data, extra):
+    """紀錄的 source_id（extract_runtime 據此在產生文件前跳過既有產品）
+
+    替代名稱回傳空字串，交由 build_document 計入「替代名稱」。
+    """
+    if data.get("flag_primary_name") != 1:
+        return ""
+    return s(data.get("lnhpd_id", ""))
+
+def build_document(data, extra, context):
+    """萃取單一產品（由 extract_runtime 呼叫）
 
     Args:
-        line_num: 行號
-        line_content: JSON 內容
-        ingredients_index: 成分索引 dict（lnhpd_id -> [ingredient_records]）
+        data: 產品記錄
+        extra: merge 模式下該產品的成分 JSON 行列表，否則為 None
+        context: 執行參數（now；memory 模式另含 ingredients_index）
 
     Returns:
-        dict with extraction result, or None if skipped/error
-        Special case: returns {"skip": True, "reason": "..."} for non-primary names
+        文件 dict；替代名稱回傳 {"skip": "替代名稱"}
     """
-    try:
-        data = json.loads(line_content)
-    except json.JSONDecodeError as e:
-        print(f"❌ Line {line_num}: JSON decode error: {e}", file=sys.stderr)
-        return None
-
     # 只處理主要名稱（flag_primary_name == 1）
     # 跳過替代名稱，避免同一產品出現在多個分類目錄
     if data.get("flag_primary_name") != 1:
-        return {"skip": True, "reason": "non_primary_name"}
+        return {"skip": "替代名稱"}
 
     # 提取基本欄位
     lnhpd_id = s(data.get("lnhpd_id", ""))
     if not lnhpd_id:
-        print(f"⚠️  Line {line_num}: 缺少 lnhpd_id，跳過", file=sys.stderr)
-        return None
+        return {"error": "缺少 lnhpd_id，跳過"}
 
     product_name = s(data.get("product_name", ""))
     company_name = s(data.get("company_name", ""))
@@ -229,15 +245,16 @@ def extract_product(line_num, line_content, ingredients_index=None):
     source_url = f"https://health-products.canada.ca/lnhpd-bdpsnh/info.do?licence={licence_number}&lang=en" if licence_number else ""
 
     # 產生 ISO8601 timestamp
-    fetched_at = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    fetched_at = context["fetched_at"]
 
     # 授權狀態
     status_text = "有效" if flag_product_status == 1 else "無效" if flag_product_status == 0 else "未知"
 
     # 取得成分資料
-    ingredients = []
-    if ingredients_index:
-        ingredients = ingredients_index.get(lnhpd_id, [])
+    if extra is not None:
+        ingredients = [json.loads(line) for line in extra]
+    else:
+        ingredients = context.get("ingredients_index", {}).get(lnhpd_id, [])
     ingredients_md = format_ingredients(ingredients)
 
     # 組合 Markdown 內容
@@ -281,17 +298,12 @@ fetched_at: "{fetched_at}"
 
     markdown_content = frontmatter + "\n\n" + body
 
-    # 決定輸出路徑
-    category_dir = os.path.join(OUTPUT_DIR, category)
-    os.makedirs(category_dir, exist_ok=True)
-    output_path = os.path.join(category_dir, f"{lnhpd_id}.md")
-
     return {
-        "path": output_path,
+        "source_id": lnhpd_id,
+        "category": category,
         "content": markdown_content,
         "review_needed": review_needed,
-        "category": category,
-        "has_ingredients": len(ingredients) > 0
+        "flags": ("with_ingredients",) if ingredients else (),
     }
 
 def main():
@@ -304,6 +316,14 @@ def main():
                         help='Delta 模式：處理增量更新，自動啟用 --force')
     parser.add_argument('--ingredients', '-i', type=str, default='',
                         help='成分 JSONL 檔案路徑（可選，若提供將整合成分資料）')
+    parser.add_argument('--join', choices=['merge', 'memory'], default='merge',
+                        help='成分整合方式：merge（依 lnhpd_id 外部排序合併，記憶體固定）'
+                             '或 memory（全部載入記憶體索引），預設 merge')
+    parser.add_argument('--sort-chunk', type=int, default=DEFAULT_CHUNK_LINES,
+                        help=f'merge 模式每個排序分段的行數（預設 {DEFAULT_CHUNK_LINES:,}）')
+    parser.add_argument('--tmp-dir', type=str, default=None,
+                        help='merge 模式排序暫存目錄（預設為系統暫存目錄）')
+    extract_runtime.add_arguments(parser)
     args = parser.parse_args()
 
     jsonl_file = args.jsonl_file
@@ -314,113 +334,50 @@ def main():
         print(f"❌ JSONL 檔案不存在: {jsonl_file}", file=sys.stderr)
         sys.exit(1)
 
-    # 載入成分索引
+    # 成分整合
     ingredients_index = {}
+    with_ingredients = False
     if ingredients_file:
         if not os.path.exists(ingredients_file):
             print(f"⚠️  成分檔案不存在: {ingredients_file}，將跳過成分整合", file=sys.stderr)
-        else:
+        elif args.join == "memory":
             ingredients_index = load_ingredients_index(ingredients_file)
+            with_ingredients = bool(ingredients_index)
+        else:
+            with_ingredients = True
 
     mode_text = "增量更新（覆蓋模式）" if force_overwrite else "一般模式（跳過既有）"
     print(f"📖 讀取 JSONL: {jsonl_file}")
     print(f"📋 模式: {mode_text}")
     if ingredients_index:
-        print(f"📋 成分整合: 已啟用（{len(ingredients_index):,} 個產品）")
-
-    # 讀取已存在的檔案（去重用，僅在非 force 模式使用）
-    existing_ids = set()
-    if not force_overwrite:
-        for category in ["vitamins_minerals", "botanicals", "protein_amino", "probiotics",
-                         "omega_fatty_acids", "specialty", "sports_fitness", "other"]:
-            cat_dir = os.path.join(OUTPUT_DIR, category)
-            if os.path.exists(cat_dir):
-                for fname in os.listdir(cat_dir):
-                    if fname.endswith(".md"):
-                        existing_ids.add(fname.replace(".md", ""))
-    
-    if not force_overwrite:
-        print(f"📋 已存在 {len(existing_ids)} 筆產品，將跳過")
-    else:
-        print(f"📋 增量模式：所有記錄都會被處理（覆蓋既有檔案）")
-    
-    # 逐行處理
-    stats = {
-        "total": 0,
-        "skipped": 0,
-        "skipped_non_primary": 0,  # 跳過的替代名稱
-        "extracted": 0,
-        "updated": 0,  # 覆蓋更新的數量
-        "review_needed": 0,
-        "with_ingredients": 0,  # 含成分資料的產品數
-        "by_category": {}
-    }
-
-    with open(jsonl_file, "r", encoding="utf-8") as f:
-        for line_num, line in enumerate(f, 1):
-            stats["total"] += 1
+        print(f"📋 成分整合: 已啟用（memory，{len(ingredients_index):,} 個產品）")
+    elif with_ingredients:
+        print(f"📋 成分整合: 已啟用（merge，依 lnhpd_id 排序合併 {ingredients_file}）")
 
-            if not line.strip():
-                continue
-
-            result = extract_product(line_num, line, ingredients_index)
-            if not result:
-                continue
-
-            # 處理 skip 標記（替代名稱）
-            if result.get("skip"):
-                stats["skipped_non_primary"] += 1
-                continue
-
-            # 去重檢查（僅在非 force 模式）
-            source_id = result["path"].split("/")[-1].replace(".md", "")
-            is_existing = os.path.exists(result["path"])
+    if force_overwrite:
+        print(f"📋 增量模式：所有記錄都會被處理（覆蓋既有檔案）")
 
-            if not force_overwrite and source_id in existing_ids:
-                stats["skipped"] += 1
-                if stats["skipped"] % 10000 == 0:
-                    print(f"⏭️  已跳過 {stats['skipped']} 筆既有資料...")
-                continue
+    if with_ingredients and not ingredients_index:
+        products = iter_products_joined(jsonl_file, ingredients_file, args.sort_chunk, args.tmp_dir)
+    else:
+        products = extract_runtime.read_jsonl(jsonl_file)
 
-            # 寫入檔案
-            with open(result["path"], "w", encoding="utf-8") as out:
-                out.write(result["content"])
-
-            if is_existing and force_overwrite:
-                stats["updated"] += 1
-            else:
-                stats["extracted"] += 1
-            stats["by_category"][result["category"]] = stats["by_category"].get(result["category"], 0) + 1
-
-            if result.get("has_ingredients"):
-                stats["with_ingredients"] += 1
-
-            if result["review_needed"]:
-                stats["review_needed"] += 1
-            
-            # 進度回報
-            if stats["extracted"] % 1000 == 0:
-                print(f"✅ 已萃取 {stats['extracted']} 筆...")
-    
-    # 最終統計
-    total_processed = stats['extracted'] + stats['updated']
-    print("\n" + "=" * 50)
-    print("📊 萃取完成統計")
-    print("=" * 50)
-    print(f"總行數：{stats['total']}")
-    print(f"跳過（替代名稱）：{stats['skipped_non_primary']}")
-    print(f"跳過（已存在）：{stats['skipped']}")
-    print(f"新增萃取：{stats['extracted']}")
-    if stats['updated'] > 0:
-        print(f"更新覆蓋：{stats['updated']}")
-    print(f"需要審核：{stats['review_needed']}")
+    context = {"fetched_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")}
     if ingredients_index:
-        pct = (stats['with_ingredients'] / total_processed * 100) if total_processed > 0 else 0
-        print(f"含成分資料：{stats['with_ingredients']} ({pct:.1f}%)")
-    print("\n分類統計：")
-    for cat, count in sorted(stats["by_category"].items()):
-        print(f"  - {cat}: {count}")
-    print("=" * 50)
+        context["ingredients_index"] = ingredients_index
+
+    stats = extract_runtime.run(
+        "ca_lnhpd", products, build_document, source_id_of=source_id_of,
+        output_dir=OUTPUT_DIR, force=force_overwrite,
+        context=context, jobs=args.jobs, chunk_size=args.chunk_size,
+    )
+    extract_runtime.print_stats("ca_lnhpd", stats)
+
+    if with_ingredients:
+        total_processed = stats["extracted"] + stats["updated"]
+        with_count = stats["flags"].get("with_ingredients", 0)
+        pct = (with_count / total_processed * 100) if total_processed > 0 else 0
+        print(f"  含成分資料：{with_count} ({pct:.1f}%)")
 
 if __name__ == "__main__":
     main()
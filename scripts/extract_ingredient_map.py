@@ -8,6 +8,8 @@ import argparse
 from datetime import datetime
 from pathlib import Path
 
+from jsonl_io import find_snapshots, open_jsonl
+
 BASE_DIR = Path(__file__).parent.parent
 RAW_DIR = BASE_DIR / "docs" / "Extractor" / "ingredient_map" / "raw"
 OUTPUT_DIR = BASE_DIR / "docs" / "Extractor" / "ingredient_map"
@@ -149,7 +151,7 @@ def process_jsonl_file(jsonl_path: Path, force: bool = False) -> dict:
 
     existing = {} if force else get_existing_source_ids()
 
-    with open(jsonl_path, "r", encoding="utf-8") as f:
+    with open_jsonl(jsonl_path) as f:
         for line in f:
             if not line.strip():
                 continue
@@ -210,10 +212,10 @@ def main():
     if args.jsonl_file:
         jsonl_files = [Path(args.jsonl_file)]
     elif args.all:
-        jsonl_files = list(RAW_DIR.glob("normalized_*.jsonl"))
+        jsonl_files = [Path(p) for p in find_snapshots(str(RAW_DIR / "normalized_*.jsonl"))]
     else:
         # 找最新的
-        jsonl_files = sorted(RAW_DIR.glob("normalized_*.jsonl"),
+        jsonl_files = sorted((Path(p) for p in find_snapshots(str(RAW_DIR / "normalized_*.jsonl"))),
                             key=lambda x: x.stat().st_mtime,
                             reverse=True)[:1]
 
@@ -1,13 +1,22 @@
 #!/usr/bin/env python3
-"""交互作用萃取腳本 — 將 JSONL 轉換為 .md 檔並分析內容"""
-import json
-import os
+"""交互作用萃取腳本 — 將 JSONL 轉換為 .md 檔並分析內容
+
+研究類型、嚴重程度與各交互類型的分類關鍵詞合併編譯為單一分類器
+（rule_engine.KeywordDictionaries），每篇文獻的 title + abstract 只轉小寫、
+掃描一次即取得所有命中的標籤；讀檔、平行化、去重與寫檔由 extract_runtime 處理。
+萃取完成後更新交互文獻索引（interaction_index），供指南與報告查詢。
+"""
 import re
 import sys
 import argparse
 from datetime import datetime
 from pathlib import Path
 
+import extract_runtime
+from interaction_index import InteractionIndex
+from jsonl_io import find_snapshots
+from rule_engine import KeywordDictionaries, KeywordRules
+
 BASE_DIR = Path(__file__).parent.parent
 
 # Study Type 判定規則
@@ -84,43 +93,51 @@ def slugify(text: str) -> str:
     return text.strip("-")[:80]  # 限制長度
 
 
-def infer_study_type(publication_types: list, title: str, abstract: str) -> tuple:
-    """推斷研究類型與證據等級"""
-    combined_text = f"{title} {abstract}".lower()
-    pub_types_str = " ".join(publication_types).lower()
-
-    for keywords, study_type, level in STUDY_TYPE_RULES:
-        for kw in keywords:
-            if kw.lower() in pub_types_str:
-                return study_type, level
-            if kw.lower() in combined_text:
-                return study_type, level
+def keyword_rules(keyword_map: dict) -> list:
+    """{分類: [關鍵詞]} → 規則表（保持字典順序）"""
+    return [(keywords, category) for category, keywords in keyword_map.items()]
 
-    return "other", 5
 
+# 研究類型規則（小寫；標籤為 STUDY_TYPE_RULES 的序號，序號小者優先）
+STUDY_TYPE_KEYWORD_RULES = [
+    ([kw.lower() for kw in keywords], index) for index, (keywords, _, _) in enumerate(STUDY_TYPE_RULES)
+]
 
-def infer_severity(title: str, abstract: str) -> str:
-    """推斷交互嚴重程度"""
-    combined_text = f"{title} {abstract}".lower()
+# 各交互類型的內容分類關鍵詞
+CATEGORY_KEYWORDS = {
+    "ddi": DRUG_CLASS_KEYWORDS,
+    "dfi": FOOD_CATEGORY_KEYWORDS,
+    "dhi": SUPPLEMENT_CATEGORY_KEYWORDS,
+}
 
-    for severity, keywords in SEVERITY_KEYWORDS.items():
-        for kw in keywords:
-            if kw in combined_text:
-                return severity
+# 各交互類型的 title + abstract 合併分類器（研究類型、嚴重程度、內容分類）
+ARTICLE_TAGGERS = {
+    interaction_type: KeywordDictionaries({
+        "study_type": STUDY_TYPE_KEYWORD_RULES,
+        "severity": keyword_rules(SEVERITY_KEYWORDS),
+        "category": keyword_rules(keywords),
+    })
+    for interaction_type, keywords in CATEGORY_KEYWORDS.items()
+}
 
-    return "unknown"
+# publication_types 的研究類型比對
+PUBLICATION_TYPE_MATCHER = KeywordRules(STUDY_TYPE_KEYWORD_RULES)
 
 
-def categorize_by_keywords(text: str, keyword_map: dict) -> str:
-    """根據關鍵詞分類"""
-    text_lower = text.lower()
+def classify_article(title: str, abstract: str, publication_types: list, interaction_type: str) -> dict:
+    """一次掃描標記文獻的所有研究類型、嚴重程度與內容分類
 
-    for category, keywords in keyword_map.items():
-        for kw in keywords:
-            if kw in text_lower:
-                return category
+    回傳 {"study_type": [...], "severity": [...], "category": [...], "evidence_level": int}；
+    各 list 依規則表順序，第一個即為逐條比對時的結果。
+    """
+    tags = ARTICLE_TAGGERS[interaction_type].tag(f"{title} {abstract}".lower())
 
-    return "other"
+    # 研究類型：publication_types 或內文命中皆可，取規則表中最前面的
+    indices = set(tags["study_type"]) | PUBLICATION_TYPE_MATCHER.matches(" ".join(publication_types).lower())
+    ordered = sorted(indices)
+    tags["study_type"] = [STUDY_TYPE_RULES[i][1] for i in ordered]
+    tags["evidence_level"] = STUDY_TYPE_RULES[ordered[0]][2] if ordered else 5
+    return tags
 
 
 def check_review_needed(article: dict) -> list:
@@ -137,8 +154,8 @@ def check_review_needed(article: dict) -> list:
     return reasons
 
 
-def generate_markdown(article: dict, interaction_type: str, category: str) -> str:
-    """生成 Markdown 內容"""
+def generate_markdown(article: dict, interaction_type: str, category: str, tags: dict = None) -> str:
+    """生成 Markdown 內容（tags 為 classify_article 的結果，未提供時重新分類）"""
     pmid = article.get("pmid") or ""
     title = article.get("title") or ""
     abstract = article.get("abstract") or ""
@@ -147,11 +164,15 @@ def generate_markdown(article: dict, interaction_type: str, category: str) -> st
     authors = article.get("authors") or []
     publication_types = article.get("publication_types") or []
 
-    # 推斷研究類型和證據等級
-    study_type, evidence_level = infer_study_type(publication_types, title, abstract)
+    if tags is None:
+        tags = classify_article(title, abstract, publication_types, interaction_type)
 
-    # 推斷嚴重程度
-    severity = infer_severity(title, abstract)
+    # 研究類型和證據等級
+    study_type = tags["study_type"][0] if tags["study_type"] else "other"
+    evidence_level = tags["evidence_level"]
+
+    # 嚴重程度
+    severity = tags["severity"][0] if tags["severity"] else "unknown"
 
     review_reasons = check_review_needed(article)
     if severity == "unknown" and not review_reasons:
@@ -206,92 +227,42 @@ fetched_at: "{article.get('fetched_at', datetime.now().isoformat())}"
     return md
 
 
-def get_existing_source_ids(layer_dir: Path) -> set:
-    """取得已存在的 source_id"""
-    existing = set()
-
-    for category_dir in layer_dir.iterdir():
-        if not category_dir.is_dir() or category_dir.name == "raw":
-            continue
-
-        for md_file in category_dir.glob("*.md"):
-            try:
-                content = md_file.read_text(encoding="utf-8")
-                for line in content.split("\n"):
-                    if line.startswith("source_id:"):
-                        sid = line.split(":", 1)[1].strip().strip('"')
-                        existing.add(sid)
-                        break
-            except Exception:
-                pass
-
-    return existing
-
-
-def process_jsonl_file(jsonl_path: Path, interaction_type: str, force: bool = False) -> dict:
-    """處理單一 JSONL 檔案"""
-    stats = {"processed": 0, "skipped": 0, "review_needed": 0, "new": 0}
-
-    layer_dir = BASE_DIR / "docs" / "Extractor" / interaction_type
-    existing = set() if force else get_existing_source_ids(layer_dir)
+def source_id_of(article: dict, extra) -> str:
+    """文獻的 source_id（PMID）；extract_runtime 據此在分類前跳過已萃取的文獻"""
+    pmid = article.get("pmid", "")
+    return str(pmid) if pmid else ""
 
-    # 根據交互類型選擇分類方式
-    if interaction_type == "dhi":
-        category_keywords = SUPPLEMENT_CATEGORY_KEYWORDS
-    elif interaction_type == "dfi":
-        category_keywords = FOOD_CATEGORY_KEYWORDS
-    else:  # ddi
-        category_keywords = DRUG_CLASS_KEYWORDS
 
-    with open(jsonl_path, "r", encoding="utf-8") as f:
-        for line in f:
-            if not line.strip():
-                continue
+def build_document(article: dict, extra, context: dict):
+    """單篇文獻 → 文件（extract_runtime 的 build）"""
+    interaction_type = context["interaction_type"]
 
-            try:
-                article = json.loads(line)
-            except json.JSONDecodeError:
-                continue
+    pmid = source_id_of(article, extra)
+    if not pmid:
+        return {"skip": "PMID 為空"}
 
-            pmid = article.get("pmid", "")
-            if not pmid:
-                stats["skipped"] += 1
-                continue
-
-            # 檢查是否已存在
-            if pmid in existing and not force:
-                stats["skipped"] += 1
-                continue
-
-            # 分類
-            title = article.get("title", "")
-            abstract = article.get("abstract", "")
-            combined_text = f"{title} {abstract}"
-
-            file_category = article.get("category", "general")
-            content_category = categorize_by_keywords(combined_text, category_keywords)
-
-            # 使用檔案類別或內容分類
-            category = content_category if content_category != "other" else file_category
-
-            # 建立目錄
-            category_dir = layer_dir / category
-            category_dir.mkdir(parents=True, exist_ok=True)
-
-            # 生成 Markdown
-            md_content = generate_markdown(article, interaction_type, category)
+    title = article.get("title") or ""
+    abstract = article.get("abstract") or ""
+    tags = classify_article(title, abstract, article.get("publication_types") or [], interaction_type)
 
-            # 寫入檔案
-            output_path = category_dir / f"{pmid}.md"
-            output_path.write_text(md_content, encoding="utf-8")
+    # 使用內容分類，無法分類時使用檔案類別
+    content_categories = tags["category"]
+    category = content_categories[0] if content_categories else article.get("category", "general")
 
-            stats["processed"] += 1
-            stats["new"] += 1
+    return {
+        "source_id": pmid,
+        "category": category,
+        "content": generate_markdown(article, interaction_type, category, tags),
+        "review_needed": bool(check_review_needed(article)),
+    }
 
-            if check_review_needed(article):
-                stats["review_needed"] += 1
 
-    return stats
+def read_articles(jsonl_files: list):
+    """依序產出所有 JSONL 檔的 (行號, 原始行, 檔名)"""
+    for jsonl_path in jsonl_files:
+        print(f"  處理: {jsonl_path.name}")
+        for line_num, line, _ in extract_runtime.read_jsonl(jsonl_path):
+            yield line_num, line, jsonl_path.name
 
 
 def main():
@@ -301,6 +272,7 @@ def main():
     parser.add_argument("jsonl_file", nargs="?", help="指定 JSONL 檔案")
     parser.add_argument("--all", action="store_true", help="處理所有 JSONL 檔案")
     parser.add_argument("--force", action="store_true", help="強制覆蓋已存在的檔案")
+    extract_runtime.add_arguments(parser)
     args = parser.parse_args()
 
     interaction_type = args.type
@@ -314,10 +286,10 @@ def main():
     if args.jsonl_file:
         jsonl_files = [Path(args.jsonl_file)]
     elif args.all:
-        jsonl_files = list(raw_dir.glob("*.jsonl"))
+        jsonl_files = [Path(p) for p in find_snapshots(str(raw_dir / "*.jsonl"))]
     else:
         # 找最新的
-        jsonl_files = sorted(raw_dir.glob("*.jsonl"),
+        jsonl_files = sorted((Path(p) for p in find_snapshots(str(raw_dir / "*.jsonl"))),
                             key=lambda x: x.stat().st_mtime,
                             reverse=True)
 
@@ -326,22 +298,18 @@ def main():
         print("  請先執行 fetch.sh", file=sys.stderr)
         sys.exit(1)
 
-    total_stats = {"processed": 0, "skipped": 0, "review_needed": 0, "new": 0}
-
-    for jsonl_path in jsonl_files:
-        print(f"\n  處理: {jsonl_path.name}")
-        stats = process_jsonl_file(jsonl_path, interaction_type, args.force)
-
-        for k, v in stats.items():
-            total_stats[k] += v
-
-        print(f"    ✅ 處理: {stats['processed']}, 跳過: {stats['skipped']}, REVIEW: {stats['review_needed']}")
-
-    print("\n━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
-    print(f"✅ 萃取完成: {interaction_type.upper()}")
-    print(f"   處理: {total_stats['processed']}")
-    print(f"   跳過: {total_stats['skipped']}")
-    print(f"   REVIEW_NEEDED: {total_stats['review_needed']}")
+    stats = extract_runtime.run(
+        interaction_type, read_articles(jsonl_files), build_document,
+        source_id_of=source_id_of, force=args.force, context={"interaction_type": interaction_type},
+        jobs=args.jobs, chunk_size=args.chunk_size,
+    )
+    extract_runtime.print_stats(interaction_type, stats)
+
+    # 更新交互文獻索引（只讀取新增或變動的檔案）
+    index = InteractionIndex(interaction_type, extract_runtime.EXTRACTOR_DIR / interaction_type)
+    total = index.refresh()
+    index.save()
+    print(f"📇 交互索引：{total} 筆（更新 {index.reread} 筆）")
 
 
 if __name__ == "__main__":
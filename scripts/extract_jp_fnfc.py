@@ -1,7 +1,10 @@
 #!/usr/bin/env python3
 """jp_fnfc 萃取腳本 — 依據 Layer CLAUDE.md 規則將 JSONL 轉換為 .md 檔"""
-import json, os, sys, re, glob
-from datetime import datetime, timezone
+import argparse, os, sys
+
+import extract_runtime
+from jsonl_io import latest_snapshot
+from rule_engine import KeywordRules
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 RAW_DIR = os.path.join(BASE_DIR, "docs/Extractor/jp_fnfc/raw")
@@ -23,6 +26,9 @@ CATEGORY_RULES = [
     (["コラーゲン", "ペプチド", "アミノ酸", "HMB"], "protein_amino"),
 ]
 
+# 編譯後的規則（每個欄位一次掃描）
+CATEGORY_MATCHER = KeywordRules(CATEGORY_RULES)
+
 # Product Form 推斷規則
 def infer_product_form(food_category, food_name):
     """從 食品の区分 和 名称 推斷 product_form"""
@@ -53,19 +59,7 @@ def s(val):
     return str(val).strip() if val is not None else ""
 
 def infer_category(ingredient_str):
-    if not ingredient_str:
-        return "other"
-    matched_cats = set()
-    for keywords, cat in CATEGORY_RULES:
-        for kw in keywords:
-            if kw in ingredient_str:
-                matched_cats.add(cat)
-                break
-    if len(matched_cats) == 0:
-        return "other"
-    if len(matched_cats) == 1:
-        return matched_cats.pop()
-    return "specialty"  # 多成分複合
+    return CATEGORY_MATCHER.classify(ingredient_str)  # 多成分複合 → specialty
 
 def format_date(date_str):
     """Convert YYYY/MM/DD to YYYY-MM-DD"""
@@ -86,113 +80,58 @@ def check_review_needed(rec):
         reasons.append("機能性関与成分名為空")
     return reasons
 
-def get_existing_source_ids():
-    ids = set()
-    for root, dirs, files in os.walk(OUTPUT_DIR):
-        if "raw" in root:
-            continue
-        for f in files:
-            if f.endswith(".md"):
-                path = os.path.join(root, f)
-                try:
-                    with open(path, "r", encoding="utf-8") as fh:
-                        for line in fh:
-                            if line.startswith("source_id:"):
-                                sid = line.split(":", 1)[1].strip().strip('"')
-                                ids.add(sid)
-                                break
-                except:
-                    pass
-    return ids
-
 def find_latest_jsonl():
     """Find the most recent JSONL file in raw directory"""
-    pattern = os.path.join(RAW_DIR, "fnfc-*.jsonl")
-    files = glob.glob(pattern)
-    if not files:
-        return None
-    return max(files, key=os.path.getmtime)
+    return latest_snapshot(os.path.join(RAW_DIR, "fnfc-*.jsonl"))
 
-def process():
-    jsonl_file = find_latest_jsonl()
-    if not jsonl_file:
-        print(f"JSONL not found in: {RAW_DIR}", file=sys.stderr)
-        sys.exit(1)
+def source_id_of(rec, extra):
+    """紀錄的 source_id（extract_runtime 據此在產生文件前跳過既有產品）"""
+    return s(rec.get("届出番号"))
 
-    print(f"Processing: {jsonl_file}")
+def build_document(rec, extra, context):
+    """單筆紀錄 → Markdown 文件（由 extract_runtime 呼叫）"""
+    # Extract fields using Japanese column names
+    source_id = source_id_of(rec, extra)
+    if not source_id:
+        return None
 
-    existing_ids = get_existing_source_ids()
-    now = datetime.now(timezone.utc).isoformat()
-    stats = {"total": 0, "skipped": 0, "extracted": 0, "review_needed": 0, "errors": 0}
-
-    # Ensure category directories exist
-    for cat in ["vitamins_minerals", "botanicals", "protein_amino", "probiotics",
-                "omega_fatty_acids", "specialty", "sports_fitness", "other"]:
-        os.makedirs(os.path.join(OUTPUT_DIR, cat), exist_ok=True)
-
-    with open(jsonl_file, "r", encoding="utf-8") as f:
-        for line_num, raw_line in enumerate(f, 1):
-            stats["total"] += 1
-            raw_line = raw_line.strip()
-            if not raw_line:
-                continue
-            try:
-                rec = json.loads(raw_line)
-            except json.JSONDecodeError as e:
-                print(f"  Line {line_num}: JSON parse error: {e}", file=sys.stderr)
-                stats["errors"] += 1
-                continue
-
-            # Extract fields using Japanese column names
-            source_id = s(rec.get("届出番号"))
-            if not source_id:
-                stats["errors"] += 1
-                continue
-
-            if source_id in existing_ids:
-                stats["skipped"] += 1
-                continue
-
-            product_name = s(rec.get("商品名"))
-            company_name = s(rec.get("法人名"))
-            notification_date = s(rec.get("届出日"))
-            withdrawal_date = s(rec.get("撤回日"))
-            functional_ingredient = s(rec.get("機能性関与成分名"))
-            functional_claim = s(rec.get("表示しようとする機能性"))
-            food_category = s(rec.get("食品の区分"))
-            food_name = s(rec.get("名称"))
-            precautions = s(rec.get("摂取をする上での注意事項"))
-            raw_materials = s(rec.get("機能性関与成分を含む原材料名"))
-
-            # Date formatting
-            date_entered = format_date(notification_date)
-
-            # Infer category and product form
-            category = infer_category(functional_ingredient)
-            product_form = infer_product_form(food_category, food_name)
-
-            # Build source URL
-            source_url = SOURCE_URL_TEMPLATE.format(source_id)
-
-            # Escape double quotes for YAML frontmatter
-            safe_source_id = source_id.replace('"', '\\"')
-            safe_product_name = product_name.replace('"', '\\"')
-            safe_company_name = company_name.replace('"', '\\"')
-            safe_date_entered = date_entered.replace('"', '\\"')
-
-            review_reasons = check_review_needed(rec)
-            review_prefix = ""
-            if review_reasons:
-                review_prefix = "[REVIEW_NEEDED]\n\n"
-                stats["review_needed"] += 1
-
-            # Withdrawal status note
-            withdrawal_note = ""
-            if withdrawal_date:
-                withdrawal_note = f"已撤回（{format_date(withdrawal_date)}）"
-
-            # Build markdown
-            md = f"""{review_prefix}---
+    product_name = s(rec.get("商品名"))
+    company_name = s(rec.get("法人名"))
+    notification_date = s(rec.get("届出日"))
+    withdrawal_date = s(rec.get("撤回日"))
+    functional_ingredient = s(rec.get("機能性関与成分名"))
+    functional_claim = s(rec.get("表示しようとする機能性"))
+    food_category = s(rec.get("食品の区分"))
+    food_name = s(rec.get("名称"))
+    precautions = s(rec.get("摂取をする上での注意事項"))
+    raw_materials = s(rec.get("機能性関与成分を含む原材料名"))
+
+    # Date formatting
+    date_entered = format_date(notification_date)
+
+    # Infer category and product form
+    category = infer_category(functional_ingredient)
+    product_form = infer_product_form(food_category, food_name)
+
+    # Build source URL
+    source_url = SOURCE_URL_TEMPLATE.format(source_id)
+
+    # Escape double quotes for YAML frontmatter
+    safe_source_id = source_id.replace('"', '\\"')
+    safe_product_name = product_name.replace('"', '\\"')
+    safe_company_name = company_name.replace('"', '\\"')
+    safe_date_entered = date_entered.replace('"', '\\"')
+
+    review_reasons = check_review_needed(rec)
+    review_prefix = "[REVIEW_NEEDED]\n\n" if review_reasons else ""
+
+    # Withdrawal status note
+    withdrawal_note = ""
+    if withdrawal_date:
+        withdrawal_note = f"已撤回（{format_date(withdrawal_date)}）"
+
+    # Build markdown
+    md = f"""{review_prefix}---
 source_id: "{safe_source_id}"
 source_layer: "jp_fnfc"
 source_url: "{source_url}"
@@ -203,7 +142,7 @@ manufacturer: "{safe_company_name}"
 category: "{category}"
 product_form: "{product_form}"
 date_entered: "{safe_date_entered}"
-fetched_at: "{now}"
+fetched_at: "{context['now']}"
 ---
 
 # {product_name}
@@ -231,21 +170,30 @@ fetched_at: "{now}"
 {withdrawal_note if withdrawal_note else "（無特殊情況）"}
 """
 
-            # Sanitize filename
-            safe_id = re.sub(r'[^\w\-.]', '_', source_id)
-            filepath = os.path.join(OUTPUT_DIR, category, f"{safe_id}.md")
-            with open(filepath, "w", encoding="utf-8") as out:
-                out.write(md)
-
-            existing_ids.add(source_id)
-            stats["extracted"] += 1
-
-    print(f"\n━━━ jp_fnfc 萃取完成 ━━━")
-    print(f"  總行數：{stats['total']}")
-    print(f"  跳過（已存在）：{stats['skipped']}")
-    print(f"  新萃取：{stats['extracted']}")
-    print(f"  REVIEW_NEEDED：{stats['review_needed']}")
-    print(f"  錯誤：{stats['errors']}")
+    return {
+        "source_id": source_id,
+        "category": category,
+        "content": md,
+        "review_needed": bool(review_reasons),
+    }
+
+def process():
+    parser = argparse.ArgumentParser(description="jp_fnfc JSONL → Markdown 萃取")
+    extract_runtime.add_arguments(parser)
+    args = parser.parse_args()
+
+    jsonl_file = find_latest_jsonl()
+    if not jsonl_file:
+        print(f"JSONL not found in: {RAW_DIR}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"Processing: {jsonl_file}")
+
+    stats = extract_runtime.run(
+        "jp_fnfc", extract_runtime.read_jsonl(jsonl_file), build_document,
+        source_id_of=source_id_of, output_dir=OUTPUT_DIR, jobs=args.jobs, chunk_size=args.chunk_size,
+    )
+    extract_runtime.print_stats("jp_fnfc", stats)
 
 if __name__ == "__main__":
     process()
@@ -6,8 +6,11 @@
 
     若未指定 jsonl_file，自動尋找 raw/ 目錄下最新的 foshu-*.jsonl
 """
-import json, os, sys, re, glob
-from datetime import datetime, timezone
+import argparse, os, sys, re
+
+import extract_runtime
+from jsonl_io import latest_snapshot
+from rule_engine import KeywordRules
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 RAW_DIR = os.path.join(BASE_DIR, "docs/Extractor/jp_foshu/raw")
@@ -16,11 +19,7 @@ OUTPUT_DIR = os.path.join(BASE_DIR, "docs/Extractor/jp_foshu")
 
 def find_latest_jsonl():
     """Find the most recent JSONL file in raw directory"""
-    pattern = os.path.join(RAW_DIR, "foshu-*.jsonl")
-    files = glob.glob(pattern)
-    if not files:
-        return None
-    return max(files, key=os.path.getmtime)
+    return latest_snapshot(os.path.join(RAW_DIR, "foshu-*.jsonl"))
 
 
 SOURCE_URL = "https://www.caa.go.jp/policies/policy/food_labeling/foods_for_specified_health_uses/"
@@ -45,33 +44,19 @@ FORM_RULES = [
     (["ゼリー"], "gummy"),
 ]
 
+# 編譯後的規則（每個欄位一次掃描）
+CATEGORY_MATCHER = KeywordRules(CATEGORY_RULES)
+FORM_MATCHER = KeywordRules(FORM_RULES)
+
 def s(val):
     """Safely convert to string, handling None."""
     return str(val).strip() if val is not None else ""
 
 def infer_category(ingredient_str):
-    if not ingredient_str:
-        return "other"
-    matched_cats = set()
-    for keywords, cat in CATEGORY_RULES:
-        for kw in keywords:
-            if kw in ingredient_str:
-                matched_cats.add(cat)
-                break
-    if len(matched_cats) == 0:
-        return "other"
-    if len(matched_cats) == 1:
-        return matched_cats.pop()
-    return "specialty"  # 多成分複合
+    return CATEGORY_MATCHER.classify(ingredient_str)
 
 def infer_product_form(food_type_str):
-    if not food_type_str:
-        return "other"
-    for keywords, form in FORM_RULES:
-        for kw in keywords:
-            if kw in food_type_str:
-                return form
-    return "other"
+    return FORM_MATCHER.first(food_type_str)
 
 def check_review_needed(record):
     reasons = []
@@ -83,98 +68,48 @@ def check_review_needed(record):
         reasons.append("許可番号為空")
     return reasons
 
-def get_existing_source_ids():
-    ids = set()
-    for root, dirs, files in os.walk(OUTPUT_DIR):
-        if "raw" in root:
-            continue
-        for f in files:
-            if f.endswith(".md"):
-                path = os.path.join(root, f)
-                with open(path, "r", encoding="utf-8") as fh:
-                    for line in fh:
-                        if line.startswith("source_id:"):
-                            sid = line.split(":", 1)[1].strip().strip('"')
-                            ids.add(sid)
-                            break
-    return ids
-
-def process():
-    # 支援命令列參數或自動尋找最新檔案
-    if len(sys.argv) > 1:
-        jsonl_file = sys.argv[1]
-    else:
-        jsonl_file = find_latest_jsonl()
-
-    if not jsonl_file or not os.path.exists(jsonl_file):
-        print(f"JSONL not found in: {RAW_DIR}", file=sys.stderr)
-        sys.exit(1)
-
-    print(f"Processing: {jsonl_file}")
-
-    existing_ids = get_existing_source_ids()
-    now = datetime.now(timezone.utc).isoformat()
-    stats = {"total": 0, "skipped": 0, "extracted": 0, "review_needed": 0, "errors": 0}
-
-    with open(jsonl_file, "r", encoding="utf-8") as f:
-        for line_num, raw_line in enumerate(f, 1):
-            stats["total"] += 1
-            raw_line = raw_line.strip()
-            if not raw_line:
-                continue
-            try:
-                rec = json.loads(raw_line)
-            except json.JSONDecodeError as e:
-                print(f"  Line {line_num}: JSON parse error: {e}", file=sys.stderr)
-                stats["errors"] += 1
-                continue
-
-            source_id = str(rec.get("approval_no", "")).strip()
-            if not source_id:
-                source_id = str(rec.get("serial_no", "")).strip()
-
-            if source_id in existing_ids:
-                stats["skipped"] += 1
-                continue
-
-            product_name = s(rec.get("product_name"))
-            applicant = s(rec.get("applicant"))
-            corporate_no = s(rec.get("corporate_no"))
-            food_type = s(rec.get("food_type"))
-            functional_ingredient = s(rec.get("functional_ingredient"))
-            health_claim = s(rec.get("health_claim"))
-            precautions = s(rec.get("precautions"))
-            daily_intake = s(rec.get("daily_intake"))
-            foshu_category = s(rec.get("foshu_category"))
-            approval_date_raw = s(rec.get("approval_date"))
-            sales_record = s(rec.get("sales_record"))
-
-            # Date formatting
-            date_entered = approval_date_raw
-            if date_entered and not re.match(r"\d{4}-\d{2}-\d{2}", date_entered):
-                date_entered = date_entered  # keep as-is if not standard format
-
-            category = infer_category(functional_ingredient)
-            product_form = infer_product_form(food_type)
-
-            # Escape double quotes for YAML frontmatter
-            safe_source_id = source_id.replace('"', '\\"')
-            safe_product_name = product_name.replace('"', '\\"')
-            safe_applicant = applicant.replace('"', '\\"')
-            safe_date_entered = date_entered.replace('"', '\\"')
-
-            review_reasons = check_review_needed(rec)
-            review_prefix = ""
-            if review_reasons:
-                review_prefix = "[REVIEW_NEEDED]\n\n"
-                stats["review_needed"] += 1
-
-            # Ensure category directory exists
-            cat_dir = os.path.join(OUTPUT_DIR, category)
-            os.makedirs(cat_dir, exist_ok=True)
-
-            # Build markdown
-            md = f"""{review_prefix}---
+def source_id_of(rec, extra):
+    """紀錄的 source_id（extract_runtime 據此在產生文件前跳過既有產品）"""
+    source_id = str(rec.get("approval_no", "")).strip()
+    if not source_id:
+        source_id = str(rec.get("serial_no", "")).strip()
+    return source_id
+
+def build_document(rec, extra, context):
+    """單筆紀錄 → Markdown 文件（由 extract_runtime 呼叫）"""
+    source_id = source_id_of(rec, extra)
+
+    product_name = s(rec.get("product_name"))
+    applicant = s(rec.get("applicant"))
+    corporate_no = s(rec.get("corporate_no"))
+    food_type = s(rec.get("food_type"))
+    functional_ingredient = s(rec.get("functional_ingredient"))
+    health_claim = s(rec.get("health_claim"))
+    precautions = s(rec.get("precautions"))
+    daily_intake = s(rec.get("daily_intake"))
+    foshu_category = s(rec.get("foshu_category"))
+    approval_date_raw = s(rec.get("approval_date"))
+    sales_record = s(rec.get("sales_record"))
+
+    # Date formatting
+    date_entered = approval_date_raw
+    if date_entered and not re.match(r"\d{4}-\d{2}-\d{2}", date_entered):
+        date_entered = date_entered  # keep as-is if not standard format
+
+    category = infer_category(functional_ingredient)
+    product_form = infer_product_form(food_type)
+
+    # Escape double quotes for YAML frontmatter
+    safe_source_id = source_id.replace('"', '\\"')
+    safe_product_name = product_name.replace('"', '\\"')
+    safe_applicant = applicant.replace('"', '\\"')
+    safe_date_entered = date_entered.replace('"', '\\"')
+
+    review_reasons = check_review_needed(rec)
+    review_prefix = "[REVIEW_NEEDED]\n\n" if review_reasons else ""
+
+    # Build markdown
+    md = f"""{review_prefix}---
 source_id: "{safe_source_id}"
 source_layer: "jp_foshu"
 source_url: "{SOURCE_URL}"
@@ -185,7 +120,7 @@ manufacturer: "{safe_applicant}"
 category: "{category}"
 product_form: "{product_form}"
 date_entered: "{safe_date_entered}"
-fetched_at: "{now}"
+fetched_at: "{context['now']}"
 ---
 
 # {product_name}
@@ -215,21 +150,31 @@ fetched_at: "{now}"
 {f"銷售實績：{'有' if sales_record else '無資料'}" }
 """
 
-            # Sanitize filename
-            safe_id = re.sub(r'[^\w\-.]', '_', source_id)
-            filepath = os.path.join(cat_dir, f"{safe_id}.md")
-            with open(filepath, "w", encoding="utf-8") as out:
-                out.write(md)
-
-            existing_ids.add(source_id)
-            stats["extracted"] += 1
-
-    print(f"\n━━━ jp_foshu 萃取完成 ━━━")
-    print(f"  總行數：{stats['total']}")
-    print(f"  跳過（已存在）：{stats['skipped']}")
-    print(f"  新萃取：{stats['extracted']}")
-    print(f"  REVIEW_NEEDED：{stats['review_needed']}")
-    print(f"  錯誤：{stats['errors']}")
+    return {
+        "source_id": source_id,
+        "category": category,
+        "content": md,
+        "review_needed": bool(review_reasons),
+    }
+
+def process():
+    parser = argparse.ArgumentParser(description="jp_foshu JSONL → Markdown 萃取")
+    parser.add_argument("jsonl", nargs="?", help="JSONL 檔案路徑（預設使用 raw/ 下最新的 foshu-*.jsonl）")
+    extract_runtime.add_arguments(parser)
+    args = parser.parse_args()
+
+    jsonl_file = args.jsonl or find_latest_jsonl()
+    if not jsonl_file or not os.path.exists(jsonl_file):
+        print(f"JSONL not found in: {RAW_DIR}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"Processing: {jsonl_file}")
+
+    stats = extract_runtime.run(
+        "jp_foshu", extract_runtime.read_jsonl(jsonl_file), build_document,
+        source_id_of=source_id_of, output_dir=OUTPUT_DIR, jobs=args.jobs, chunk_size=args.chunk_size,
+    )
+    extract_runtime.print_stats("jp_foshu", stats)
 
 if __name__ == "__main__":
     process()
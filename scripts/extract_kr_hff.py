@@ -7,9 +7,13 @@ kr_hff 萃取腳本 — 依據 Layer CLAUDE.md 規則將 JSONL 轉換為 .md 檔
   python3 extract_kr_hff.py <jsonl_file>       # 指定 JSONL 檔案
   python3 extract_kr_hff.py --delta <jsonl>    # Delta 模式（自動 force）
   python3 extract_kr_hff.py --force            # 強制覆蓋已存在的檔案
+  python3 extract_kr_hff.py --jobs 8           # 指定平行行程數
 """
-import json, os, sys, re, argparse
-from datetime import datetime, timezone
+import os, sys, argparse
+
+import extract_runtime
+from jsonl_io import find_snapshots
+from rule_engine import KeywordRules
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 OUTPUT_DIR = os.path.join(BASE_DIR, "docs/Extractor/kr_hff")
@@ -37,33 +41,19 @@ FORM_RULES = [
     (["젤리"], "gummy"),
 ]
 
+# 編譯後的規則（每個欄位一次掃描）
+CATEGORY_MATCHER = KeywordRules(CATEGORY_RULES)
+FORM_MATCHER = KeywordRules(FORM_RULES)
+
 def s(val):
     """Safely convert to string, handling None."""
     return str(val).strip() if val is not None else ""
 
 def infer_category(main_fnctn):
-    if not main_fnctn:
-        return "other"
-    matched_cats = set()
-    for keywords, cat in CATEGORY_RULES:
-        for kw in keywords:
-            if kw in main_fnctn:
-                matched_cats.add(cat)
-                break
-    if len(matched_cats) == 0:
-        return "other"
-    if len(matched_cats) == 1:
-        return matched_cats.pop()
-    return "specialty"
+    return CATEGORY_MATCHER.classify(main_fnctn)
 
 def infer_product_form(sungsang):
-    if not sungsang:
-        return "other"
-    for keywords, form in FORM_RULES:
-        for kw in keywords:
-            if kw in sungsang:
-                return form
-    return "other"
+    return FORM_MATCHER.first(sungsang)
 
 def check_review_needed(item):
     reasons = []
@@ -73,22 +63,6 @@ def check_review_needed(item):
         reasons.append("MAIN_FNCTN 為空")
     return reasons
 
-def get_existing_source_ids():
-    ids = set()
-    for root, dirs, files in os.walk(OUTPUT_DIR):
-        if "raw" in root:
-            continue
-        for f in files:
-            if f.endswith(".md"):
-                path = os.path.join(root, f)
-                with open(path, "r", encoding="utf-8") as fh:
-                    for line in fh:
-                        if line.startswith("source_id:"):
-                            sid = line.split(":", 1)[1].strip().strip('"')
-                            ids.add(sid)
-                            break
-    return ids
-
 def resolve_jsonl_file(jsonl_arg):
     """Resolve the JSONL file path from argument or latest.jsonl symlink"""
     if jsonl_arg:
@@ -96,84 +70,47 @@ def resolve_jsonl_file(jsonl_arg):
     if os.path.islink(LATEST_LINK) and os.path.exists(LATEST_LINK):
         return os.path.realpath(LATEST_LINK)
     # Fallback: find most recent hff-*.jsonl
-    jsonl_files = sorted(
-        [f for f in os.listdir(RAW_DIR) if f.startswith("hff-") and f.endswith(".jsonl")],
-        reverse=True
-    )
+    jsonl_files = find_snapshots(os.path.join(RAW_DIR, "hff-*.jsonl"))
     if jsonl_files:
-        return os.path.join(RAW_DIR, jsonl_files[0])
+        return jsonl_files[-1]
     return None
 
-def process(jsonl_file, force=False):
-    if not os.path.exists(jsonl_file):
-        print(f"JSONL not found: {jsonl_file}", file=sys.stderr)
-        sys.exit(1)
-
-    print(f"📂 JSONL 檔案：{jsonl_file}")
-    print(f"📁 輸出目錄：{OUTPUT_DIR}")
-    print(f"🔄 強制覆蓋：{'是' if force else '否'}")
-    print()
-
-    existing_ids = set() if force else get_existing_source_ids()
-    if not force:
-        print(f"📊 既有 .md 檔案：{len(existing_ids)} 筆")
-
-    now = datetime.now(timezone.utc).isoformat()
-    stats = {"total": 0, "skipped": 0, "extracted": 0, "review_needed": 0, "errors": 0}
-
-    with open(jsonl_file, "r", encoding="utf-8", errors="replace") as f:
-        for line_num, raw_line in enumerate(f, 1):
-            stats["total"] += 1
-            raw_line = raw_line.strip()
-            if not raw_line:
-                continue
-            try:
-                rec = json.loads(raw_line)
-            except json.JSONDecodeError as e:
-                print(f"  Line {line_num}: JSON parse error: {e}", file=sys.stderr)
-                stats["errors"] += 1
-                continue
-
-            item = rec.get("item", rec)  # kr_hff wraps data in "item"
-
-            source_id = str(item.get("STTEMNT_NO", "")).strip()
-            if not source_id:
-                stats["errors"] += 1
-                continue
-
-            if not force and source_id in existing_ids:
-                stats["skipped"] += 1
-                continue
-
-            product_name = s(item.get("PRDUCT"))
-            entrps = s(item.get("ENTRPS"))
-            regist_dt = s(item.get("REGIST_DT"))
-            distb_pd = s(item.get("DISTB_PD"))
-            sungsang = s(item.get("SUNGSANG"))
-            srv_use = s(item.get("SRV_USE"))
-            main_fnctn = s(item.get("MAIN_FNCTN"))
-            intake_hint1 = s(item.get("INTAKE_HINT1"))
-            base_standard = s(item.get("BASE_STANDARD"))
-
-            category = infer_category(main_fnctn)
-            product_form = infer_product_form(sungsang)
-
-            # Escape double quotes for YAML frontmatter
-            safe_source_id = source_id.replace('"', '\\"')
-            safe_product_name = product_name.replace('"', '\\"')
-            safe_entrps = entrps.replace('"', '\\"')
-            safe_regist_dt = regist_dt.replace('"', '\\"')
-
-            review_reasons = check_review_needed(item)
-            review_prefix = ""
-            if review_reasons:
-                review_prefix = "[REVIEW_NEEDED]\n\n"
-                stats["review_needed"] += 1
-
-            cat_dir = os.path.join(OUTPUT_DIR, category)
-            os.makedirs(cat_dir, exist_ok=True)
-
-            md = f"""{review_prefix}---
+def source_id_of(rec, extra):
+    """紀錄的 source_id（extract_runtime 據此在產生文件前跳過既有產品）"""
+    item = rec.get("item", rec)  # kr_hff wraps data in "item"
+    return str(item.get("STTEMNT_NO", "")).strip()
+
+def build_document(rec, extra, context):
+    """單筆紀錄 → Markdown 文件（由 extract_runtime 呼叫）"""
+    item = rec.get("item", rec)  # kr_hff wraps data in "item"
+
+    source_id = source_id_of(rec, extra)
+    if not source_id:
+        return None
+
+    product_name = s(item.get("PRDUCT"))
+    entrps = s(item.get("ENTRPS"))
+    regist_dt = s(item.get("REGIST_DT"))
+    distb_pd = s(item.get("DISTB_PD"))
+    sungsang = s(item.get("SUNGSANG"))
+    srv_use = s(item.get("SRV_USE"))
+    main_fnctn = s(item.get("MAIN_FNCTN"))
+    intake_hint1 = s(item.get("INTAKE_HINT1"))
+    base_standard = s(item.get("BASE_STANDARD"))
+
+    category = infer_category(main_fnctn)
+    product_form = infer_product_form(sungsang)
+
+    # Escape double quotes for YAML frontmatter
+    safe_source_id = source_id.replace('"', '\\"')
+    safe_product_name = product_name.replace('"', '\\"')
+    safe_entrps = entrps.replace('"', '\\"')
+    safe_regist_dt = regist_dt.replace('"', '\\"')
+
+    review_reasons = check_review_needed(item)
+    review_prefix = "[REVIEW_NEEDED]\n\n" if review_reasons else ""
+
+    md = f"""{review_prefix}---
 source_id: "{safe_source_id}"
 source_layer: "kr_hff"
 source_url: "{SOURCE_URL}"
@@ -184,7 +121,7 @@ manufacturer: "{safe_entrps}"
 category: "{category}"
 product_form: "{product_form}"
 date_entered: "{safe_regist_dt}"
-fetched_at: "{now}"
+fetched_at: "{context['now']}"
 ---
 
 # {product_name}
@@ -212,29 +149,35 @@ fetched_at: "{now}"
 {f"流通期限：{distb_pd}" if distb_pd else "（無流通期限資訊）"}
 """
 
-            safe_id = re.sub(r'[^\w\-.]', '_', source_id)
-            filepath = os.path.join(cat_dir, f"{safe_id}.md")
-            with open(filepath, "w", encoding="utf-8") as out:
-                out.write(md)
+    return {
+        "source_id": source_id,
+        "category": category,
+        "content": md,
+        "review_needed": bool(review_reasons),
+    }
 
-            existing_ids.add(source_id)
-            stats["extracted"] += 1
+def process(jsonl_file, force=False, jobs=1, chunk_size=extract_runtime.DEFAULT_CHUNK_SIZE):
+    if not os.path.exists(jsonl_file):
+        print(f"JSONL not found: {jsonl_file}", file=sys.stderr)
+        sys.exit(1)
 
-            if stats["extracted"] % 1000 == 0:
-                print(f"  進度：{stats['extracted']} 筆已萃取...")
+    print(f"📂 JSONL 檔案：{jsonl_file}")
+    print(f"📁 輸出目錄：{OUTPUT_DIR}")
+    print(f"🔄 強制覆蓋：{'是' if force else '否'}")
+    print()
 
-    print(f"\n━━━ kr_hff 萃取完成 ━━━")
-    print(f"  總行數：{stats['total']}")
-    print(f"  跳過（已存在）：{stats['skipped']}")
-    print(f"  新萃取：{stats['extracted']}")
-    print(f"  REVIEW_NEEDED：{stats['review_needed']}")
-    print(f"  錯誤：{stats['errors']}")
+    stats = extract_runtime.run(
+        "kr_hff", extract_runtime.read_jsonl(jsonl_file, errors="replace"), build_document,
+        source_id_of=source_id_of, output_dir=OUTPUT_DIR, force=force, jobs=jobs, chunk_size=chunk_size,
+    )
+    extract_runtime.print_stats("kr_hff", stats)
 
 def main():
     parser = argparse.ArgumentParser(description="kr_hff JSONL → Markdown 萃取")
     parser.add_argument("jsonl", nargs="?", help="JSONL 檔案路徑（預設使用 latest.jsonl）")
     parser.add_argument("-f", "--force", action="store_true", help="強制覆蓋已存在的檔案")
     parser.add_argument("-d", "--delta", action="store_true", help="Delta 模式（自動啟用 --force）")
+    extract_runtime.add_arguments(parser)
     args = parser.parse_args()
 
     force = args.force or args.delta
@@ -245,7 +188,7 @@ def main():
         print("   請指定檔案路徑或確認 raw/latest.jsonl 存在", file=sys.stderr)
         sys.exit(1)
 
-    process(jsonl_file, force=force)
+    process(jsonl_file, force=force, jobs=args.jobs, chunk_size=args.chunk_size)
 
 if __name__ == "__main__":
     main()
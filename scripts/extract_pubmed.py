@@ -4,10 +4,11 @@ import json
 import os
 import sys
 import re
-import glob
 import argparse
 from datetime import datetime, timezone
 
+from jsonl_io import find_snapshots, open_jsonl, strip_suffix
+
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 RAW_DIR = os.path.join(BASE_DIR, "docs/Extractor/pubmed/raw")
 OUTPUT_DIR = os.path.join(BASE_DIR, "docs/Extractor/pubmed")
@@ -159,7 +160,7 @@ def find_jsonl_files(topic_id: str = None) -> list:
     else:
         pattern = os.path.join(RAW_DIR, "*.jsonl")
 
-    files = glob.glob(pattern)
+    files = find_snapshots(pattern)
     return sorted(files, key=os.path.getmtime, reverse=True)
 
 
@@ -170,8 +171,8 @@ def process_file(jsonl_file: str, force: bool = False) -> dict:
 
     # 從檔名取得 topic_id（格式：{topic_id}-YYYY-MM.jsonl）
     basename = os.path.basename(jsonl_file)
-    # 移除 .jsonl 和日期部分 (YYYY-MM)
-    name_without_ext = basename.replace(".jsonl", "")
+    # 移除 .jsonl(.zst) 和日期部分 (YYYY-MM)
+    name_without_ext = strip_suffix(basename)
     # 日期格式是 YYYY-MM，所以移除最後兩個用 - 分隔的部分
     parts = name_without_ext.rsplit("-", 2)
     if len(parts) >= 3 and parts[-2].isdigit() and parts[-1].isdigit():
@@ -186,7 +187,7 @@ def process_file(jsonl_file: str, force: bool = False) -> dict:
     # 取得已存在的 ID
     existing_ids = get_existing_source_ids(topic_id) if not force else set()
 
-    with open(jsonl_file, "r", encoding="utf-8") as f:
+    with open_jsonl(jsonl_file) as f:
         for line_num, raw_line in enumerate(f, 1):
             stats["total"] += 1
             raw_line = raw_line.strip()
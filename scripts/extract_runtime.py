@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+"""
+產品 Layer 萃取共用執行環境
+
+各 Layer 的 extract_*.py 只提供「紀錄 → 文件」函式（build）與選用的
+「紀錄 → source_id」函式（source_id_of），
+讀檔、平行化、去重、寫檔與統計都在這裡處理：
+
+- 分塊平行：JSONL 行以 chunk 為單位送入行程池解析與產生 Markdown，
+  經有上限的重排緩衝區依原始順序回收，結果與行程數無關
+- 既有產品：一般模式下，Layer 提供 source_id_of 時工作行程在產生文件前
+  即跳過已存在的產品（只解析 JSON，不產生 Markdown）
+- 重複 source_id：一般模式依檔案順序只寫第一筆；--force/--delta 每筆都寫出，
+  同一 source_id 以最後一筆為準（與原本各 Layer 的覆蓋行為相同）
+- 目錄建立：每個品類（或分片）目錄只建立一次
+- 輸出路徑：依 Layer 的目錄配置（product_layout，flat 或 sharded）決定
+- 緩衝寫入：文件在工作行程編碼為位元組，主行程以單次寫入落檔
+- manifest：.cache/extract_manifest/{layer}.json 記錄每個 .md 的
+  source_id 與 mtime/size，判斷既有產品時只需列目錄，變動的檔案才重讀
+- 統一統計與輸出格式
+
+source_id_of(record, extra) 回傳紀錄的 source_id（須與 build 回傳的相同）；
+回傳空值時交由 build 處理（例如缺少 ID 或會被略過的紀錄）。
+
+build(record, extra, context) 的回傳值：
+- {"source_id", "category", "content", "review_needed"[, "filename", "flags"]}：寫出文件
+- {"skip": "原因"}：略過（計入「跳過（原因）」）
+- {"error": "訊息"} 或 None：錯誤
+
+用法（在 extract_*.py 中）：
+    import extract_runtime
+
+    def source_id_of(rec, extra):
+        return str(rec.get("id", "")).strip()
+
+    def build_document(rec, extra, context):
+        sid = source_id_of(rec, extra)
+        ...
+        return {"source_id": sid, "category": cat, "content": md, "review_needed": False}
+
+    stats = extract_runtime.run(
+        "kr_hff", extract_runtime.read_jsonl(jsonl_file), build_document,
+        source_id_of=source_id_of, force=args.force, jobs=args.jobs, chunk_size=args.chunk_size,
+    )
+    extract_runtime.print_stats("kr_hff", stats)
+"""
+
+import json
+import os
+import re
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime, timezone
+from itertools import islice
+from pathlib import Path
+
+from jsonl_io import open_jsonl
+from product_layout import Layout
+
+
+# 路徑配置
+PROJECT_ROOT = Path(__file__).parent.parent
+EXTRACTOR_DIR = PROJECT_ROOT / "docs" / "Extractor"
+MANIFEST_DIR = PROJECT_ROOT / ".cache" / "extract_manifest"
+
+# manifest 格式變更時遞增
+MANIFEST_VERSION = 1
+
+# 每個 chunk 的行數
+DEFAULT_CHUNK_SIZE = 500
+
+# 進度回報間隔（筆）
+PROGRESS_INTERVAL = 1000
+
+UNSAFE_FILENAME_RE = re.compile(r"[^\w\-.]")
+
+
+def default_jobs() -> int:
+    return os.cpu_count() or 1
+
+
+def safe_filename(source_id: str) -> str:
+    """source_id → 檔名（特殊字元替換為底線）"""
+    return UNSAFE_FILENAME_RE.sub("_", source_id) + ".md"
+
+
+def utc_now() -> str:
+    """fetched_at 時間戳（每次執行取一次，傳給 build 的 context）"""
+    return datetime.now(timezone.utc).isoformat()
+
+
+def read_source_id(path) -> str:
+    """讀取 .md 檔 frontmatter 的 source_id；找不到時回傳 None"""
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            for line in fh:
+                if line.startswith("source_id:"):
+                    return line.split(":", 1)[1].strip().strip('"')
+    except (OSError, UnicodeDecodeError):
+        pass
+    return None
+
+
+def iter_markdown_files(output_dir: Path):
+    """逐一產出 (相對路徑, DirEntry)；略過 raw/ 目錄"""
+    for root, dirs, _ in os.walk(output_dir):
+        dirs[:] = sorted(d for d in dirs if d != "raw")
+        with os.scandir(root) as entries:
+            for entry in entries:
+                if entry.name.endswith(".md") and entry.is_file():
+                    yield os.path.relpath(entry.path, output_dir), entry
+
+
+def read_jsonl(path, errors: str = "strict"):
+    """依檔案順序產出 (行號, 原始行, None)，供 run() 使用"""
+    with open_jsonl(path, errors=errors) as f:
+        for line_num, line in enumerate(f, 1):
+            yield line_num, line, None
+
+
+# ==========================================================
+# manifest
+# ==========================================================
+
+class Manifest:
+    """Layer 輸出檔的 source_id 快取（相對路徑 → (source_id, mtime_ns, size)）"""
+
+    def __init__(self, layer: str, output_dir: Path):
+        self.layer = layer
+        self.output_dir = Path(output_dir)
+        self.path = MANIFEST_DIR / f"{layer}.json"
+        self.files = {}
+        self.dirty = False
+
+    @classmethod
+    def load(cls, layer: str, output_dir: Path) -> "Manifest":
+        """載入 manifest；不存在或版本不符時回傳空 manifest"""
+        manifest = cls(layer, output_dir)
+        try:
+            with open(manifest.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return manifest
+        if data.get("version") == MANIFEST_VERSION:
+            manifest.files = {rel: tuple(info) for rel, info in data.get("files", {}).items()}
+        return manifest
+
+    def save(self):
+        """寫入 manifest（先寫暫存檔再替換）"""
+        if not self.dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "files": self.files}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+    def scan(self) -> set:
+        """列出輸出目錄，回傳既有產品的 source_id
+
+        mtime/size 與 manifest 相同的檔案直接採用記錄，其餘才讀取 frontmatter；
+        已不存在的檔案自 manifest 移除。
+        """
+        ids = set()
+        seen = set()
+        for rel_path, entry in iter_markdown_files(self.output_dir):
+            seen.add(rel_path)
+            st = entry.stat()
+            cached = self.files.get(rel_path)
+            if cached and cached[1] == st.st_mtime_ns and cached[2] == st.st_size:
+                source_id = cached[0]
+            else:
+                source_id = read_source_id(entry.path)
+                self.files[rel_path] = (source_id, st.st_mtime_ns, st.st_size)
+                self.dirty = True
+            if source_id:
+                ids.add(source_id)
+
+        for rel_path in list(self.files):
+            if rel_path not in seen:
+                del self.files[rel_path]
+                self.dirty = True
+        return ids
+
+    def record(self, rel_path: str, source_id: str, path: str):
+        st = os.stat(path)
+        self.files[rel_path] = (source_id, st.st_mtime_ns, st.st_size)
+        self.dirty = True
+
+
+# ==========================================================
+# 平行處理
+# ==========================================================
+
+_build = None
+_context = None
+_source_id_of = None
+_existing = frozenset()
+
+
+def _init_worker(build, context, source_id_of=None, existing=frozenset()):
+    global _build, _context, _source_id_of, _existing
+    _build, _context = build, context
+    _source_id_of, _existing = source_id_of, existing
+
+
+def _build_one(line_num: int, line: str, extra):
+    """單行 → (行號, 種類, 內容)；種類為 blank / error / skip / exists / doc"""
+    if not line.strip():
+        return line_num, "blank", None
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError as e:
+        return line_num, "error", f"JSON parse error: {e}"
+
+    # 既有產品在產生文件前跳過
+    if _existing and _source_id_of is not None and _source_id_of(record, extra) in _existing:
+        return line_num, "exists", None
+
+    doc = _build(record, extra, _context)
+    if not doc:
+        return line_num, "error", None
+    if "error" in doc:
+        return line_num, "error", doc["error"]
+    if "skip" in doc:
+        return line_num, "skip", doc["skip"]
+
+    source_id = doc["source_id"]
+    return line_num, "doc", (
+        source_id,
+        doc["category"],
+        doc.get("filename") or safe_filename(source_id),
+        doc["content"].encode("utf-8"),
+        bool(doc.get("review_needed")),
+        tuple(doc.get("flags", ())),
+    )
+
+
+def _build_chunk(task):
+    index, chunk = task
+    return index, [_build_one(*row) for row in chunk]
+
+
+def _iter_chunks(records, chunk_size: int):
+    records = iter(records)
+    index = 0
+    while True:
+        chunk = list(islice(records, chunk_size))
+        if not chunk:
+            return
+        yield index, chunk
+        index += 1
+
+
+def iter_built(records, build, context=None, jobs: int = 1, chunk_size: int = DEFAULT_CHUNK_SIZE,
+               source_id_of=None, existing=frozenset()):
+    """依原始順序產出 _build_one 的結果
+
+    source_id 屬於 existing 的紀錄不呼叫 build，以種類 exists 產出。
+    最多 jobs × 4 個 chunk 同時處於執行中或等待回收，
+    先完成的 chunk 暫存在重排緩衝區，直到前面的 chunk 都已產出。
+    """
+    chunks = _iter_chunks(records, chunk_size)
+    initargs = (build, context, source_id_of, existing)
+    if jobs <= 1:
+        _init_worker(*initargs)
+        for task in chunks:
+            yield from _build_chunk(task)[1]
+        return
+
+    max_pending = jobs * 4
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                             initargs=initargs) as executor:
+        running = set()
+        buffer = {}
+        submitted = 0
+        next_yield = 0
+        exhausted = False
+        while True:
+            while not exhausted and submitted - next_yield < max_pending:
+                task = next(chunks, None)
+                if task is None:
+                    exhausted = True
+                    break
+                running.add(executor.submit(_build_chunk, task))
+                submitted += 1
+
+            if next_yield >= submitted:
+                return
+
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, results = future.result()
+                buffer[index] = results
+
+            while next_yield in buffer:
+                yield from buffer.pop(next_yield)
+                next_yield += 1
+
+
+# ==========================================================
+# 執行
+# ==========================================================
+
+def add_arguments(parser):
+    """加入共用的平行化參數（--jobs、--chunk-size）"""
+    parser.add_argument("-j", "--jobs", type=int, default=default_jobs(),
+                        help="平行行程數（預設 CPU 核心數，1 為單行程）")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"每個工作單位的行數（預設 {DEFAULT_CHUNK_SIZE}）")
+
+
+def new_stats() -> dict:
+    return {
+        "total": 0,
+        "skipped": 0,
+        "filtered": {},       # 原因 → 筆數
+        "extracted": 0,
+        "updated": 0,         # 覆蓋既有檔案
+        "review_needed": 0,
+        "errors": 0,
+        "by_category": {},
+        "flags": {},          # build 回傳的 flags 計數
+    }
+
+
+def run(layer: str, records, build, *, source_id_of=None, output_dir=None, force: bool = False,
+        context: dict = None, jobs: int = 1, chunk_size: int = DEFAULT_CHUNK_SIZE) -> dict:
+    """執行萃取並回傳統計
+
+    Args:
+        layer: Layer 名稱（決定預設輸出目錄與 manifest）
+        records: (行號, 原始行, extra) 的可迭代物件，extra 原樣傳給 build
+        build: build(record, extra, context) → 文件 dict（須為模組層級函式）
+        source_id_of: source_id_of(record, extra) → source_id（選用，須為模組層級函式）；
+            提供時一般模式在 build 前跳過既有產品
+        output_dir: 輸出目錄（預設 docs/Extractor/{layer}）
+        force: 覆蓋已存在的產品；重複的 source_id 每筆都寫出（最後一筆為準）
+        context: 傳給 build 的共用參數（預設含 fetched_at 時間戳）
+        jobs: 平行行程數
+        chunk_size: 每個工作單位的行數
+    """
+    output_dir = Path(output_dir) if output_dir else EXTRACTOR_DIR / layer
+    context = {"now": utc_now(), **(context or {})}
+    jobs = max(1, jobs)
+    chunk_size = max(1, chunk_size)
+
+    layout = Layout.load(output_dir)
+    manifest = Manifest.load(layer, output_dir)
+    if force:
+        existing = frozenset()
+    else:
+        existing = frozenset(manifest.scan())
+        print(f"📊 既有 .md 檔案：{len(existing)} 筆")
+    # 一般模式：本次已寫出的 source_id（重複時保留第一筆）
+    written = set()
+    print(f"⚙️  行程數：{jobs}，每單位 {chunk_size} 行，目錄配置：{layout.describe()}")
+
+    stats = new_stats()
+    created_dirs = set()
+    try:
+        for line_num, kind, payload in iter_built(records, build, context, jobs, chunk_size,
+                                                  source_id_of, existing):
+            stats["total"] += 1
+            if kind == "blank":
+                continue
+            if kind == "exists":
+                stats["skipped"] += 1
+                continue
+            if kind == "error":
+                stats["errors"] += 1
+                if payload:
+                    print(f"  Line {line_num}: {payload}", file=sys.stderr)
+                continue
+            if kind == "skip":
+                stats["filtered"][payload] = stats["filtered"].get(payload, 0) + 1
+                continue
+
+            source_id, category, filename, content, review_needed, flags = payload
+            if not force:
+                if source_id in existing or source_id in written:
+                    stats["skipped"] += 1
+                    continue
+                written.add(source_id)
+
+            rel_path = layout.rel_path(category, filename)
+            path = os.path.join(output_dir, rel_path)
+            parent = os.path.dirname(path)
+            if parent not in created_dirs:
+                os.makedirs(parent, exist_ok=True)
+                created_dirs.add(parent)
+            existed = force and os.path.exists(path)
+            with open(path, "wb") as out:
+                out.write(content)
+            manifest.record(rel_path, source_id, path)
+
+            if existed:
+                stats["updated"] += 1
+            else:
+                stats["extracted"] += 1
+                if stats["extracted"] % PROGRESS_INTERVAL == 0:
+                    print(f"  進度：{stats['extracted']} 筆已萃取...")
+            stats["by_category"][category] = stats["by_category"].get(category, 0) + 1
+            if review_needed:
+                stats["review_needed"] += 1
+            for flag in flags:
+                stats["flags"][flag] = stats["flags"].get(flag, 0) + 1
+    finally:
+        manifest.save()
+    return stats
+
+
+def print_stats(layer: str, stats: dict):
+    """輸出統一格式的萃取統計"""
+    print(f"\n━━━ {layer} 萃取完成 ━━━")
+    print(f"  總行數：{stats['total']}")
+    for reason, count in stats["filtered"].items():
+        print(f"  跳過（{reason}）：{count}")
+    print(f"  跳過（已存在）：{stats['skipped']}")
+    print(f"  新萃取：{stats['extracted']}")
+    if stats["updated"]:
+        print(f"  更新覆蓋：{stats['updated']}")
+    print(f"  REVIEW_NEEDED：{stats['review_needed']}")
+    print(f"  錯誤：{stats['errors']}")
+    if stats["by_category"]:
+        print("  分類統計：")
+        for category, count in sorted(stats["by_category"].items()):
+            print(f"    - {category}: {count}")
@@ -7,9 +7,13 @@ us_dsld 萃取腳本 — 依據 Layer CLAUDE.md 規則將 JSONL 轉換為 .md 
   python3 extract_us_dsld.py <jsonl_file>       # 指定 JSONL 檔案
   python3 extract_us_dsld.py --delta <jsonl>    # Delta 模式（自動 force）
   python3 extract_us_dsld.py --force            # 強制覆蓋已存在的檔案
+  python3 extract_us_dsld.py --jobs 8           # 指定平行行程數
 """
-import json, os, sys, re, argparse
-from datetime import datetime, timezone
+import os, sys, argparse
+
+import extract_runtime
+from jsonl_io import find_snapshots
+from rule_engine import KeywordRules
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 OUTPUT_DIR = os.path.join(BASE_DIR, "docs/Extractor/us_dsld")
@@ -50,6 +54,12 @@ INGREDIENT_CATEGORY_HINTS = {
     "omega_fatty_acids": ["omega", "fish oil", "dha", "epa", "fatty acid"],
 }
 
+# 編譯後的規則（FORM_MAP 依序比對，第一個命中者為準）
+FORM_RULES = [([keyword], form) for keyword, form in FORM_MAP.items()]
+FORM_MATCHER = KeywordRules(FORM_RULES)
+INGREDIENT_HINT_RULES = [(hints, cat) for cat, hints in INGREDIENT_CATEGORY_HINTS.items()]
+HINT_MATCHER = KeywordRules(INGREDIENT_HINT_RULES)
+
 def s(val):
     """Safely convert to string, handling None."""
     return str(val).strip() if val is not None else ""
@@ -72,25 +82,20 @@ def infer_product_form(physical_state):
         desc = physical_state.get("langualCodeDescription", "")
     elif isinstance(physical_state, list) and physical_state:
         desc = physical_state[0].get("langualCodeDescription", "")
-    desc_lower = desc.lower()
-    for keyword, form in FORM_MAP.items():
-        if keyword in desc_lower:
-            return form
-    return "other"
+    return FORM_MATCHER.first(desc.lower())
+
+def ingredient_hint_text(ingredients):
+    """成分群組與名稱合併為小寫字串（供 rule #4 比對）"""
+    return " ".join(
+        ((i.get("ingredientGroup") or "") + " " + (i.get("name") or "")).lower()
+        for i in ingredients if isinstance(i, dict)
+    )
 
 def check_should_be_different_category(category, ingredients):
     """REVIEW_NEEDED rule #4: other category but ingredients suggest otherwise"""
     if category != "other" or not ingredients:
         return False
-    ing_text = " ".join(
-        ((i.get("ingredientGroup") or "") + " " + (i.get("name") or "")).lower()
-        for i in ingredients if isinstance(i, dict)
-    )
-    for cat, hints in INGREDIENT_CATEGORY_HINTS.items():
-        for hint in hints:
-            if hint in ing_text:
-                return True
-    return False
+    return HINT_MATCHER.any(ingredient_hint_text(ingredients))
 
 def check_review_needed(rec, category):
     reasons = []
@@ -105,22 +110,6 @@ def check_review_needed(rec, category):
         reasons.append("category=other 但成分顯示應歸入其他分類")
     return reasons
 
-def get_existing_source_ids():
-    ids = set()
-    for root, dirs, files in os.walk(OUTPUT_DIR):
-        if "raw" in root:
-            continue
-        for f in files:
-            if f.endswith(".md"):
-                path = os.path.join(root, f)
-                with open(path, "r", encoding="utf-8") as fh:
-                    for line in fh:
-                        if line.startswith("source_id:"):
-                            sid = line.split(":", 1)[1].strip().strip('"')
-                            ids.add(sid)
-                            break
-    return ids
-
 def format_ingredients(ingredients):
     if not ingredients or not isinstance(ingredients, list):
         return "（無成分資料）"
@@ -167,88 +156,50 @@ def resolve_jsonl_file(jsonl_arg):
     if os.path.islink(LATEST_LINK) and os.path.exists(LATEST_LINK):
         return os.path.realpath(LATEST_LINK)
     # Fallback: find most recent dsld-*.jsonl
-    jsonl_files = sorted(
-        [f for f in os.listdir(RAW_DIR) if f.startswith("dsld-") and f.endswith(".jsonl")],
-        reverse=True
-    )
+    jsonl_files = find_snapshots(os.path.join(RAW_DIR, "dsld-*.jsonl"))
     if jsonl_files:
-        return os.path.join(RAW_DIR, jsonl_files[0])
+        return jsonl_files[-1]
     return None
 
-def process(jsonl_file, force=False):
-    if not os.path.exists(jsonl_file):
-        print(f"JSONL not found: {jsonl_file}", file=sys.stderr)
-        sys.exit(1)
+def source_id_of(rec, extra):
+    """紀錄的 source_id（extract_runtime 據此在產生文件前跳過既有產品）"""
+    return str(rec.get("dsld_id", "")).strip()
+
+def build_document(rec, extra, context):
+    """單筆紀錄 → Markdown 文件（由 extract_runtime 呼叫）"""
+    source_id = source_id_of(rec, extra)
+    if not source_id:
+        return None
+
+    full_name = s(rec.get("fullName"))
+    brand_name = s(rec.get("brandName"))
+    entry_date = s(rec.get("entryDate"))
+    off_market = rec.get("offMarket", 0)
+    market_status = "Off Market" if off_market else "On Market"
+    net_contents = rec.get("netContents", [])
+    ingredients = rec.get("allIngredients", [])
+    claims_data = rec.get("claims", [])
+    product_type = rec.get("productType")
+    physical_state = rec.get("physicalState")
 
-    print(f"📂 JSONL 檔案：{jsonl_file}")
-    print(f"📁 輸出目錄：{OUTPUT_DIR}")
-    print(f"🔄 強制覆蓋：{'是' if force else '否'}")
-    print()
+    category = infer_category(product_type)
+    if category is None:
+        category = "other"
+    product_form = infer_product_form(physical_state)
 
-    existing_ids = set() if force else get_existing_source_ids()
-    if not force:
-        print(f"📊 既有 .md 檔案：{len(existing_ids)} 筆")
-
-    now = datetime.now(timezone.utc).isoformat()
-    stats = {"total": 0, "skipped": 0, "extracted": 0, "review_needed": 0, "errors": 0}
-
-    with open(jsonl_file, "r", encoding="utf-8") as f:
-        for line_num, raw_line in enumerate(f, 1):
-            stats["total"] += 1
-            raw_line = raw_line.strip()
-            if not raw_line:
-                continue
-            try:
-                rec = json.loads(raw_line)
-            except json.JSONDecodeError as e:
-                print(f"  Line {line_num}: JSON parse error: {e}", file=sys.stderr)
-                stats["errors"] += 1
-                continue
-
-            source_id = str(rec.get("dsld_id", "")).strip()
-            if not source_id:
-                stats["errors"] += 1
-                continue
-
-            if not force and source_id in existing_ids:
-                stats["skipped"] += 1
-                continue
-
-            full_name = s(rec.get("fullName"))
-            brand_name = s(rec.get("brandName"))
-            entry_date = s(rec.get("entryDate"))
-            off_market = rec.get("offMarket", 0)
-            market_status = "Off Market" if off_market else "On Market"
-            net_contents = rec.get("netContents", [])
-            ingredients = rec.get("allIngredients", [])
-            claims_data = rec.get("claims", [])
-            product_type = rec.get("productType")
-            physical_state = rec.get("physicalState")
-
-            category = infer_category(product_type)
-            if category is None:
-                category = "other"
-            product_form = infer_product_form(physical_state)
-
-            review_reasons = check_review_needed(rec, category)
-            review_prefix = ""
-            if review_reasons:
-                review_prefix = "[REVIEW_NEEDED]\n\n"
-                stats["review_needed"] += 1
-
-            cat_dir = os.path.join(OUTPUT_DIR, category)
-            os.makedirs(cat_dir, exist_ok=True)
-
-            source_url = f"https://dsld.od.nih.gov/label/{source_id}"
-            ingredients_text = format_ingredients(ingredients)
-            claims_text = format_claims(claims_data)
-            net_contents_text = format_net_contents(net_contents)
-
-            # Escape double quotes in YAML values
-            safe_name = full_name.replace('"', '\\"')
-            safe_brand = brand_name.replace('"', '\\"')
-
-            md = f"""{review_prefix}---
+    review_reasons = check_review_needed(rec, category)
+    review_prefix = "[REVIEW_NEEDED]\n\n" if review_reasons else ""
+
+    source_url = f"https://dsld.od.nih.gov/label/{source_id}"
+    ingredients_text = format_ingredients(ingredients)
+    claims_text = format_claims(claims_data)
+    net_contents_text = format_net_contents(net_contents)
+
+    # Escape double quotes in YAML values
+    safe_name = full_name.replace('"', '\\"')
+    safe_brand = brand_name.replace('"', '\\"')
+
+    md = f"""{review_prefix}---
 source_id: "{source_id}"
 source_layer: "us_dsld"
 source_url: "{source_url}"
@@ -259,7 +210,7 @@ manufacturer: "{safe_brand}"
 category: "{category}"
 product_form: "{product_form}"
 date_entered: "{entry_date}"
-fetched_at: "{now}"
+fetched_at: "{context['now']}"
 ---
 
 # {full_name}
@@ -281,29 +232,35 @@ fetched_at: "{now}"
 {f"REVIEW: {', '.join(review_reasons)}" if review_reasons else "無特殊備註"}
 """
 
-            safe_id = re.sub(r'[^\w\-.]', '_', source_id)
-            filepath = os.path.join(cat_dir, f"{safe_id}.md")
-            with open(filepath, "w", encoding="utf-8") as out:
-                out.write(md)
+    return {
+        "source_id": source_id,
+        "category": category,
+        "content": md,
+        "review_needed": bool(review_reasons),
+    }
 
-            existing_ids.add(source_id)
-            stats["extracted"] += 1
+def process(jsonl_file, force=False, jobs=1, chunk_size=extract_runtime.DEFAULT_CHUNK_SIZE):
+    if not os.path.exists(jsonl_file):
+        print(f"JSONL not found: {jsonl_file}", file=sys.stderr)
+        sys.exit(1)
 
-            if stats["extracted"] % 1000 == 0:
-                print(f"  進度：{stats['extracted']} 筆已萃取...")
+    print(f"📂 JSONL 檔案：{jsonl_file}")
+    print(f"📁 輸出目錄：{OUTPUT_DIR}")
+    print(f"🔄 強制覆蓋：{'是' if force else '否'}")
+    print()
 
-    print(f"\n━━━ us_dsld 萃取完成 ━━━")
-    print(f"  總行數：{stats['total']}")
-    print(f"  跳過（已存在）：{stats['skipped']}")
-    print(f"  新萃取：{stats['extracted']}")
-    print(f"  REVIEW_NEEDED：{stats['review_needed']}")
-    print(f"  錯誤：{stats['errors']}")
+    stats = extract_runtime.run(
+        "us_dsld", extract_runtime.read_jsonl(jsonl_file), build_document,
+        source_id_of=source_id_of, output_dir=OUTPUT_DIR, force=force, jobs=jobs, chunk_size=chunk_size,
+    )
+    extract_runtime.print_stats("us_dsld", stats)
 
 def main():
     parser = argparse.ArgumentParser(description="us_dsld JSONL → Markdown 萃取")
     parser.add_argument("jsonl", nargs="?", help="JSONL 檔案路徑（預設使用 latest.jsonl）")
     parser.add_argument("-f", "--force", action="store_true", help="強制覆蓋已存在的檔案")
     parser.add_argument("-d", "--delta", action="store_true", help="Delta 模式（自動啟用 --force）")
+    extract_runtime.add_arguments(parser)
     args = parser.parse_args()
 
     force = args.force or args.delta
@@ -314,7 +271,7 @@ def main():
         print("   請指定檔案路徑或確認 raw/latest.jsonl 存在", file=sys.stderr)
         sys.exit(1)
 
-    process(jsonl_file, force=force)
+    process(jsonl_file, force=force, jobs=args.jobs, chunk_size=args.chunk_size)
 
 if __name__ == "__main__":
     main()
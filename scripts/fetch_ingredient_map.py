@@ -1,20 +1,33 @@
 #!/usr/bin/env python3
-"""成分標準化擷取腳本 — 從產品萃取成分並透過 RxNorm API 標準化"""
+"""成分標準化擷取腳本 — 從產品萃取成分並透過 RxNorm API 標準化
+
+RxNorm 查詢結果以成分名稱為鍵快取於 .cache/rxnorm_terms.json：
+- 匹配成功的結果保留 90 天，查無結果（負向快取）保留 14 天
+- 連線失敗不寫入快取，下次執行重新查詢
+標準化以執行緒池並行查詢，所有請求共用 10 req/s 的速率上限。
+
+成分頻率以增量方式維護：每個產品檔的成分清單與內容雜湊記錄於
+.cache/ingredient_contributions.pkl，重新萃取時只讀取新增或變動的檔案
+（mtime/size 不同且 SHA-1 不同），頻率表減去舊貢獻、加上新貢獻。
+"""
+import hashlib
 import json
 import os
+import pickle
 import re
 import sys
 import argparse
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from collections import Counter
 from pathlib import Path
 
-try:
-    import requests
-except ImportError:
-    print("請安裝 requests: pip3 install requests", file=sys.stderr)
-    sys.exit(1)
+from http_client import HttpClient, HttpError, set_host_rate
+from jsonl_io import open_jsonl, snapshot_path
+from product_layout import Layout
+from product_reader import ProductDocument
 
 BASE_DIR = Path(__file__).parent.parent
 EXTRACTOR_DIR = BASE_DIR / "docs" / "Extractor"
@@ -23,90 +36,246 @@ RAW_DIR = EXTRACTOR_DIR / "ingredient_map" / "raw"
 # RxNorm API
 RXNORM_BASE = "https://rxnav.nlm.nih.gov/REST"
 RATE_LIMIT = 0.1  # 10 requests/second
+set_host_rate("rxnav.nlm.nih.gov", 1 / RATE_LIMIT)
+
+CLIENT = HttpClient(max_retries=2)
+
+# 成分 → RxNorm 快取
+CACHE_PATH = BASE_DIR / ".cache" / "rxnorm_terms.json"
+CACHE_TTL = 90 * 24 * 3600          # 匹配成功的結果
+NEGATIVE_TTL = 14 * 24 * 3600       # 查無結果
+CACHE_SAVE_EVERY = 500              # 每查詢 N 筆寫入一次快取（中斷時保留進度）
+DEFAULT_WORKERS = 8
+
+# 快取保存的欄位
+RESULT_FIELDS = ("rxnorm_id", "standard_name", "match_type", "confidence")
+
+# 產品檔 → 成分貢獻（增量萃取）
+CONTRIBUTIONS_PATH = BASE_DIR / ".cache" / "ingredient_contributions.pkl"
+CONTRIBUTIONS_VERSION = 1
 
 # 產品 Layer 清單
 PRODUCT_LAYERS = ["us_dsld", "ca_lnhpd", "kr_hff", "jp_fnfc", "jp_foshu", "tw_hf"]
 
 
+PAREN_RE = re.compile(r"\s*[\(（].*?[\)）]")
+DASH_RE = re.compile(r"\s*—.*$")
+DOSE_SUFFIX_RE = re.compile(r"\s*-\s*\d+.*$")
+DOSE_UNIT_RE = re.compile(r"\s+\d+\s*(mg|mcg|iu|g|ml).*$", re.IGNORECASE)
+
+
 def extract_ingredients_from_file(filepath: Path) -> list:
     """從產品 .md 檔案萃取成分"""
-    ingredients = []
-
-    try:
-        content = filepath.read_text(encoding="utf-8")
-    except Exception:
+    doc = ProductDocument.from_file(filepath)
+    if doc is None:
         return []
+    return extract_ingredients(doc)
+
+
+def extract_ingredients(doc: ProductDocument) -> list:
+    """從產品文件萃取成分"""
+    ingredients = []
 
     # 跳過 REVIEW_NEEDED 檔案
-    if "[REVIEW_NEEDED]" in content[:500]:
+    if "[REVIEW_NEEDED]" in doc.content[:500]:
         return []
 
-    # 找到成分區塊
-    in_ingredients = False
-    for line in content.split("\n"):
-        line = line.strip()
+    # 找到成分區塊（## 成分 或 ## 機能性成分）
+    section_name = "成分" if doc.has_section("成分") else "機能性成分"
+
+    # 擷取成分項目
+    for ingredient in doc.bullets(section_name):
+        # 移除括號內容和劑量
+        ingredient = PAREN_RE.sub("", ingredient)
+        ingredient = DASH_RE.sub("", ingredient)
+        ingredient = DOSE_SUFFIX_RE.sub("", ingredient)
+        ingredient = DOSE_UNIT_RE.sub("", ingredient)
 
-        # 成分區塊開始
-        if line.startswith("## 成分") or line.startswith("## 機能性成分"):
-            in_ingredients = True
-            continue
+        ingredient = ingredient.strip()
 
-        # 其他區塊開始，結束成分擷取
-        if line.startswith("## ") and in_ingredients:
-            break
+        if ingredient and len(ingredient) > 1:
+            ingredients.append(ingredient)
 
-        # 擷取成分項目
-        if in_ingredients and line.startswith("- "):
-            # 清理成分名稱
-            ingredient = line[2:].strip()
+    return ingredients
 
-            # 移除括號內容和劑量
-            ingredient = re.sub(r"\s*[\(（].*?[\)）]", "", ingredient)
-            ingredient = re.sub(r"\s*—.*$", "", ingredient)
-            ingredient = re.sub(r"\s*-\s*\d+.*$", "", ingredient)
-            ingredient = re.sub(r"\s+\d+\s*(mg|mcg|iu|g|ml).*$", "", ingredient, flags=re.IGNORECASE)
 
-            ingredient = ingredient.strip()
+class IngredientContributions:
+    """產品檔 → 成分貢獻，以及彙總的成分頻率
+
+    files：相對路徑 → (mtime_ns, size, sha1, 成分 tuple)
+    counter：所有檔案成分貢獻的總和
+    """
+
+    def __init__(self, extractor_dir: Path = EXTRACTOR_DIR):
+        self.extractor_dir = extractor_dir
+        self.files = {}
+        self.counter = Counter()
+        self.dirty = False
+
+    @classmethod
+    def load(cls, path: Path = CONTRIBUTIONS_PATH, extractor_dir: Path = EXTRACTOR_DIR) -> "IngredientContributions":
+        """載入記錄；不存在或版本不符時回傳空記錄"""
+        ledger = cls(extractor_dir)
+        try:
+            with open(path, "rb") as f:
+                state = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return ledger
+        if isinstance(state, dict) and state.get("version") == CONTRIBUTIONS_VERSION:
+            ledger.files = state["files"]
+            ledger.counter = Counter(state["counter"])
+        return ledger
+
+    def save(self, path: Path = CONTRIBUTIONS_PATH):
+        """寫入記錄（先寫暫存檔再替換）"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        state = {"version": CONTRIBUTIONS_VERSION, "files": self.files, "counter": dict(self.counter)}
+        with open(tmp_path, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    def _subtract(self, ingredients):
+        for ingredient in ingredients:
+            remaining = self.counter[ingredient] - 1
+            if remaining > 0:
+                self.counter[ingredient] = remaining
+            else:
+                del self.counter[ingredient]
+
+    def refresh(self) -> dict:
+        """依 mtime/size 與內容雜湊增量更新，回傳變動統計"""
+        stats = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+        seen = set()
+
+        for layer in PRODUCT_LAYERS:
+            layer_dir = self.extractor_dir / layer
+            if not layer_dir.exists():
+                continue
 
-            if ingredient and len(ingredient) > 1:
-                ingredients.append(ingredient)
+            print(f"  處理 {layer}...")
+
+            for _, path in Layout.load(layer_dir).iter_files():
+                rel_path = path.relative_to(self.extractor_dir).as_posix()
+                seen.add(rel_path)
+                try:
+                    st = path.stat()
+                except OSError:
+                    continue
+                previous = self.files.get(rel_path)
+                if previous is not None and previous[0] == st.st_mtime_ns and previous[1] == st.st_size:
+                    stats["unchanged"] += 1
+                    continue
+
+                try:
+                    data = path.read_bytes()
+                except OSError:
+                    data = b""
+                digest = hashlib.sha1(data).hexdigest()
+
+                # 只有 mtime 變動（如重新萃取但內容相同）：沿用舊貢獻
+                self.dirty = True
+                if previous is not None and previous[2] == digest:
+                    self.files[rel_path] = (st.st_mtime_ns, st.st_size, digest, previous[3])
+                    stats["unchanged"] += 1
+                    continue
+
+                try:
+                    ingredients = tuple(extract_ingredients(ProductDocument(data.decode("utf-8"), path)))
+                except UnicodeDecodeError:
+                    ingredients = ()
+
+                if previous is not None:
+                    self._subtract(previous[3])
+                    stats["updated"] += 1
+                else:
+                    stats["added"] += 1
+                self.counter.update(ingredients)
+                self.files[rel_path] = (st.st_mtime_ns, st.st_size, digest, ingredients)
 
-    return ingredients
+        for rel_path in list(self.files):
+            if rel_path not in seen:
+                self._subtract(self.files.pop(rel_path)[3])
+                self.dirty = True
+                stats["removed"] += 1
 
+        return stats
 
-def extract_all_ingredients() -> Counter:
-    """從所有產品萃取成分頻率"""
+
+def extract_all_ingredients(rebuild: bool = False) -> Counter:
+    """從所有產品萃取成分頻率（增量更新；rebuild=True 時全部重新讀取）"""
     print("📊 萃取所有產品成分...")
 
-    ingredient_counter = Counter()
-    file_count = 0
+    ledger = IngredientContributions() if rebuild else IngredientContributions.load()
+    stats = ledger.refresh()
+    if ledger.dirty or not CONTRIBUTIONS_PATH.exists():
+        ledger.save()
 
-    for layer in PRODUCT_LAYERS:
-        layer_dir = EXTRACTOR_DIR / layer
-        if not layer_dir.exists():
-            continue
+    print(f"  掃描 {len(ledger.files)} 個產品檔案"
+          f"（新增 {stats['added']}，變動 {stats['updated']}，移除 {stats['removed']}，未變動 {stats['unchanged']}）")
+    print(f"  發現 {len(ledger.counter)} 個獨特成分")
 
-        print(f"  處理 {layer}...")
+    return Counter(ledger.counter)
 
-        # 遍歷所有子目錄（category）
-        for category_dir in layer_dir.iterdir():
-            if not category_dir.is_dir() or category_dir.name == "raw":
-                continue
 
-            for md_file in category_dir.glob("*.md"):
-                ingredients = extract_ingredients_from_file(md_file)
-                ingredient_counter.update(ingredients)
-                file_count += 1
+def query_rxnorm(term: str) -> dict:
+    """查詢 RxNorm API
 
-    print(f"  掃描 {file_count} 個產品檔案")
-    print(f"  發現 {len(ingredient_counter)} 個獨特成分")
+    查無結果時回傳未匹配的 result；連線失敗（重試後）拋出 HttpError，
+    回應結構不符預期時可能拋出 ValueError / TypeError / AttributeError，
+    由呼叫端決定是否寫入快取。
+    """
+    result = _unmatched(term)
 
-    return ingredient_counter
+    # 精確查詢
+    url = f"{RXNORM_BASE}/rxcui.json"
+    params = {"name": term, "search": 1}
+    data = _get_json(url, params)
+    id_group = (data or {}).get("idGroup") or {}
+    rxnorm_ids = id_group.get("rxnormId", [])
 
+    if rxnorm_ids:
+        result["rxnorm_id"] = rxnorm_ids[0]
+        result["match_type"] = "exact"
+        result["confidence"] = "high"
 
-def query_rxnorm(term: str) -> dict:
-    """查詢 RxNorm API"""
-    result = {
+        # 取得標準名稱
+        prop_url = f"{RXNORM_BASE}/rxcui/{rxnorm_ids[0]}/properties.json"
+        prop_data = _get_json(prop_url)
+        if prop_data is not None:
+            result["standard_name"] = (prop_data.get("properties") or {}).get("name", term)
+
+        return result
+
+    # 模糊查詢
+    url = f"{RXNORM_BASE}/approximateTerm.json"
+    params = {"term": term, "maxEntries": 3}
+    data = _get_json(url, params)
+    candidates = ((data or {}).get("approximateGroup") or {}).get("candidate", [])
+
+    if candidates:
+        best = candidates[0]
+        result["rxnorm_id"] = best.get("rxcui")
+        result["standard_name"] = best.get("name", term)
+        result["match_type"] = "approximate"
+
+        # 根據分數設定信心度（分數無法解析時為 low）
+        try:
+            score = int(float(best.get("score", 0)))
+        except (TypeError, ValueError):
+            score = 0
+        if score >= 90:
+            result["confidence"] = "high"
+        elif score >= 70:
+            result["confidence"] = "medium"
+        else:
+            result["confidence"] = "low"
+
+    return result
+
+
+def _unmatched(term: str) -> dict:
+    return {
         "term": term,
         "rxnorm_id": None,
         "standard_name": None,
@@ -114,86 +283,124 @@ def query_rxnorm(term: str) -> dict:
         "confidence": "low"
     }
 
-    # 精確查詢
-    try:
-        url = f"{RXNORM_BASE}/rxcui.json"
-        params = {"name": term, "search": 1}
-        resp = requests.get(url, params=params, timeout=10)
-
-        if resp.status_code == 200:
-            data = resp.json()
-            id_group = data.get("idGroup", {})
-            rxnorm_ids = id_group.get("rxnormId", [])
-
-            if rxnorm_ids:
-                result["rxnorm_id"] = rxnorm_ids[0]
-                result["match_type"] = "exact"
-                result["confidence"] = "high"
-
-                # 取得標準名稱
-                prop_url = f"{RXNORM_BASE}/rxcui/{rxnorm_ids[0]}/properties.json"
-                prop_resp = requests.get(prop_url, timeout=10)
-                if prop_resp.status_code == 200:
-                    props = prop_resp.json().get("properties", {})
-                    result["standard_name"] = props.get("name", term)
-
-                return result
-    except Exception:
-        pass
 
-    # 模糊查詢
+def _get_json(url: str, params: dict = None):
+    """GET JSON 物件；4xx、非 JSON 或非物件（list、字串等）的回應視為查無結果（回傳 None），
+    連線失敗拋出 HttpError"""
     try:
-        url = f"{RXNORM_BASE}/approximateTerm.json"
-        params = {"term": term, "maxEntries": 3}
-        resp = requests.get(url, params=params, timeout=10)
-
-        if resp.status_code == 200:
-            data = resp.json()
-            candidates = data.get("approximateGroup", {}).get("candidate", [])
-
-            if candidates:
-                best = candidates[0]
-                result["rxnorm_id"] = best.get("rxcui")
-                result["standard_name"] = best.get("name", term)
-                result["match_type"] = "approximate"
-
-                # 根據分數設定信心度
-                score = int(best.get("score", 0))
-                if score >= 90:
-                    result["confidence"] = "high"
-                elif score >= 70:
-                    result["confidence"] = "medium"
-                else:
-                    result["confidence"] = "low"
-
-                return result
-    except Exception:
-        pass
-
-    return result
-
-
-def normalize_ingredients(ingredients: Counter, top_n: int = 500) -> list:
-    """標準化成分"""
+        data = CLIENT.get(url, params=params, timeout=10).json()
+    except HttpError as e:
+        if e.status is not None and 400 <= e.status < 500 and e.status != 429:
+            return None
+        raise
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+class RxNormCache:
+    """成分 → RxNorm 查詢結果快取（JSON 檔，匹配與查無結果使用不同 TTL）"""
+
+    def __init__(self, path: Path = CACHE_PATH, ttl: int = CACHE_TTL, negative_ttl: int = NEGATIVE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        try:
+            self.entries = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def get(self, term: str) -> dict | None:
+        entry = self.entries.get(term)
+        if not entry:
+            return None
+        ttl = self.ttl if entry.get("rxnorm_id") else self.negative_ttl
+        if time.time() - entry.get("resolved_at", 0) > ttl:
+            return None
+        return entry
+
+    def put(self, term: str, result: dict):
+        entry = {field: result[field] for field in RESULT_FIELDS}
+        entry["resolved_at"] = int(time.time())
+        with self._lock:
+            self.entries[term] = entry
+
+    def save(self):
+        with self._lock:
+            data = json.dumps(self.entries, ensure_ascii=False)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(data, encoding="utf-8")
+        tmp_path.replace(self.path)
+
+
+def normalize_ingredients(ingredients: Counter, top_n: int = 500, workers: int = DEFAULT_WORKERS,
+                          refresh: bool = False) -> list:
+    """標準化成分（快取命中者不查詢，其餘以執行緒池並行查詢）"""
     print(f"🔄 標準化前 {top_n} 名成分...")
 
     # 取前 N 名
     top_ingredients = ingredients.most_common(top_n)
 
+    cache = RxNormCache()
+    resolved = {}
+    pending = []
+    for ingredient, _ in top_ingredients:
+        entry = None if refresh else cache.get(ingredient)
+        if entry:
+            resolved[ingredient] = entry
+        else:
+            pending.append(ingredient)
+
+    print(f"  快取命中 {len(resolved)}，待查詢 {len(pending)}（{workers} 個連線）")
+
+    failed = 0
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {executor.submit(query_rxnorm, term): term for term in pending}
+        for done, future in enumerate(as_completed(futures), 1):
+            term = futures[future]
+            try:
+                result = future.result()
+            except HttpError as e:
+                # 連線失敗不寫入快取，輸出為未匹配
+                print(f"  ⚠️  {term} 查詢失敗：{e}", file=sys.stderr)
+                failed += 1
+                result = _unmatched(term)
+            except (ValueError, TypeError, AttributeError) as e:
+                # 回應格式異常：只影響該成分，不寫入快取
+                print(f"  ⚠️  {term} 回應格式異常：{e!r}", file=sys.stderr)
+                failed += 1
+                result = _unmatched(term)
+            else:
+                cache.put(term, result)
+                result = cache.get(term)
+            resolved[term] = result
+
+            if done % CACHE_SAVE_EVERY == 0:
+                cache.save()
+            if done % 100 == 0 or done == len(pending):
+                print(f"  [{done}/{len(pending)}] 已查詢（{time.time() - start:.0f} 秒）")
+
+    if pending:
+        cache.save()
+    if failed:
+        print(f"  ⚠️  {failed} 個成分查詢失敗，下次執行將重新查詢", file=sys.stderr)
+
+    # 依頻率順序輸出
     results = []
-
-    for i, (ingredient, count) in enumerate(top_ingredients, 1):
-        print(f"  [{i}/{len(top_ingredients)}] {ingredient} ({count})")
-
-        rxnorm_result = query_rxnorm(ingredient)
+    for ingredient, count in top_ingredients:
+        entry = resolved[ingredient]
+        rxnorm_result = {"term": ingredient}
+        rxnorm_result.update({field: entry[field] for field in RESULT_FIELDS})
         rxnorm_result["frequency"] = count
-        rxnorm_result["queried_at"] = datetime.now().isoformat()
-
+        resolved_at = entry.get("resolved_at")
+        rxnorm_result["queried_at"] = (
+            datetime.fromtimestamp(resolved_at) if resolved_at else datetime.now()
+        ).isoformat()
         results.append(rxnorm_result)
 
-        # 速率限制
-        time.sleep(RATE_LIMIT)
-
     return results
 
 
@@ -211,8 +418,8 @@ def save_results(frequency: Counter, normalized: list):
 
     # 儲存標準化結果
     if normalized:
-        norm_file = RAW_DIR / f"normalized_{today}.jsonl"
-        with open(norm_file, "w", encoding="utf-8") as f:
+        norm_file = snapshot_path(RAW_DIR / f"normalized_{today}.jsonl")
+        with open_jsonl(norm_file, "w") as f:
             for item in normalized:
                 f.write(json.dumps(item, ensure_ascii=False) + "\n")
         print(f"  📁 標準化結果 → {norm_file}")
@@ -261,6 +468,10 @@ def main():
     parser.add_argument("--top", type=int, default=500, help="標準化前 N 名成分")
     parser.add_argument("--full", action="store_true", help="完整流程（萃取 + 標準化）")
     parser.add_argument("--stats", action="store_true", help="顯示統計資訊")
+    parser.add_argument("--workers", "-j", type=int, default=DEFAULT_WORKERS,
+                        help=f"同時查詢數（預設 {DEFAULT_WORKERS}，速率上限固定 {1 / RATE_LIMIT:g} req/s）")
+    parser.add_argument("--refresh", action="store_true", help="忽略 RxNorm 快取，全部重新查詢")
+    parser.add_argument("--rebuild", action="store_true", help="忽略成分貢獻記錄，重新讀取所有產品檔")
     args = parser.parse_args()
 
     if args.stats:
@@ -268,10 +479,10 @@ def main():
         return
 
     if args.full or args.extract_all:
-        frequency = extract_all_ingredients()
+        frequency = extract_all_ingredients(args.rebuild)
 
         if args.full or args.normalize:
-            normalized = normalize_ingredients(frequency, args.top)
+            normalized = normalize_ingredients(frequency, args.top, args.workers, args.refresh)
             save_results(frequency, normalized)
         else:
             save_results(frequency, [])
@@ -289,7 +500,7 @@ def main():
             data = json.load(f)
 
         frequency = Counter({item["ingredient"]: item["count"] for item in data})
-        normalized = normalize_ingredients(frequency, args.top)
+        normalized = normalize_ingredients(frequency, args.top, args.workers, args.refresh)
         save_results(frequency, normalized)
         return
 
@@ -4,15 +4,13 @@ import json
 import os
 import sys
 import argparse
-import time
 import xml.etree.ElementTree as ET
 from datetime import datetime, timedelta
-from urllib.request import urlopen, Request
-from urllib.parse import urlencode
-from urllib.error import HTTPError, URLError
-from http.client import IncompleteRead
 from pathlib import Path
 
+from http_client import HttpClient, HttpError, set_host_rate
+from jsonl_io import open_jsonl, snapshot_path
+
 BASE_DIR = Path(__file__).parent.parent
 
 # 載入 .env 檔案
@@ -35,6 +33,10 @@ EMAIL = os.environ.get("NCBI_EMAIL", "")
 
 # 速率限制（無 API Key: 3/s, 有 API Key: 10/s）
 RATE_LIMIT = 0.35 if API_KEY else 0.5
+set_host_rate("eutils.ncbi.nlm.nih.gov", 1 / RATE_LIMIT)
+
+# 共用 keep-alive 連線；連線錯誤、429、5xx 自動重試
+CLIENT = HttpClient(user_agent="SupplementProductAgent/1.0")
 
 # 交互作用類型查詢設定
 INTERACTION_QUERIES = {
@@ -168,13 +170,9 @@ def esearch(query: str, max_results: int = 200, date_range_years: int = 10) -> l
     if EMAIL:
         params["email"] = EMAIL
 
-    url = f"{ESEARCH_URL}?{urlencode(params)}"
-
     try:
-        req = Request(url, headers={"User-Agent": "SupplementProductAgent/1.0"})
-        with urlopen(req, timeout=30) as response:
-            data = json.load(response)
-    except (HTTPError, URLError, json.JSONDecodeError) as e:
+        data = CLIENT.get(ESEARCH_URL, params=params, timeout=30).json()
+    except (HttpError, ValueError) as e:
         print(f"    ESearch 失敗: {e}", file=sys.stderr)
         return []
 
@@ -205,25 +203,11 @@ def efetch_batch(pmids: list, batch_size: int = 100, max_retries: int = 3) -> li
         if EMAIL:
             params["email"] = EMAIL
 
-        url = f"{EFETCH_URL}?{urlencode(params)}"
-
-        for retry in range(max_retries):
-            try:
-                req = Request(url, headers={"User-Agent": "SupplementProductAgent/1.0"})
-                with urlopen(req, timeout=60) as response:
-                    xml_content = response.read()
-
-                articles = parse_pubmed_xml(xml_content)
-                all_articles.extend(articles)
-                break
-
-            except (HTTPError, URLError, ET.ParseError, IncompleteRead) as e:
-                if retry < max_retries - 1:
-                    time.sleep(2 * (retry + 1))
-                else:
-                    print(f"    EFetch 失敗: {e}", file=sys.stderr)
-
-        time.sleep(RATE_LIMIT)
+        try:
+            xml_content = CLIENT.get(EFETCH_URL, params=params, timeout=60, retries=max_retries - 1).body
+            all_articles.extend(parse_pubmed_xml(xml_content))
+        except HttpError as e:
+            print(f"    EFetch 失敗: {e}", file=sys.stderr)
 
     return all_articles
 
@@ -311,16 +295,16 @@ def save_to_jsonl(articles: list, interaction_type: str, category: str) -> str:
     raw_dir.mkdir(parents=True, exist_ok=True)
 
     today = datetime.now().strftime("%Y-%m-%d")
-    output_file = raw_dir / f"{category}-{today}.jsonl"
+    output_file = snapshot_path(raw_dir / f"{category}-{today}.jsonl")
 
-    with open(output_file, "w", encoding="utf-8") as f:
+    with open_jsonl(output_file, "w") as f:
         for article in articles:
             article["interaction_type"] = interaction_type.upper()
             article["category"] = category
             article["fetched_at"] = datetime.now().isoformat()
             f.write(json.dumps(article, ensure_ascii=False) + "\n")
 
-    return str(output_file)
+    return output_file
 
 
 def fetch_interaction_type(interaction_type: str, limit: int = 200, category: str = None):
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+fetch_kr_hff.py — 平行下載 MFDS 건강기능식품（getHtfsItem01）
+
+第 1 頁回傳 totalCount 後即可得知所有頁碼，其餘頁面以執行緒池平行下載，
+所有請求共用每秒請求數上限（--rps）與 keep-alive 連線（http_client）。每頁寫入各自的分頁檔
+（{輸出檔}.pages/page-00001.jsonl，先寫暫存檔再更名），全部完成後
+依頁碼順序組合為 JSONL，內容與逐頁下載相同。
+
+續傳（--resume）以已完成的分頁檔為準，只下載缺少的頁面；
+下載中斷或有頁面失敗時保留分頁檔，重新執行 --resume 即可補齊。
+
+用法：
+    python3 scripts/fetch_kr_hff.py --output docs/Extractor/kr_hff/raw/hff-2026-02-04.jsonl
+    python3 scripts/fetch_kr_hff.py --output ... --resume
+    python3 scripts/fetch_kr_hff.py --output ... --rps 3 --workers 4 --limit 500
+
+需要環境變數 MFDS_API_KEY（data.go.kr 服務金鑰）。
+"""
+
+import argparse
+import json
+import math
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlsplit
+
+from http_client import HttpClient, HttpError, set_host_rate
+
+
+API_BASE = "https://apis.data.go.kr/1471000/HtfsInfoService03/getHtfsItem01"
+PAGE_SIZE = 100
+MAX_RETRIES = 5
+RETRY_DELAY_STEP = 3  # 遞增延遲：3, 6, 9, 12 秒
+REQUEST_TIMEOUT = 120
+
+DEFAULT_RPS = 5.0
+DEFAULT_WORKERS = 8
+
+META_FILE = "meta.json"
+
+
+def fetch_page(client: HttpClient, api_key: str, page: int, page_size: int) -> dict | None:
+    """下載一頁，回傳 API 回應；重試後仍失敗回傳 None
+
+    速率限制與連線重用由 client 處理；回應內容無效時也要重試，
+    因此重試在這裡進行（client 不另外重試）。
+    """
+    url = f"{API_BASE}?serviceKey={api_key}&pageNo={page}&numOfRows={page_size}&type=json"
+
+    for attempt in range(1, MAX_RETRIES + 1):
+        try:
+            data = client.get(url, timeout=REQUEST_TIMEOUT, retries=0).json()
+            if isinstance(data, dict) and isinstance(data.get("body"), dict):
+                return data
+            print(f"⚠️  第 {page} 頁回應缺少 body，重試 {attempt}/{MAX_RETRIES}...", file=sys.stderr)
+        except json.JSONDecodeError:
+            print(f"⚠️  第 {page} 頁回應非 JSON，重試 {attempt}/{MAX_RETRIES}...", file=sys.stderr)
+        except HttpError as e:
+            print(f"⚠️  第 {page} 頁下載失敗（{e}），重試 {attempt}/{MAX_RETRIES}...", file=sys.stderr)
+        if attempt < MAX_RETRIES:
+            time.sleep(attempt * RETRY_DELAY_STEP)
+    return None
+
+
+def page_items(data: dict) -> list:
+    items = data["body"].get("items") or []
+    return items if isinstance(items, list) else [items]
+
+
+class PageStore:
+    """分頁檔目錄（每頁一個 JSONL，存在即代表該頁已完成）"""
+
+    def __init__(self, output: str):
+        self.dir = output + ".pages"
+
+    def reset(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+        os.makedirs(self.dir, exist_ok=True)
+
+    def path(self, page: int) -> str:
+        return os.path.join(self.dir, f"page-{page:05d}.jsonl")
+
+    def done(self, page: int) -> bool:
+        return os.path.exists(self.path(page))
+
+    def write(self, page: int, items: list):
+        tmp_path = self.path(page) + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for item in items:
+                f.write(json.dumps(item, ensure_ascii=False, separators=(",", ":")) + "\n")
+        os.replace(tmp_path, self.path(page))
+
+    def load_meta(self) -> dict:
+        try:
+            with open(os.path.join(self.dir, META_FILE), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def save_meta(self, meta: dict):
+        os.makedirs(self.dir, exist_ok=True)
+        tmp_path = os.path.join(self.dir, META_FILE + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(self.dir, META_FILE))
+
+    def assemble(self, output: str, pages: int, limit: int = 0) -> int:
+        """依頁碼順序組合輸出檔，回傳筆數"""
+        count = 0
+        tmp_path = output + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as out:
+            for page in range(1, pages + 1):
+                with open(self.path(page), "r", encoding="utf-8") as f:
+                    for line in f:
+                        if limit and count >= limit:
+                            break
+                        out.write(line)
+                        count += 1
+        os.replace(tmp_path, output)
+        return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="平行下載 MFDS 건강기능식품資料")
+    parser.add_argument("--output", "-o", required=True, help="輸出 JSONL 路徑")
+    parser.add_argument("--resume", "-r", action="store_true", help="沿用已完成的分頁檔繼續下載")
+    parser.add_argument("--limit", "-l", type=int, default=0, help="限制下載筆數（測試用）")
+    parser.add_argument("--rps", type=float, default=DEFAULT_RPS,
+                        help=f"每秒請求數上限（預設 {DEFAULT_RPS:g}，0 為不限制）")
+    parser.add_argument("--workers", "-j", type=int, default=DEFAULT_WORKERS,
+                        help=f"同時下載的頁數（預設 {DEFAULT_WORKERS}）")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE, help=f"每頁筆數（預設 {PAGE_SIZE}）")
+    args = parser.parse_args()
+
+    api_key = os.environ.get("MFDS_API_KEY", "")
+    if not api_key:
+        print("❌ 未設定 MFDS_API_KEY", file=sys.stderr)
+        sys.exit(1)
+
+    store = PageStore(args.output)
+    set_host_rate(urlsplit(API_BASE).hostname, args.rps)
+    client = HttpClient(pool_size=max(1, args.workers), verbose=False)
+
+    meta = store.load_meta() if args.resume else {}
+    if meta and meta.get("page_size") != args.page_size:
+        print("⚠️  分頁大小與既有分頁檔不同，重新下載", file=sys.stderr)
+        meta = {}
+    if meta:
+        print(f"📎 續傳模式：沿用既有分頁檔（{store.dir}）", file=sys.stderr)
+    else:
+        store.reset()
+
+    # 第 1 頁取得總筆數
+    total = meta.get("total_count")
+    if total is None or not store.done(1):
+        data = fetch_page(client, api_key, 1, args.page_size)
+        if data is None:
+            print(f"❌ 第 1 頁下載失敗（已重試 {MAX_RETRIES} 次）", file=sys.stderr)
+            sys.exit(1)
+        total = int(data["body"].get("totalCount") or 0)
+        store.write(1, page_items(data))
+        store.save_meta({"total_count": total, "page_size": args.page_size})
+    print(f"📊 總筆數: {total}", file=sys.stderr)
+
+    wanted = min(total, args.limit) if args.limit > 0 else total
+    pages = max(1, math.ceil(wanted / args.page_size))
+    pending = [page for page in range(1, pages + 1) if not store.done(page)]
+    if meta and len(pending) < pages:
+        print(f"📎 已完成 {pages - len(pending)}/{pages} 頁", file=sys.stderr)
+    print(f"📥 平行下載 {len(pending)} 頁（{args.workers} 個連線，每秒最多 {args.rps:g} 次請求）", file=sys.stderr)
+
+    failed = []
+    completed = pages - len(pending)
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        futures = {
+            executor.submit(fetch_page, client, api_key, page, args.page_size): page
+            for page in pending
+        }
+        for future in as_completed(futures):
+            page = futures[future]
+            data = future.result()
+            if data is None:
+                failed.append(page)
+                print(f"❌ 第 {page} 頁下載失敗（已重試 {MAX_RETRIES} 次）", file=sys.stderr)
+                continue
+            store.write(page, page_items(data))
+            completed += 1
+            if completed % 20 == 0 or completed == pages:
+                elapsed = time.time() - start
+                print(f"📥 已完成: {completed}/{pages} 頁（{elapsed:.0f} 秒）", file=sys.stderr)
+
+    if failed:
+        print(f"❌ {len(failed)} 頁下載失敗：{sorted(failed)[:10]}", file=sys.stderr)
+        print("💡 可使用 --resume 參數補齊缺少的頁面", file=sys.stderr)
+        sys.exit(1)
+
+    count = store.assemble(args.output, pages, wanted if args.limit > 0 else 0)
+    shutil.rmtree(store.dir, ignore_errors=True)
+    print(f"📥 已擷取: {count}/{total}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
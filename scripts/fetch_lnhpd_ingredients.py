@@ -27,8 +27,10 @@ import os
 import sys
 import time
 from datetime import datetime
-from urllib.request import urlopen, Request
-from urllib.error import URLError, HTTPError
+from urllib.parse import urlsplit
+
+from http_client import HttpClient, HttpError, set_host_rate
+from jsonl_io import compress_file, compression_enabled
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 RAW_DIR = os.path.join(BASE_DIR, "docs/Extractor/ca_lnhpd/raw")
@@ -37,6 +39,10 @@ API_BASE = "https://health-products.canada.ca/api/natural-licences/medicinalingr
 PAGE_SIZE = 100  # API 硬性限制，即使請求 1000 也只會回傳 100
 MAX_RETRIES = 3
 RETRY_DELAY_BASE = 5  # seconds, exponential backoff
+REQUESTS_PER_SECOND = 10  # 避免對 API 造成壓力
+
+set_host_rate(urlsplit(API_BASE).hostname, REQUESTS_PER_SECOND)
+CLIENT = HttpClient(backoff=RETRY_DELAY_BASE)
 
 
 def fetch_page(page_num: int, retries: int = MAX_RETRIES) -> dict | None:
@@ -45,33 +51,18 @@ def fetch_page(page_num: int, retries: int = MAX_RETRIES) -> dict | None:
 
     Args:
         page_num: 頁碼（從 1 開始）
-        retries: 剩餘重試次數
+        retries: 嘗試次數（連線錯誤、429、5xx 由 CLIENT 以指數退避重試）
 
     Returns:
         API 回應的 JSON 物件，失敗時回傳 None
     """
     url = f"{API_BASE}?lang=en&type=json&page={page_num}&limit={PAGE_SIZE}"
 
-    req = Request(url)
-    req.add_header("User-Agent", "SupplementProductIntelligence/1.0")
-    req.add_header("Accept", "application/json")
-
-    for attempt in range(retries):
-        try:
-            with urlopen(req, timeout=60) as response:
-                data = json.loads(response.read().decode("utf-8"))
-                return data
-        except (URLError, HTTPError, json.JSONDecodeError) as e:
-            delay = RETRY_DELAY_BASE * (2 ** attempt)
-            print(f"  ⚠️  第 {page_num} 頁下載失敗（嘗試 {attempt + 1}/{retries}）：{e}", file=sys.stderr)
-            if attempt < retries - 1:
-                print(f"     等待 {delay} 秒後重試...", file=sys.stderr)
-                time.sleep(delay)
-            else:
-                print(f"  ❌ 第 {page_num} 頁下載失敗，已達重試上限", file=sys.stderr)
-                return None
-
-    return None
+    try:
+        return CLIENT.get(url, headers={"Accept": "application/json"}, timeout=60, retries=retries - 1).json()
+    except (HttpError, ValueError) as e:
+        print(f"  ❌ 第 {page_num} 頁下載失敗，已達重試上限：{e}", file=sys.stderr)
+        return None
 
 
 def save_progress(progress_file: str, page_num: int, total_fetched: int):
@@ -211,13 +202,15 @@ def main():
 
             page_num += 1
 
-            # 短暫延遲，避免對 API 造成壓力
-            time.sleep(0.1)
-
     # 清理進度檔案
     if os.path.exists(progress_file):
         os.remove(progress_file)
 
+    # 下載完成後壓縮（下載中保持未壓縮以支援續傳）
+    if compression_enabled():
+        print("\n🗜️  壓縮為 .zst...")
+        output_file = compress_file(output_file)
+
     # 更新符號連結
     if os.path.islink(latest_link):
         os.unlink(latest_link)
@@ -4,13 +4,11 @@ import json
 import os
 import sys
 import argparse
-import time
 import xml.etree.ElementTree as ET
 from datetime import datetime, timedelta
-from urllib.request import urlopen, Request
-from urllib.parse import urlencode
-from urllib.error import HTTPError, URLError
-from http.client import IncompleteRead, RemoteDisconnected
+
+from http_client import HttpClient, HttpError, set_host_rate
+from jsonl_io import open_jsonl, snapshot_path
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 TOPICS_DIR = os.path.join(BASE_DIR, "core/Narrator/Modes/topic_tracking/topics")
@@ -36,6 +34,10 @@ EMAIL = os.environ.get("NCBI_EMAIL", "")
 
 # 速率限制（無 API Key: 3/s, 有 API Key: 10/s）
 RATE_LIMIT = 0.35 if API_KEY else 0.5
+set_host_rate("eutils.ncbi.nlm.nih.gov", 1 / RATE_LIMIT)
+
+# 共用 keep-alive 連線；連線錯誤、429、5xx 自動重試
+CLIENT = HttpClient(user_agent="SupplementProductAgent/1.0")
 
 
 def load_topic_config(topic_id: str) -> dict:
@@ -103,13 +105,9 @@ def esearch(query: str, max_results: int = 500, date_range_years: int = 5) -> li
     if EMAIL:
         params["email"] = EMAIL
 
-    url = f"{ESEARCH_URL}?{urlencode(params)}"
-
     try:
-        req = Request(url, headers={"User-Agent": "SupplementProductAgent/1.0"})
-        with urlopen(req, timeout=30) as response:
-            data = json.load(response)
-    except (HTTPError, URLError, json.JSONDecodeError, RemoteDisconnected, ConnectionResetError, TimeoutError) as e:
+        data = CLIENT.get(ESEARCH_URL, params=params, timeout=30).json()
+    except (HttpError, ValueError) as e:
         print(f"ESearch 失敗: {e}", file=sys.stderr)
         return []
 
@@ -141,28 +139,12 @@ def efetch_batch(pmids: list, batch_size: int = 100, max_retries: int = 3) -> li
         if EMAIL:
             params["email"] = EMAIL
 
-        url = f"{EFETCH_URL}?{urlencode(params)}"
-
-        # 重試邏輯
-        for retry in range(max_retries):
-            try:
-                req = Request(url, headers={"User-Agent": "SupplementProductAgent/1.0"})
-                with urlopen(req, timeout=60) as response:
-                    xml_content = response.read()
-
-                articles = parse_pubmed_xml(xml_content)
-                all_articles.extend(articles)
-                break  # 成功，跳出重試迴圈
-
-            except (HTTPError, URLError, ET.ParseError, IncompleteRead, RemoteDisconnected, ConnectionResetError, TimeoutError) as e:
-                if retry < max_retries - 1:
-                    print(f"  批次失敗 (重試 {retry+1}/{max_retries}): {e}", file=sys.stderr)
-                    time.sleep(2 * (retry + 1))  # 指數退避
-                else:
-                    print(f"  EFetch 批次失敗（已重試 {max_retries} 次）: {e}", file=sys.stderr)
-
-        # 速率限制
-        time.sleep(RATE_LIMIT)
+        # 重試（指數退避）與速率限制由 CLIENT 處理
+        try:
+            xml_content = CLIENT.get(EFETCH_URL, params=params, timeout=60, retries=max_retries - 1).body
+            all_articles.extend(parse_pubmed_xml(xml_content))
+        except HttpError as e:
+            print(f"  EFetch 批次失敗（已重試 {max_retries} 次）: {e}", file=sys.stderr)
 
     return all_articles
 
@@ -258,9 +240,9 @@ def save_to_jsonl(articles: list, topic_id: str) -> str:
     os.makedirs(RAW_DIR, exist_ok=True)
 
     today = datetime.now().strftime("%Y-%m")
-    output_file = os.path.join(RAW_DIR, f"{topic_id}-{today}.jsonl")
+    output_file = snapshot_path(os.path.join(RAW_DIR, f"{topic_id}-{today}.jsonl"))
 
-    with open(output_file, "w", encoding="utf-8") as f:
+    with open_jsonl(output_file, "w") as f:
         for article in articles:
             article["topic"] = topic_id
             article["fetched_at"] = datetime.now().isoformat()
@@ -2,14 +2,47 @@
 """
 連結修復腳本
 
-解析 lychee 報告，嘗試自動修復常見的連結問題。
-無法修復的問題會輸出到 stdout 供後續建立 Issue。
+解析 lychee 報告，或以內建連結檢查器直接檢查建置後的網站，
+嘗試自動修復常見的連結問題。無法修復的問題會輸出到 stdout 供後續建立 Issue。
+
+使用方式：
+    python3 scripts/fix_broken_links.py lychee-report.md
+    python3 scripts/fix_broken_links.py --check _site
+    python3 scripts/fix_broken_links.py --check _site --offline   # 只檢查站內連結
+
+內建檢查器：
+- 站內連結直接比對建置後的檔案樹，不發出 HTTP 請求
+- 外部連結以執行緒池並行檢查，每個主機有獨立的請求間隔
+- 外部連結狀態快取於 .cache/link_status.json（預設 TTL 7 天）
 """
 
 import re
 import sys
 import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
 from pathlib import Path
+from urllib.error import HTTPError, URLError
+from urllib.parse import unquote, urljoin, urlsplit
+from urllib.request import Request, urlopen
+
+
+PROJECT_ROOT = Path(__file__).parent.parent
+CACHE_PATH = PROJECT_ROOT / ".cache" / "link_status.json"
+SITE_URL = "https://supplement.weiqi.kids"
+
+DEFAULT_TTL = 7 * 24 * 3600        # 成功狀態快取 7 天
+ERROR_TTL = 24 * 3600              # 失敗狀態只快取 1 天，以便儘快重試
+DEFAULT_WORKERS = 16
+DEFAULT_HOST_INTERVAL = 0.5        # 同一主機兩次請求的最小間隔（秒）
+REQUEST_TIMEOUT = 15
+USER_AGENT = "Mozilla/5.0 (compatible; supplement-link-check/1.0)"
+
+# 不檢查的連結協定
+SKIP_SCHEMES = ("mailto:", "tel:", "javascript:", "data:")
 
 
 def parse_lychee_report(report_path: str) -> list[dict]:
@@ -64,6 +97,209 @@ def parse_lychee_report(report_path: str) -> list[dict]:
     return issues
 
 
+class LinkExtractor(HTMLParser):
+    """從 HTML 擷取 href / src 連結"""
+
+    def __init__(self):
+        super().__init__()
+        self.links = []
+
+    def handle_starttag(self, tag, attrs):
+        for name, value in attrs:
+            if name in ("href", "src") and value:
+                self.links.append(value.strip())
+
+
+def extract_links(html_path: Path) -> list[str]:
+    """擷取單一 HTML 檔案內的所有連結"""
+    parser = LinkExtractor()
+    try:
+        parser.feed(html_path.read_text(encoding="utf-8", errors="replace"))
+    except OSError:
+        return []
+    return parser.links
+
+
+def resolve_internal(site_dir: Path, page_path: Path, url: str) -> bool:
+    """以建置後的檔案樹解析站內連結，回傳目標是否存在"""
+    path = unquote(urlsplit(url).path)
+
+    if path.startswith("/"):
+        target = site_dir / path.lstrip("/")
+    else:
+        target = page_path.parent / path
+
+    # Jekyll 輸出：/foo/ → foo/index.html，/foo → foo.html 或 foo/index.html
+    candidates = [target]
+    if path.endswith("/") or target.is_dir():
+        candidates.append(target / "index.html")
+    else:
+        candidates.append(target.with_name(target.name + ".html"))
+
+    return any(c.is_file() for c in candidates)
+
+
+class HostRateLimiter:
+    """每個主機獨立的最小請求間隔"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._next_slot = {}
+
+    def wait(self, host: str):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class LinkStatusCache:
+    """外部連結狀態快取（JSON 檔，依狀態區分 TTL）"""
+
+    def __init__(self, path: Path, ttl: int = DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        try:
+            self.entries = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def get(self, url: str) -> dict | None:
+        entry = self.entries.get(url)
+        if not entry:
+            return None
+        ttl = self.ttl if entry.get("status", "").startswith("2") else min(self.ttl, ERROR_TTL)
+        if time.time() - entry.get("checked_at", 0) > ttl:
+            return None
+        return entry
+
+    def put(self, url: str, status: str, ok: bool):
+        with self._lock:
+            self.entries[url] = {"status": status, "ok": ok, "checked_at": int(time.time())}
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(self.entries, ensure_ascii=False), encoding="utf-8")
+        tmp_path.replace(self.path)
+
+
+def check_external(url: str, limiter: HostRateLimiter) -> tuple[str, bool]:
+    """檢查外部連結，先送 HEAD，不支援時改用 GET"""
+    host = urlsplit(url).netloc.lower()
+    status = "error"
+
+    for method in ("HEAD", "GET"):
+        limiter.wait(host)
+        req = Request(url, method=method, headers={"User-Agent": USER_AGENT})
+        try:
+            with urlopen(req, timeout=REQUEST_TIMEOUT) as resp:
+                return str(resp.status), True
+        except HTTPError as e:
+            status = str(e.code)
+            # 部分網站拒絕 HEAD，改用 GET 再試一次
+            if method == "HEAD" and e.code in (403, 405, 501):
+                continue
+            return status, e.code == 429
+        except (URLError, OSError, ValueError) as e:
+            reason = getattr(e, "reason", e)
+            return f"error: {reason}", False
+
+    return status, False
+
+
+def check_site(
+    site_dir: Path,
+    site_url: str = SITE_URL,
+    offline: bool = False,
+    workers: int = DEFAULT_WORKERS,
+    host_interval: float = DEFAULT_HOST_INTERVAL,
+    ttl: int = DEFAULT_TTL,
+    cache_path: Path = CACHE_PATH,
+) -> list[dict]:
+    """檢查建置後網站的所有連結，回傳與 lychee 報告相同格式的問題清單"""
+    issues = []
+    external_sources = {}
+    site_prefix = site_url.rstrip("/") + "/"
+
+    for html_path in sorted(site_dir.rglob("*.html")):
+        source = str(html_path.relative_to(site_dir))
+        page_url = site_prefix + source
+
+        for link in extract_links(html_path):
+            if link.startswith(SKIP_SCHEMES) or link.startswith("#"):
+                continue
+
+            # 指向本站的絕對網址視為站內連結
+            # （保留開頭的 /，site_url 是否以 / 結尾皆為站台根目錄相對路徑）
+            if link.startswith(site_prefix):
+                link = link[len(site_prefix) - 1:]
+            elif link == site_prefix[:-1]:
+                link = "/"
+
+            if link.startswith("//"):
+                link = "https:" + link
+
+            scheme = urlsplit(link).scheme
+            if not scheme:
+                if not resolve_internal(site_dir, html_path, link):
+                    issues.append({
+                        "type": "internal",
+                        "status": "404",
+                        "url": urljoin(page_url, link),
+                        "source": source,
+                    })
+            elif scheme in ("http", "https") and not offline:
+                url = link.split("#", 1)[0]
+                external_sources.setdefault(url, source)
+
+    if not external_sources:
+        return issues
+
+    cache = LinkStatusCache(cache_path, ttl)
+    limiter = HostRateLimiter(host_interval)
+    results = {}
+    pending = []
+
+    for url in external_sources:
+        entry = cache.get(url)
+        if entry:
+            results[url] = (entry["status"], entry["ok"])
+        else:
+            pending.append(url)
+
+    print(
+        f"🌐 外部連結 {len(external_sources)} 個（快取命中 {len(results)}，待檢查 {len(pending)}）",
+        file=sys.stderr,
+    )
+
+    def _check(url):
+        status, ok = check_external(url, limiter)
+        cache.put(url, status, ok)
+        return url, status, ok
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for url, status, ok in executor.map(_check, pending):
+            results[url] = (status, ok)
+
+    cache.save()
+
+    for url, (status, ok) in results.items():
+        if not ok:
+            issues.append({
+                "type": "external",
+                "status": status,
+                "url": url,
+                "source": external_sources[url],
+            })
+
+    return issues
+
+
 def attempt_fix(issue: dict) -> dict | None:
     """嘗試修復連結問題，返回修復建議或 None"""
     url = issue.get("url", "")
@@ -109,13 +345,38 @@ def attempt_fix(issue: dict) -> dict | None:
 
 
 def main():
-    if len(sys.argv) < 2:
-        print("用法: fix_broken_links.py <lychee-report.md>", file=sys.stderr)
+    parser = argparse.ArgumentParser(description="連結檢查與修復建議")
+    parser.add_argument("report", nargs="?", help="lychee Markdown 報告路徑")
+    parser.add_argument("--check", type=str, metavar="SITE_DIR", help="直接檢查建置後的網站目錄")
+    parser.add_argument("--output", type=str, default="link-report.json", help="--check 模式的 JSON 輸出路徑")
+    parser.add_argument("--site-url", type=str, default=SITE_URL, help="視為站內連結的網址前綴")
+    parser.add_argument("--offline", action="store_true", help="只檢查站內連結")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="外部連結並行數")
+    parser.add_argument("--host-interval", type=float, default=DEFAULT_HOST_INTERVAL, help="同一主機請求間隔（秒）")
+    parser.add_argument("--ttl", type=int, default=DEFAULT_TTL, help="外部連結狀態快取秒數")
+    args = parser.parse_args()
+
+    if args.check:
+        site_dir = Path(args.check)
+        if not site_dir.is_dir():
+            print(f"網站目錄不存在: {site_dir}", file=sys.stderr)
+            sys.exit(1)
+        issues = check_site(
+            site_dir,
+            site_url=args.site_url,
+            offline=args.offline,
+            workers=args.workers,
+            host_interval=args.host_interval,
+            ttl=args.ttl,
+        )
+        result_path = Path(args.output)
+    elif args.report:
+        issues = parse_lychee_report(args.report)
+        result_path = Path(args.report).with_suffix(".json")
+    else:
+        parser.print_usage(sys.stderr)
         sys.exit(1)
 
-    report_path = sys.argv[1]
-    issues = parse_lychee_report(report_path)
-
     if not issues:
         print("✅ 沒有發現連結問題")
         sys.exit(0)
@@ -160,7 +421,6 @@ def main():
     }
 
     # 寫入 JSON 結果
-    result_path = Path(report_path).with_suffix(".json")
     result_path.write_text(json.dumps(output, ensure_ascii=False, indent=2), encoding="utf-8")
     print(f"\n📄 詳細結果已寫入: {result_path}")
 
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+產品 frontmatter 快速解析
+
+萃取腳本（extract_*.py）寫出的 frontmatter 為固定格式的扁平欄位：
+
+    source_id: "12345"
+    product_name: "Fish Oil \"Plus\""
+    evidence_level: 3
+
+每行皆為 `key: "value"`（只跳脫雙引號）或 `key: 整數`。符合此格式的區塊
+以單一編譯正規表示式逐行解析；任何不符合的行（清單、多行字串、其他跳脫、
+註解等）整個區塊改由 yaml.safe_load 解析，結果與原本一致。
+
+用法：
+  python3 scripts/frontmatter.py --benchmark                         # 以合成樣本比較
+  python3 scripts/frontmatter.py --benchmark docs/Extractor/kr_hff   # 以實際檔案比較
+"""
+
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+try:
+    import yaml
+except ImportError:
+    yaml = None  # 僅快速路徑可用
+
+
+# key: "value" 或 key: 整數（不含前導 0，避免 YAML 1.1 八進位語意）
+LINE_RE = re.compile(r'([A-Za-z_][A-Za-z0-9_]*): (?:"((?:[^"\\]|\\["\\])*)"|(-?(?:0|[1-9][0-9]*)))[ \t]*')
+ESCAPE_RE = re.compile(r'\\(["\\])')
+
+
+def parse_fixed_schema(block: str):
+    """以固定格式解析 frontmatter 區塊，不符合時回傳 None"""
+    result = {}
+    for line in block.split("\n"):
+        if not line or line.isspace():
+            continue
+        match = LINE_RE.fullmatch(line.rstrip("\r"))
+        if not match:
+            return None
+        key, quoted, number = match.groups()
+        if number is not None:
+            result[key] = int(number)
+        elif "\\" in quoted:
+            result[key] = ESCAPE_RE.sub(r"\1", quoted)
+        else:
+            result[key] = quoted
+    return result
+
+
+def load_frontmatter(block: str) -> dict:
+    """解析 frontmatter 區塊（--- 之間的文字），失敗時回傳空 dict"""
+    result = parse_fixed_schema(block)
+    if result is not None:
+        return result
+
+    if yaml is None:
+        return {}
+    try:
+        data = yaml.safe_load(block)
+    except yaml.YAMLError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def split_frontmatter(content: str) -> tuple[dict, str]:
+    """拆分 Markdown 的 frontmatter 與內文；無 frontmatter 時回傳 ({}, content)"""
+    if not content.startswith("---"):
+        return {}, content
+    parts = content.split("---", 2)
+    if len(parts) < 3:
+        return {}, content
+    return load_frontmatter(parts[1]), parts[2]
+
+
+# ==========================================================
+# Benchmark
+# ==========================================================
+
+SAMPLE_BLOCK = '''
+source_id: "200123"
+source_layer: "kr_hff"
+source_url: "https://www.data.go.kr/data/15056760/openapi.do"
+market: "kr"
+product_name: "오메가3 \\"플러스\\" 1000"
+brand: "Example Co., Ltd."
+manufacturer: "Example Co., Ltd."
+category: "omega_fatty_acids"
+product_form: "softgel"
+date_entered: "20240115"
+fetched_at: "2026-02-03T10:00:00+00:00"
+'''
+
+
+def collect_blocks(path: Path, limit: int) -> list[str]:
+    """從目錄收集 frontmatter 區塊"""
+    blocks = []
+    for md_file in path.rglob("*.md"):
+        if "raw" in md_file.parts:
+            continue
+        content = md_file.read_text(encoding="utf-8").replace("[REVIEW_NEEDED]\n\n", "", 1)
+        if content.startswith("---"):
+            parts = content.split("---", 2)
+            if len(parts) >= 3:
+                blocks.append(parts[1])
+        if len(blocks) >= limit:
+            break
+    return blocks
+
+
+def benchmark(blocks: list[str], rounds: int):
+    """比較 yaml.safe_load 與固定格式解析的速度與結果"""
+    if yaml is None:
+        print("❌ 需要 pyyaml 才能比較", file=sys.stderr)
+        sys.exit(1)
+
+    conforming = sum(1 for b in blocks if parse_fixed_schema(b) is not None)
+    mismatches = sum(1 for b in blocks if load_frontmatter(b) != (yaml.safe_load(b) or {}))
+
+    def timed(fn):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for block in blocks:
+                fn(block)
+        return time.perf_counter() - start
+
+    yaml_time = timed(yaml.safe_load)
+    fast_time = timed(load_frontmatter)
+    total = len(blocks) * rounds
+
+    print(f"樣本：{len(blocks)} 個區塊 × {rounds} 輪（符合固定格式 {conforming}）")
+    print(f"  yaml.safe_load ：{yaml_time:.3f}s（{total / yaml_time:,.0f} 筆/秒）")
+    print(f"  load_frontmatter：{fast_time:.3f}s（{total / fast_time:,.0f} 筆/秒）")
+    print(f"  加速：{yaml_time / fast_time:.1f}x，結果不一致：{mismatches}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="frontmatter 快速解析")
+    parser.add_argument("--benchmark", nargs="?", const="", metavar="DIR", help="與 yaml.safe_load 比較效能")
+    parser.add_argument("--limit", type=int, default=5000, help="最多取樣檔案數")
+    parser.add_argument("--rounds", type=int, default=3, help="重複輪數")
+    args = parser.parse_args()
+
+    if args.benchmark is None:
+        parser.print_help()
+        return
+
+    if args.benchmark:
+        blocks = collect_blocks(Path(args.benchmark), args.limit)
+        if not blocks:
+            print(f"❌ 找不到含 frontmatter 的檔案：{args.benchmark}", file=sys.stderr)
+            sys.exit(1)
+    else:
+        blocks = [SAMPLE_BLOCK] * args.limit
+
+    benchmark(blocks, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
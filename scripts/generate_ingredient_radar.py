@@ -1,14 +1,36 @@
 #!/usr/bin/env python3
 """
 Generate ingredient radar monthly report
+
+Usage:
+  python3 scripts/generate_ingredient_radar.py             # use all CPU cores
+  python3 scripts/generate_ingredient_radar.py --jobs 1    # sequential scan
+
+Layer files are split into chunks; each worker returns partial Counter
+aggregates for its chunk, which are merged in chunk order so rankings
+(including tie order) match the sequential scan.
+
+Full ingredient × market × category counts for the period are also
+recorded in the trend store (see ingredient_trends.py), which
+recommend_topics.py uses for month-over-month signals.
+
+Per-product ingredient sets feed a co-occurrence engine (see
+cooccurrence.py) for the formulation section: top pairs by product count
+and by lift, globally and per market.
 """
 
+import argparse
 import os
 import re
+from concurrent.futures import ProcessPoolExecutor
 from collections import defaultdict, Counter
 from datetime import datetime
 from pathlib import Path
-import yaml
+
+from cooccurrence import CooccurrenceEngine
+from ingredient_trends import TrendStore
+from product_layout import layer_and_category
+from product_reader import ProductDocument
 
 # Base directory
 BASE_DIR = Path(__file__).parent.parent
@@ -121,14 +143,48 @@ INGREDIENT_MAPPING = {
     "마그네슘": "Magnesium",
 }
 
+# Files per worker task
+CHUNK_SIZE = 2000
+
+# Minimum products sharing a pair before it is ranked by lift
+FORMULATION_MIN_SUPPORT = 20
+
+# Precompiled patterns
+DOSAGE_RE = re.compile(r'\d+\.?\d*\s*(mg|mcg|μg|g|kg|iu|%)', re.IGNORECASE)
+PAREN_RE = re.compile(r'\(.*?\)')
+FULLWIDTH_PAREN_RE = re.compile(r'（.*?）')
+BRACKET_RE = re.compile(r'\[.*?\]')
+EM_DASH_RE = re.compile(r'—.*$')
+KR_SPEC_LINE_RE = re.compile(r'[①②③④⑤⑥⑦⑧⑨⑩\d)\-\s]*([가-힣A-Za-z\d\s]+?)\s*[:：]')
+COLON_RE = re.compile(r'[:：]')
+ITEM_SPLIT_RE = re.compile(r'[,、\n]')
+ANY_PAREN_RE = re.compile(r'[（(].*?[）)]')
+TOSHITE_RE = re.compile(r'として$')
+
+# Skip non-ingredient specs (safety/quality parameters)
+KR_SKIP_TERMS = frozenset([
+    '성상', '헥산', '납', '카드뮴', '수은', '비소', '대장균군', '붕해시험', '세균수',
+    '붕해도', '붕해', '중금속', '잔류농약', '대장균', '살모넬라', '황색포도상구균',
+    '용해도', 'pH', '수분', '회분', '기능성분수', '프로바이오틱스 수',
+    '색가', '향', '맛', '수 표시량',
+])
+
+# Skip nutritional facts that aren't actual supplement ingredients
+SKIP_NUTRITIONAL_FACTS = frozenset([
+    '0.0', 'Calories', 'Total Fat', 'Saturated Fat', 'Trans Fat',
+    'Cholesterol', 'Sodium', 'Total Carbohydrates', 'Dietary Fiber',
+    'Total Sugars', 'Protein', 'Sugar', 'Fat', 'Carbohydrate', 'Fiber',
+    '成分資料需額外擷取', 'Not Available',
+])
+
 def standardize_ingredient(ingredient):
     """Standardize ingredient name"""
     # Remove dosage info (numbers + units)
-    ingredient = re.sub(r'\d+\.?\d*\s*(mg|mcg|μg|g|kg|iu|%)', '', ingredient, flags=re.IGNORECASE)
-    ingredient = re.sub(r'\(.*?\)', '', ingredient)  # Remove parentheses content
-    ingredient = re.sub(r'（.*?）', '', ingredient)  # Remove full-width parentheses
-    ingredient = re.sub(r'\[.*?\]', '', ingredient)  # Remove brackets
-    ingredient = re.sub(r'—.*$', '', ingredient)  # Remove everything after em-dash
+    ingredient = DOSAGE_RE.sub('', ingredient)
+    ingredient = PAREN_RE.sub('', ingredient)  # Remove parentheses content
+    ingredient = FULLWIDTH_PAREN_RE.sub('', ingredient)  # Remove full-width parentheses
+    ingredient = BRACKET_RE.sub('', ingredient)  # Remove brackets
+    ingredient = EM_DASH_RE.sub('', ingredient)  # Remove everything after em-dash
     ingredient = ingredient.strip().lower()
 
     # Apply mapping
@@ -137,157 +193,183 @@ def standardize_ingredient(ingredient):
 def extract_ingredients_from_file(filepath, layer):
     """Extract ingredients from a single product file"""
     ingredients = []
-    category = filepath.parent.name
+    category = layer_and_category(filepath)[1]
 
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
+        doc = ProductDocument.from_file(filepath)
+        if doc is None:
+            return [], category
 
-            # Skip REVIEW_NEEDED files
-            if '[REVIEW_NEEDED]' in content:
-                return [], category
+        # Skip REVIEW_NEEDED files
+        if '[REVIEW_NEEDED]' in doc.content:
+            return [], category
 
-            # Extract market from frontmatter
-            market_match = re.search(r'^market:\s*"?(\w+)"?', content, re.MULTILINE)
-            market = market_match.group(1) if market_match else layer[:2]
+        # Extract market from frontmatter
+        market = doc.frontmatter.get('market') or layer[:2]
 
-            # Look for ingredient sections
-            match = None
+        # Look for ingredient sections
+        # (kr_hff: 規格基準, jp_foshu/jp_fnfc: 機能性成分, tw_hf: 保健功效成分, US/CA: 成分)
+        section = doc.ingredient_section(layer)
+        if section is not None:
+            ingredient_section = section.strip()
+
+            # Extract ingredients - handle both bullet list and plain text formats
             if layer == 'kr_hff':
-                # Korean uses 規格基準 section, extract ingredient lines
-                pattern = r'##\s*規格基準\s*\n(.*?)(?=\n##|\Z)'
-                match = re.search(pattern, content, re.DOTALL)
-            elif layer in ['jp_foshu', 'jp_fnfc']:
-                # Japanese use 機能性成分
-                pattern = r'##\s*機能性成分\s*\n(.*?)(?=\n##|\Z)'
-                match = re.search(pattern, content, re.DOTALL)
-            elif layer == 'tw_hf':
-                # Taiwan uses 保健功效成分
-                pattern = r'##\s*保健功效成分\s*\n(.*?)(?=\n##|\Z)'
-                match = re.search(pattern, content, re.DOTALL)
-            else:
-                # US, CA use 成分
-                pattern = r'##\s*成分\s*\n(.*?)(?=\n##|\Z)'
-                match = re.search(pattern, content, re.DOTALL)
-            if match:
-                ingredient_section = match.group(1).strip()
-
-                # Extract ingredients - handle both bullet list and plain text formats
-                if layer == 'kr_hff':
-                    # Korean format: extract ingredient names from specification lines
-                    # Format: ② 비타민B1 : 표시량의 80~180% [표시량 0.36mg/700mg]
-                    for line in ingredient_section.split('\n'):
-                        line = line.strip()
-                        # Match lines with ingredient names (Korean or English)
-                        ing_match = re.match(r'[①②③④⑤⑥⑦⑧⑨⑩\d)\-\s]*([가-힣A-Za-z\d\s]+?)\s*[:：]', line)
-                        if ing_match:
-                            ingredient = ing_match.group(1).strip()
-                            # Skip non-ingredient specs (safety/quality parameters)
-                            skip_terms = ['성상', '헥산', '납', '카드뮴', '수은', '비소', '대장균군', '붕해시험', '세균수',
-                                         '붕해도', '붕해', '중금속', '잔류농약', '대장균', '살모넬라', '황색포도상구균',
-                                         '용해도', 'pH', '수분', '회분', '기능성분수', '프로바이오틱스 수',
-                                         '색가', '향', '맛', '수 표시량']
-                            if ingredient not in skip_terms and not ingredient.endswith('수'):
-                                standardized = standardize_ingredient(ingredient)
-                                if standardized and len(standardized) > 1:
-                                    ingredients.append((standardized, market))
-
-                elif '\n-' in ingredient_section or ingredient_section.startswith('-'):
-                    # Bullet list format (US, CA)
-                    for line in ingredient_section.split('\n'):
-                        line = line.strip()
-                        if line.startswith('-'):
-                            # Remove leading dash and extract ingredient name
-                            ingredient = line[1:].strip()
-                            # For items like "Vitamin C: 0.0（Ascorbic acid）", extract "Vitamin C" or "Ascorbic acid"
-                            ingredient = re.split(r'[:：]', ingredient)[0].strip()
-                            if ingredient and len(ingredient) > 1:
-                                standardized = standardize_ingredient(ingredient)
-                                # Skip nutritional facts that aren't actual supplement ingredients
-                                skip_nutritional_facts = ['0.0', 'Calories', 'Total Fat', 'Saturated Fat', 'Trans Fat',
-                                                          'Cholesterol', 'Sodium', 'Total Carbohydrates', 'Dietary Fiber',
-                                                          'Total Sugars', 'Protein', 'Sugar', 'Fat', 'Carbohydrate', 'Fiber',
-                                                          '成分資料需額外擷取', 'Not Available']
-                                if standardized not in skip_nutritional_facts:
-                                    ingredients.append((standardized, market))
-                else:
-                    # Plain text or comma-separated format (JP, TW)
-                    # Split by newline or comma
-                    items = re.split(r'[,、\n]', ingredient_section)
-                    for item in items:
-                        ingredient = item.strip()
-                        # Remove parenthetical content and dosage
-                        ingredient = re.sub(r'[（(].*?[）)]', '', ingredient)
-                        ingredient = re.sub(r'として$', '', ingredient)  # Remove "として" suffix
-                        ingredient = ingredient.strip()
+                # Korean format: extract ingredient names from specification lines
+                # Format: ② 비타민B1 : 표시량의 80~180% [표시량 0.36mg/700mg]
+                for line in ingredient_section.split('\n'):
+                    line = line.strip()
+                    # Match lines with ingredient names (Korean or English)
+                    ing_match = KR_SPEC_LINE_RE.match(line)
+                    if ing_match:
+                        ingredient = ing_match.group(1).strip()
+                        if ingredient not in KR_SKIP_TERMS and not ingredient.endswith('수'):
+                            standardized = standardize_ingredient(ingredient)
+                            if standardized and len(standardized) > 1:
+                                ingredients.append((standardized, market))
 
+            elif '\n-' in ingredient_section or ingredient_section.startswith('-'):
+                # Bullet list format (US, CA)
+                for line in ingredient_section.split('\n'):
+                    line = line.strip()
+                    if line.startswith('-'):
+                        # Remove leading dash and extract ingredient name
+                        ingredient = line[1:].strip()
+                        # For items like "Vitamin C: 0.0（Ascorbic acid）", extract "Vitamin C" or "Ascorbic acid"
+                        ingredient = COLON_RE.split(ingredient, 1)[0].strip()
                         if ingredient and len(ingredient) > 1:
                             standardized = standardize_ingredient(ingredient)
-                            # Skip nutritional facts that aren't actual supplement ingredients
-                            skip_nutritional_facts = ['0.0', 'Calories', 'Total Fat', 'Saturated Fat', 'Trans Fat',
-                                                      'Cholesterol', 'Sodium', 'Total Carbohydrates', 'Dietary Fiber',
-                                                      'Total Sugars', 'Protein', 'Sugar', 'Fat', 'Carbohydrate', 'Fiber',
-                                                      '成分資料需額外擷取', 'Not Available']
-                            if standardized not in skip_nutritional_facts:
+                            if standardized not in SKIP_NUTRITIONAL_FACTS:
                                 ingredients.append((standardized, market))
-
-            return ingredients, category
+            else:
+                # Plain text or comma-separated format (JP, TW)
+                # Split by newline or comma
+                items = ITEM_SPLIT_RE.split(ingredient_section)
+                for item in items:
+                    ingredient = item.strip()
+                    # Remove parenthetical content and dosage
+                    ingredient = ANY_PAREN_RE.sub('', ingredient)
+                    ingredient = TOSHITE_RE.sub('', ingredient)  # Remove "として" suffix
+                    ingredient = ingredient.strip()
+
+                    if ingredient and len(ingredient) > 1:
+                        standardized = standardize_ingredient(ingredient)
+                        if standardized not in SKIP_NUTRITIONAL_FACTS:
+                            ingredients.append((standardized, market))
+
+        return ingredients, category
     except Exception as e:
         return [], category
 
-def analyze_layers():
-    """Analyze all layers and extract ingredient statistics"""
-    print("Analyzing ingredient data from all layers...")
+def new_partial_stats():
+    """Empty aggregate container (picklable, returned by workers)"""
+    return {
+        'global_top': Counter(),  # ingredient -> total count
+        'ingredient_markets': defaultdict(set),  # ingredient -> set of markets
+        'ingredient_categories': defaultdict(Counter),  # ingredient -> {category: count}
+        'market_top': defaultdict(Counter),  # market -> {ingredient: count}
+        'category_top': defaultdict(Counter),  # category -> {ingredient: count}
+        'cells': Counter(),  # (ingredient, market, category) -> count
+        'formulations': [],  # (ingredient set, market, category) per product
+        'product_count': 0,
+    }
+
+def analyze_chunk(task):
+    """Map step: aggregate one chunk of product files from a single layer"""
+    layer, paths = task
+    partial = new_partial_stats()
 
-    # Global counters
-    global_ingredient_count = Counter()  # ingredient -> total count
-    ingredient_markets = defaultdict(set)  # ingredient -> set of markets
-    ingredient_categories = defaultdict(Counter)  # ingredient -> {category: count}
-    market_ingredients = defaultdict(Counter)  # market -> {ingredient: count}
-    category_ingredients = defaultdict(Counter)  # category -> {ingredient: count}
+    for path in paths:
+        md_file = Path(path)
+        if 'REVIEW_NEEDED' in md_file.name:
+            continue
 
-    total_products = 0
-    layer_stats = {}
+        ingredients, category = extract_ingredients_from_file(md_file, layer)
+        if ingredients:
+            partial['product_count'] += 1
+
+            for ingredient, market in ingredients:
+                partial['global_top'][ingredient] += 1
+                partial['ingredient_markets'][ingredient].add(market)
+                partial['ingredient_categories'][ingredient][category] += 1
+                partial['market_top'][market][ingredient] += 1
+                partial['category_top'][category][ingredient] += 1
+                partial['cells'][(ingredient, market, category)] += 1
+
+            partial['formulations'].append(
+                (tuple(sorted({name for name, _ in ingredients})), ingredients[0][1], category)
+            )
+
+    return layer, partial
+
+def merge_partial(total, partial):
+    """Reduce step: merge a chunk aggregate into the running total"""
+    total['global_top'].update(partial['global_top'])
+    total['cells'].update(partial['cells'])
+    total['formulations'].extend(partial['formulations'])
+    for ingredient, markets in partial['ingredient_markets'].items():
+        total['ingredient_markets'][ingredient] |= markets
+    for key in ('ingredient_categories', 'market_top', 'category_top'):
+        for outer, counter in partial[key].items():
+            total[key][outer].update(counter)
+    total['product_count'] += partial['product_count']
+
+def analyze_layers(jobs=1, chunk_size=CHUNK_SIZE):
+    """Analyze all layers and extract ingredient statistics
+
+    Args:
+        jobs: worker processes (1 = sequential, same code path)
+        chunk_size: product files per worker task
+    """
+    print("Analyzing ingredient data from all layers...")
 
+    tasks = []
     for layer in LAYERS:
         layer_dir = EXTRACTOR_DIR / layer
         if not layer_dir.exists():
             print(f"  ⚠️  Layer {layer} directory not found, skipping")
             continue
 
-        layer_count = 0
-        print(f"  Processing {layer}...")
+        paths = [str(p) for p in layer_dir.rglob("*.md")]
+        print(f"  Queued {layer}: {len(paths):,} files")
+        for i in range(0, len(paths), chunk_size):
+            tasks.append((layer, paths[i:i + chunk_size]))
 
-        # Process all .md files in this layer
-        for md_file in layer_dir.rglob("*.md"):
-            if 'REVIEW_NEEDED' in md_file.name:
-                continue
+    total = new_partial_stats()
+    layer_stats = {layer: 0 for layer in LAYERS if (EXTRACTOR_DIR / layer).exists()}
 
-            ingredients, category = extract_ingredients_from_file(md_file, layer)
-            if ingredients:
-                layer_count += 1
-                total_products += 1
+    if jobs > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            # map() yields in submission order, keeping merge order deterministic
+            results = executor.map(analyze_chunk, tasks)
+            for layer, partial in results:
+                merge_partial(total, partial)
+                layer_stats[layer] += partial['product_count']
+    else:
+        for task in tasks:
+            layer, partial = analyze_chunk(task)
+            merge_partial(total, partial)
+            layer_stats[layer] += partial['product_count']
 
-                for ingredient, market in ingredients:
-                    global_ingredient_count[ingredient] += 1
-                    ingredient_markets[ingredient].add(market)
-                    ingredient_categories[ingredient][category] += 1
-                    market_ingredients[market][ingredient] += 1
-                    category_ingredients[category][ingredient] += 1
+    for layer, count in layer_stats.items():
+        print(f"    ✓ {layer}: processed {count} products")
 
-        layer_stats[layer] = layer_count
-        print(f"    ✓ Processed {layer_count} products")
+    print(f"\n✓ Total products analyzed: {total['product_count']}")
 
-    print(f"\n✓ Total products analyzed: {total_products}")
+    cooccurrence = CooccurrenceEngine()
+    for ingredient_set, market, category in total['formulations']:
+        cooccurrence.add(ingredient_set, market=market, category=category)
 
     return {
-        'global_top': global_ingredient_count,
-        'ingredient_markets': ingredient_markets,
-        'ingredient_categories': ingredient_categories,
-        'market_top': market_ingredients,
-        'category_top': category_ingredients,
+        'global_top': total['global_top'],
+        'ingredient_markets': total['ingredient_markets'],
+        'ingredient_categories': total['ingredient_categories'],
+        'market_top': total['market_top'],
+        'category_top': total['category_top'],
+        'cells': total['cells'],
+        'cooccurrence': cooccurrence,
         'layer_stats': layer_stats,
-        'total_products': total_products
+        'total_products': total['product_count']
     }
 
 def generate_report(stats):
@@ -408,6 +490,34 @@ source_layers:
                 markets_with_cat.update(stats['ingredient_markets'][ing])
             report += f"- 市場分布：{len(markets_with_cat)} 個市場涵蓋，以 {', '.join([MARKET_ICONS[m] for m in sorted(markets_with_cat)])} 為主\n\n"
 
+    # Formulation (co-occurrence) analysis
+    cooccurrence = stats['cooccurrence']
+    global_pairs = cooccurrence.matrix()
+    if len(global_pairs):
+        report += "## 成分配方組合\n\n"
+        report += "### 常見成分組合 Top 10\n"
+        report += "| 排名 | 成分組合 | 共同出現產品數 | Lift |\n"
+        report += "|------|----------|---------------|------|\n"
+        for rank, item in enumerate(global_pairs.top_pairs(10, min_count=2), 1):
+            report += f"| {rank} | {' + '.join(item['pair'])} | {item['count']:,} | {item['lift']:.2f} |\n"
+
+        lift_pairs = global_pairs.top_pairs(10, metric='lift', min_count=FORMULATION_MIN_SUPPORT)
+        if lift_pairs:
+            report += "\n### 高關聯成分組合\n"
+            report += f"> 共同出現 ≥ {FORMULATION_MIN_SUPPORT} 產品，依 Lift 排序（Lift > 1 表示比各自獨立出現更常搭配）\n\n"
+            report += "| 排名 | 成分組合 | 共同出現產品數 | Lift |\n"
+            report += "|------|----------|---------------|------|\n"
+            for rank, item in enumerate(lift_pairs, 1):
+                report += f"| {rank} | {' + '.join(item['pair'])} | {item['count']:,} | {item['lift']:.2f} |\n"
+
+        report += "\n### 各市場常見組合\n"
+        for market_code, market_name in MARKET_ICONS.items():
+            market_pairs = cooccurrence.matrix(market=market_code).top_pairs(3, min_count=2)
+            if market_pairs:
+                pairs_str = '、'.join(f"{' + '.join(item['pair'])}（{item['count']:,}）" for item in market_pairs)
+                report += f"- {market_name}：{pairs_str}\n"
+        report += "\n"
+
     # Trends section
     report += """## 趨勢觀察
 
@@ -464,12 +574,19 @@ source_layers:
     return report, period
 
 def main():
+    parser = argparse.ArgumentParser(description="Ingredient radar monthly report")
+    parser.add_argument("--jobs", "-j", type=int, default=os.cpu_count() or 1,
+                        help="worker processes (default: CPU count, 1 = sequential)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE,
+                        help=f"product files per worker task (default: {CHUNK_SIZE})")
+    args = parser.parse_args()
+
     print("=" * 60)
     print("Ingredient Radar Report Generator")
     print("=" * 60)
 
     # Analyze all layers
-    stats = analyze_layers()
+    stats = analyze_layers(jobs=args.jobs, chunk_size=args.chunk_size)
 
     # Generate report
     print("\nGenerating report...")
@@ -483,6 +600,12 @@ def main():
         f.write(report_content)
 
     print(f"\n✓ Report generated: {output_file}")
+
+    # Persist full counts for month-over-month trends
+    store = TrendStore.load()
+    store.record(period, stats['cells'], stats['total_products'])
+    store.save()
+    print(f"✓ Trend store updated: {len(store.periods)} periods")
     print(f"✓ Analyzed {stats['total_products']:,} products")
     print(f"✓ Identified {len(stats['global_top'])} unique ingredients")
 
@@ -5,15 +5,18 @@ import os
 import sys
 import glob
 import argparse
-import re
 from datetime import datetime, timezone
 from collections import defaultdict
 
+from literature_stats import LiteratureFrame
+
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 PUBMED_DIR = os.path.join(BASE_DIR, "docs/Extractor/pubmed")
 TOPICS_DIR = os.path.join(BASE_DIR, "core/Narrator/Modes/topic_tracking/topics")
 OUTPUT_DIR = os.path.join(BASE_DIR, "docs/Narrator/literature_review")
 
+ABSTRACT_HEADING = "## 摘要\n"
+
 # 功效分類中文名稱
 CLAIM_CATEGORY_NAMES = {
     "anti_aging": "抗衰老",
@@ -106,6 +109,25 @@ def parse_frontmatter(content: str) -> dict:
     return frontmatter
 
 
+def extract_abstract(content: str) -> str:
+    """第一個「## 摘要」之後至下一個 ## 標題的內容
+
+    結果與原本的非貪婪正規表示式（DOTALL，止於下一個 ## 標題或字串結尾）相同，
+    以字串搜尋取代逐字元比對。
+    """
+    start = content.find(ABSTRACT_HEADING)
+    if start == -1:
+        return ""
+    body = start + len(ABSTRACT_HEADING)
+    if body >= len(content):
+        return ""
+    end = content.find("\n## ", body + 1)
+    if end == -1:
+        # $ 也符合結尾換行之前的位置
+        end = len(content) - 1 if content.endswith("\n") and len(content) - 1 > body else len(content)
+    return content[body:end].strip()
+
+
 def load_articles(topic_id: str) -> list:
     """載入特定主題的所有文獻"""
     topic_dir = os.path.join(PUBMED_DIR, topic_id)
@@ -124,9 +146,7 @@ def load_articles(topic_id: str) -> list:
 
             fm = parse_frontmatter(content)
             if fm:
-                # 提取摘要（第一個 ## 摘要 之後的內容）
-                abstract_match = re.search(r"## 摘要\n(.+?)(?=\n## |$)", content, re.DOTALL)
-                fm["abstract_text"] = abstract_match.group(1).strip() if abstract_match else ""
+                fm["abstract_text"] = extract_abstract(content)
                 articles.append(fm)
         except Exception as e:
             print(f"  載入失敗: {md_file}: {e}", file=sys.stderr)
@@ -135,87 +155,9 @@ def load_articles(topic_id: str) -> list:
 
 
 def calculate_statistics(articles: list, topic_id: str = None) -> dict:
-    """計算文獻統計資料"""
-    stats = {
-        "total": len(articles),
-        "by_evidence_level": defaultdict(int),
-        "by_study_type": defaultdict(int),
-        "by_claim_category": defaultdict(int),
-        "by_ingredient": defaultdict(int),
-        "ingredient_pairs": defaultdict(int),  # 成分搭配統計
-        "ingredient_category": defaultdict(lambda: defaultdict(int)),  # 成分-功效交叉
-        "level_1_articles": [],
-        "level_2_articles": [],
-        "advanced_topics": defaultdict(lambda: {"count": 0, "articles": [], "subtypes": defaultdict(int)}),
-    }
-
-    for article in articles:
-        # 證據等級統計
-        level = article.get("evidence_level", 5)
-        try:
-            level = int(level)
-        except:
-            level = 5
-        stats["by_evidence_level"][level] += 1
-
-        # 研究類型統計
-        study_type = article.get("study_type", "other")
-        stats["by_study_type"][study_type] += 1
-
-        # 功效分類統計
-        categories = article.get("claim_categories", [])
-        if isinstance(categories, str):
-            categories = [categories]
-        for cat in categories:
-            stats["by_claim_category"][cat] += 1
-
-        # 成分統計
-        ingredients = article.get("ingredients_mentioned", [])
-        if isinstance(ingredients, str):
-            ingredients = [ingredients]
-        for ing in ingredients:
-            stats["by_ingredient"][ing] += 1
-
-        # 成分搭配統計（兩兩組合）
-        sorted_ings = sorted(set(ingredients))
-        for i in range(len(sorted_ings)):
-            for j in range(i + 1, len(sorted_ings)):
-                pair = f"{sorted_ings[i]} + {sorted_ings[j]}"
-                stats["ingredient_pairs"][pair] += 1
-
-        # 成分-功效交叉統計
-        for ing in ingredients:
-            for cat in categories:
-                stats["ingredient_category"][ing][cat] += 1
-
-        # 收集高證據等級文獻
-        if level == 1:
-            stats["level_1_articles"].append(article)
-        elif level == 2:
-            stats["level_2_articles"].append(article)
-
-        # 進階研究方向統計
-        if topic_id and topic_id in ADVANCED_RESEARCH_TOPICS:
-            title_abstract = f"{article.get('title', '')} {article.get('abstract_text', '')}".lower()
-            for adv_key, adv_config in ADVANCED_RESEARCH_TOPICS[topic_id].items():
-                # 檢查是否匹配進階主題關鍵詞
-                matched = False
-                for kw in adv_config.get("keywords", []):
-                    if kw.lower() in title_abstract:
-                        matched = True
-                        break
-                if matched:
-                    stats["advanced_topics"][adv_key]["count"] += 1
-                    if len(stats["advanced_topics"][adv_key]["articles"]) < 10:
-                        stats["advanced_topics"][adv_key]["articles"].append(article)
-                    # 統計子類型
-                    for subtype, subkws in adv_config.get("subtypes", {}).items():
-                        for skw in subkws:
-                            if skw.lower() in title_abstract:
-                                stats["advanced_topics"][adv_key]["subtypes"][subtype] += 1
-                                break
-
-    return stats
+    """計算文獻統計資料（欄式統計引擎，見 literature_stats.py）"""
+    frame = LiteratureFrame(articles)
+    return frame.statistics(ADVANCED_RESEARCH_TOPICS.get(topic_id) if topic_id else None)
 
 
 def generate_report(topic_id: str, period: str) -> str:
@@ -289,19 +231,18 @@ total_articles: {stats['total']}
         report += f"| {ing} | {count} |\n"
 
     # 成分組合統計（取前 10）
-    if stats['ingredient_pairs']:
+    if len(stats['cooccurrence']):
         report += """
 ## 成分組合分析
 
-以下列出最常被共同研究的成分組合：
+以下列出最常被共同研究的成分組合（Lift > 1 表示比各自獨立出現更常一起被研究）：
 
-| 成分組合 | 共同出現文獻數 |
-|----------|---------------|
+| 成分組合 | 共同出現文獻數 | Lift |
+|----------|---------------|------|
 """
-        sorted_pairs = sorted(stats['ingredient_pairs'].items(), key=lambda x: -x[1])[:10]
-        for pair, count in sorted_pairs:
-            if count >= 2:  # 只顯示出現 2 次以上的組合
-                report += f"| {pair} | {count} |\n"
+        # 只顯示出現 2 次以上的組合
+        for item in stats['cooccurrence'].top_pairs(10, min_count=2):
+            report += f"| {' + '.join(item['pair'])} | {item['count']} | {item['lift']:.2f} |\n"
 
     # 成分-功效交叉分析（取主要成分的功效分布）
     if stats['ingredient_category']:
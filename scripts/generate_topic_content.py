@@ -16,29 +16,41 @@ AI 產生主題首頁和選購指南
 4. 執行網路搜尋（可選）
 5. 整合所有資料，呼叫 Claude API 產生內容
 6. 寫入 docs/reports/{topic_id}/index.md 和 guide.md
+
+API 呼叫：
+- 以共用的 HttpClient（keep-alive）直接呼叫 Messages API，429/5xx/529 自動重試
+- 回應依 prompt 雜湊快取於 .cache/llm_responses/，prompt 未變動時不重新產生
+  （--no-cache 強制重新產生）
+- --all 時先準備所有主題的 prompt，再以執行緒池並行送出（--concurrency）
+- ANTHROPIC_BASE_URL 可指定 API 位址（如本機 stub server）
+
+跳過未變動的主題（--force 強制重新產生）：
+- input_fingerprint：主題設定、範本版本與相關品類產品檔 stat 的雜湊；
+  與輸出檔記錄相同時，不掃描產品也不呼叫 API
+- prompt_fingerprint：主題設定、範本版本與 prompts（含產品統計）的雜湊；
+  產品檔有變動但統計結果相同時，不呼叫 API，只更新 input_fingerprint
+兩者記錄於 index.md 與 guide.md 的 frontmatter。
+沒有匹配產品的主題不產生輸出檔，其 input_fingerprint 記錄於
+.cache/llm_responses/no_products/{topic_id}.json；未變動時同樣不重新掃描。
 """
 
 import argparse
+import hashlib
 import json
 import os
 import re
+import threading
 import yaml
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 from collections import defaultdict
 from typing import Optional
 
-try:
-    import anthropic
-    HAS_ANTHROPIC = True
-except ImportError:
-    HAS_ANTHROPIC = False
-
-try:
-    import requests
-    HAS_REQUESTS = True
-except ImportError:
-    HAS_REQUESTS = False
+from frontmatter import split_frontmatter
+from http_client import HttpClient, HttpError
+from product_layout import iter_category_files
+from product_reader import ProductDocument
 
 
 # 路徑配置
@@ -46,6 +58,25 @@ PROJECT_ROOT = Path(__file__).parent.parent
 TOPICS_DIR = PROJECT_ROOT / "core" / "Narrator" / "Modes" / "topic_tracking" / "topics"
 EXTRACTOR_DIR = PROJECT_ROOT / "docs" / "Extractor"
 REPORTS_DIR = PROJECT_ROOT / "docs" / "reports"
+LLM_CACHE_DIR = PROJECT_ROOT / ".cache" / "llm_responses"
+NO_PRODUCTS_DIR = LLM_CACHE_DIR / "no_products"
+
+# Claude API
+API_BASE = os.environ.get("ANTHROPIC_BASE_URL", "https://api.anthropic.com").rstrip("/")
+API_VERSION = "2023-06-01"
+MODEL = "claude-sonnet-4-20250514"
+MAX_TOKENS = 4000
+API_TIMEOUT = 600
+API_RETRIES = 4
+DEFAULT_CONCURRENCY = 4
+
+LLM_CLIENT = HttpClient(timeout=API_TIMEOUT, max_retries=API_RETRIES)
+
+# prompt 範本與輸出格式版本（修改 generate_*_prompt 或 frontmatter 時遞增）
+TEMPLATE_VERSION = 1
+
+OUTPUT_FILES = ("index.md", "guide.md")
+FINGERPRINT_LINE_RE = re.compile(r'^input_fingerprint: ".*"$', re.MULTILINE)
 
 # Layer 對應市場
 LAYER_MARKET = {
@@ -99,71 +130,50 @@ def load_all_topics() -> list[dict]:
     return topics
 
 
+# 成分章節（依序全部納入）與健康聲明章節（取第一個）
+INGREDIENT_SECTIONS = ["成分", "機能性成分", "機能性関与成分", "Ingredients"]
+CLAIM_SECTIONS = ["健康聲明", "Health Claim", "届出表示"]
+
+
 def parse_product_file(file_path: Path) -> Optional[dict]:
     """解析產品 Markdown 檔案"""
-    content = file_path.read_text(encoding="utf-8")
+    doc = ProductDocument.from_file(file_path)
 
     # 跳過 REVIEW_NEEDED 產品
-    if "[REVIEW_NEEDED]" in content:
+    if doc is None or "[REVIEW_NEEDED]" in doc.content:
         return None
 
+    fm = doc.frontmatter
     product = {
         "file_path": str(file_path),
-        "name": "",
-        "brand": "",
-        "manufacturer": "",
+        "name": fm.get("product_name", ""),
+        "brand": fm.get("brand", ""),
+        "manufacturer": fm.get("manufacturer", ""),
         "ingredients": [],
-        "health_claim": "",
-        "form": "",
-        "layer": file_path.parent.parent.name,
-        "category": file_path.parent.name,
+        "health_claim": fm.get("health_claim", ""),
+        "form": fm.get("product_form", ""),
+        "layer": doc.layer,
+        "category": doc.category,
     }
 
-    # 解析 frontmatter
-    if content.startswith("---"):
-        parts = content.split("---", 2)
-        if len(parts) >= 3:
-            try:
-                fm = yaml.safe_load(parts[1])
-                if fm:
-                    product["name"] = fm.get("product_name", "")
-                    product["brand"] = fm.get("brand", "")
-                    product["manufacturer"] = fm.get("manufacturer", "")
-                    product["form"] = fm.get("product_form", "")
-                    product["health_claim"] = fm.get("health_claim", "")
-            except yaml.YAMLError:
-                pass
-
     # 提取成分
-    ingredient_patterns = [
-        r"## 成分\s*\n([\s\S]*?)(?=\n##|\Z)",
-        r"## 機能性成分\s*\n([\s\S]*?)(?=\n##|\Z)",
-        r"## 機能性関与成分\s*\n([\s\S]*?)(?=\n##|\Z)",
-        r"## Ingredients\s*\n([\s\S]*?)(?=\n##|\Z)",
-    ]
-
-    for pattern in ingredient_patterns:
-        match = re.search(pattern, content, re.IGNORECASE)
-        if match:
-            ingredients_text = match.group(1)
-            for line in ingredients_text.split("\n"):
-                line = line.strip()
-                if line.startswith("- "):
-                    product["ingredients"].append(line[2:].strip())
-                elif line and not line.startswith("#"):
-                    product["ingredients"].append(line)
+    for name in INGREDIENT_SECTIONS:
+        ingredients_text = doc.section(name)
+        if ingredients_text is None:
+            continue
+        for line in ingredients_text.split("\n"):
+            line = line.strip()
+            if line.startswith("- "):
+                product["ingredients"].append(line[2:].strip())
+            elif line and not line.startswith("#"):
+                product["ingredients"].append(line)
 
     # 提取健康聲明（如果 frontmatter 沒有）
     if not product["health_claim"]:
-        claim_patterns = [
-            r"## 健康聲明\s*\n([\s\S]*?)(?=\n##|\Z)",
-            r"## Health Claim\s*\n([\s\S]*?)(?=\n##|\Z)",
-            r"## 届出表示\s*\n([\s\S]*?)(?=\n##|\Z)",
-        ]
-        for pattern in claim_patterns:
-            match = re.search(pattern, content, re.IGNORECASE)
-            if match:
-                product["health_claim"] = match.group(1).strip()[:500]
+        for name in CLAIM_SECTIONS:
+            claim_text = doc.section(name)
+            if claim_text is not None:
+                product["health_claim"] = claim_text.strip()[:500]
                 break
 
     return product
@@ -225,7 +235,7 @@ def scan_products(topic: dict, sample_limit: int = 0) -> list[dict]:
             if category_filter and category_dir.name not in category_filter:
                 continue
 
-            for product_file in category_dir.glob("*.md"):
+            for product_file in iter_category_files(category_dir):
                 scanned += 1
                 if scanned % 10000 == 0:
                     print(".", end="", flush=True)
@@ -461,46 +471,178 @@ A2:
 """
 
 
-def call_claude_api(prompt: str, max_tokens: int = 4000) -> Optional[str]:
-    """呼叫 Claude API 產生內容"""
-    if not HAS_ANTHROPIC:
-        print("⚠️  anthropic 套件未安裝，無法呼叫 API")
+_category_signatures = None
+
+
+def category_signatures() -> dict:
+    """(layer, category) → 產品檔 stat（檔名、mtime、大小）的雜湊
+
+    只取 stat 不讀取內容，每次執行計算一次，所有主題共用。
+    """
+    global _category_signatures
+    if _category_signatures is not None:
+        return _category_signatures
+
+    signatures = {}
+    if EXTRACTOR_DIR.is_dir():
+        for layer_dir in sorted(EXTRACTOR_DIR.iterdir()):
+            if not layer_dir.is_dir() or layer_dir.name not in LAYER_MARKET:
+                continue
+            for category_dir in sorted(layer_dir.iterdir()):
+                if not category_dir.is_dir() or category_dir.name == "raw":
+                    continue
+                digest = hashlib.sha1()
+                for product_file in sorted(iter_category_files(category_dir)):
+                    st = product_file.stat()
+                    digest.update(f"{product_file.name}\0{st.st_mtime_ns}\0{st.st_size}\n".encode("utf-8"))
+                signatures[(layer_dir.name, category_dir.name)] = digest.hexdigest()
+    _category_signatures = signatures
+    return signatures
+
+
+def fingerprint(*parts) -> str:
+    payload = json.dumps([TEMPLATE_VERSION, MODEL, *parts], ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def input_fingerprint(topic: dict, skip_web: bool, sample_limit: int) -> str:
+    """主題設定 + 相關品類產品檔狀態的指紋（不需掃描產品內容）"""
+    category_filter = topic.get("category_filter", [])
+    corpus = sorted(
+        (f"{layer}/{category}", signature)
+        for (layer, category), signature in category_signatures().items()
+        if not category_filter or category in category_filter
+    )
+    return fingerprint("input", topic, skip_web, sample_limit, corpus)
+
+
+def stored_fingerprints(topic_id: str) -> list[dict]:
+    """讀取既有輸出檔 frontmatter 的指紋；任一檔案不存在時回傳空 list"""
+    stored = []
+    for filename in OUTPUT_FILES:
+        try:
+            content = (REPORTS_DIR / topic_id / filename).read_text(encoding="utf-8")
+        except OSError:
+            return []
+        fm, _ = split_frontmatter(content)
+        stored.append(fm)
+    return stored
+
+
+def update_input_fingerprint(topic_id: str, value: str):
+    """只更新既有輸出檔的 input_fingerprint（內容與 generated_at 不變）"""
+    for filename in OUTPUT_FILES:
+        path = REPORTS_DIR / topic_id / filename
+        content = path.read_text(encoding="utf-8")
+        path.write_text(FINGERPRINT_LINE_RE.sub(f'input_fingerprint: "{value}"', content, count=1), encoding="utf-8")
+
+
+def no_products_fingerprint(topic_id: str) -> Optional[str]:
+    """上次掃描無匹配產品時記錄的 input_fingerprint"""
+    try:
+        with open(NO_PRODUCTS_DIR / f"{topic_id}.json", "r", encoding="utf-8") as f:
+            return json.load(f).get("input_fingerprint")
+    except (OSError, json.JSONDecodeError, AttributeError):
         return None
 
+
+def record_no_products(topic_id: str, value: Optional[str]):
+    """記錄（value 為 None 時移除）無匹配產品主題的 input_fingerprint"""
+    path = NO_PRODUCTS_DIR / f"{topic_id}.json"
+    if value is None:
+        path.unlink(missing_ok=True)
+        return
+    NO_PRODUCTS_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"input_fingerprint": value, "checked_at": datetime.now().isoformat()}, f)
+    os.replace(tmp_path, path)
+
+
+def prompt_key(prompt: str, max_tokens: int) -> str:
+    """prompt 快取鍵（模型、max_tokens 與 prompt 內容的雜湊）"""
+    payload = json.dumps({"model": MODEL, "max_tokens": max_tokens, "prompt": prompt}, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def load_cached_response(key: str) -> Optional[str]:
+    try:
+        with open(LLM_CACHE_DIR / f"{key}.json", "r", encoding="utf-8") as f:
+            return json.load(f)["text"]
+    except (OSError, json.JSONDecodeError, KeyError):
+        return None
+
+
+def save_cached_response(key: str, text: str):
+    """寫入回應快取（先寫暫存檔再替換）"""
+    LLM_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    path = LLM_CACHE_DIR / f"{key}.json"
+    tmp_path = path.with_name(f"{key}.{threading.get_ident()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"model": MODEL, "created_at": datetime.now().isoformat(), "text": text}, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def call_claude_api(prompt: str, max_tokens: int = MAX_TOKENS, use_cache: bool = True) -> Optional[str]:
+    """呼叫 Claude API 產生內容（相同 prompt 直接使用快取）"""
+    key = prompt_key(prompt, max_tokens)
+    if use_cache:
+        cached = load_cached_response(key)
+        if cached is not None:
+            return cached
+
     api_key = os.environ.get("ANTHROPIC_API_KEY")
     if not api_key:
         print("⚠️  ANTHROPIC_API_KEY 未設定")
         return None
 
     try:
-        client = anthropic.Anthropic(api_key=api_key)
-        message = client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=max_tokens,
-            messages=[
-                {"role": "user", "content": prompt}
-            ]
+        response = LLM_CLIENT.post(
+            f"{API_BASE}/v1/messages",
+            json_body={
+                "model": MODEL,
+                "max_tokens": max_tokens,
+                "messages": [
+                    {"role": "user", "content": prompt}
+                ]
+            },
+            headers={"x-api-key": api_key, "anthropic-version": API_VERSION},
         )
-        return message.content[0].text
-    except Exception as e:
+        message = response.json()
+        text = "".join(block.get("text", "") for block in message.get("content", []) if block.get("type") == "text")
+    except (HttpError, ValueError, AttributeError) as e:
         print(f"❌ API 呼叫失敗: {e}")
         return None
 
+    if not text:
+        print("❌ API 回應沒有文字內容")
+        return None
+    save_cached_response(key, text)
+    return text
 
-def generate_content(topic: dict, skip_web: bool = False, dry_run: bool = False, sample_limit: int = 0) -> dict:
-    """產生主題內容
 
-    Args:
-        topic: 主題定義
-        skip_web: 是否跳過網路搜尋
-        dry_run: 是否為 dry run 模式
-        sample_limit: 取樣上限，0 表示不限制
+def prepare_topic(topic: dict, skip_web: bool = False, dry_run: bool = False, sample_limit: int = 0,
+                  force: bool = False) -> dict:
+    """掃描產品並產生 prompts
+
+    回傳 {"success": False, ...}（無產品）、dry run 或未變動（skipped）的結果，或
+    {"topic", "summary", "index_prompt", "guide_prompt", ...} 供後續呼叫 API。
     """
     topic_id = topic["topic_id"]
     topic_name = topic["name"]["zh"]
 
     print(f"\n📝 處理主題: {topic_name} ({topic_id})")
 
+    # 主題設定與產品檔皆未變動：不掃描
+    stored = [] if force or dry_run else stored_fingerprints(topic_id)
+    input_fp = None if dry_run else input_fingerprint(topic, skip_web, sample_limit)
+    if stored and all(fm.get("input_fingerprint") == input_fp for fm in stored):
+        print("  ⏭️  主題設定與產品資料未變動，跳過")
+        return {"success": True, "skipped": True}
+    if not (force or dry_run) and no_products_fingerprint(topic_id) == input_fp:
+        print("  ⏭️  上次無匹配產品且主題設定與產品資料未變動，跳過")
+        return {"success": False, "reason": "no_products", "skipped": True}
+
     # 掃描產品
     print("  📂 掃描產品資料...")
     products = scan_products(topic, sample_limit=sample_limit)
@@ -508,7 +650,11 @@ def generate_content(topic: dict, skip_web: bool = False, dry_run: bool = False,
 
     if len(products) == 0:
         print("  ⚠️  沒有找到匹配的產品，跳過")
+        if not dry_run:
+            record_no_products(topic_id, input_fp)
         return {"success": False, "reason": "no_products"}
+    if not dry_run:
+        record_no_products(topic_id, None)
 
     # 彙整統計
     summary = summarize_products(products)
@@ -536,15 +682,36 @@ def generate_content(topic: dict, skip_web: bool = False, dry_run: bool = False,
     index_prompt = generate_index_prompt(topic, product_summary, web_results)
     guide_prompt = generate_guide_prompt(topic, product_summary, web_results)
 
+    # 產品有變動但 prompts 相同：不呼叫 API
+    prompt_fp = fingerprint("prompt", topic, summary["count"], index_prompt, guide_prompt)
+    if stored and all(fm.get("prompt_fingerprint") == prompt_fp for fm in stored):
+        update_input_fingerprint(topic_id, input_fp)
+        print("  ⏭️  產品統計未變動，跳過")
+        return {"success": True, "skipped": True}
+
+    return {
+        "topic": topic,
+        "summary": summary,
+        "index_prompt": index_prompt,
+        "guide_prompt": guide_prompt,
+        "input_fingerprint": input_fp,
+        "prompt_fingerprint": prompt_fp,
+    }
+
+
+def write_topic_content(job: dict, index_content: Optional[str], guide_content: Optional[str]) -> dict:
+    """加上 frontmatter 並寫入 index.md 和 guide.md"""
+    topic = job["topic"]
+    topic_id = topic["topic_id"]
+    topic_name = topic["name"]["zh"]
+    summary = job["summary"]
+
     # 確保輸出目錄存在
     output_dir = REPORTS_DIR / topic_id
     output_dir.mkdir(parents=True, exist_ok=True)
 
     results = {"success": True, "files": []}
 
-    # 產生 index.md
-    print("  🤖 產生 index.md...")
-    index_content = call_claude_api(index_prompt)
     if index_content:
         # 加入 frontmatter
         frontmatter = f"""---
@@ -555,6 +722,8 @@ parent: 報告總覽
 has_children: true
 generated_at: "{datetime.now().isoformat()}"
 product_count: {summary['count']}
+input_fingerprint: "{job['input_fingerprint']}"
+prompt_fingerprint: "{job['prompt_fingerprint']}"
 ---
 
 """
@@ -563,11 +732,8 @@ product_count: {summary['count']}
         print(f"  ✅ 已寫入: {index_path.relative_to(PROJECT_ROOT)}")
         results["files"].append(str(index_path))
     else:
-        print("  ⚠️  index.md 產生失敗")
+        print(f"  ⚠️  {topic_id}/index.md 產生失敗")
 
-    # 產生 guide.md
-    print("  🤖 產生 guide.md...")
-    guide_content = call_claude_api(guide_prompt)
     if guide_content:
         # 加入 frontmatter
         frontmatter = f"""---
@@ -577,6 +743,8 @@ nav_order: 2
 parent: {topic_name}
 grand_parent: 報告總覽
 generated_at: "{datetime.now().isoformat()}"
+input_fingerprint: "{job['input_fingerprint']}"
+prompt_fingerprint: "{job['prompt_fingerprint']}"
 ---
 
 """
@@ -585,8 +753,54 @@ generated_at: "{datetime.now().isoformat()}"
         print(f"  ✅ 已寫入: {guide_path.relative_to(PROJECT_ROOT)}")
         results["files"].append(str(guide_path))
     else:
-        print("  ⚠️  guide.md 產生失敗")
+        print(f"  ⚠️  {topic_id}/guide.md 產生失敗")
+
+    return results
+
+
+def generate_content(topic: dict, skip_web: bool = False, dry_run: bool = False, sample_limit: int = 0,
+                     use_cache: bool = True, force: bool = False) -> dict:
+    """產生主題內容
+
+    Args:
+        topic: 主題定義
+        skip_web: 是否跳過網路搜尋
+        dry_run: 是否為 dry run 模式
+        sample_limit: 取樣上限，0 表示不限制
+        use_cache: prompt 未變動時使用快取的回應
+        force: 忽略輸出檔的指紋，一律重新產生
+    """
+    job = prepare_topic(topic, skip_web=skip_web, dry_run=dry_run, sample_limit=sample_limit, force=force)
+    if "topic" not in job:
+        return job
 
+    print("  🤖 產生 index.md...")
+    index_content = call_claude_api(job["index_prompt"], use_cache=use_cache)
+    print("  🤖 產生 guide.md...")
+    guide_content = call_claude_api(job["guide_prompt"], use_cache=use_cache)
+    return write_topic_content(job, index_content, guide_content)
+
+
+def generate_batch(topics: list[dict], skip_web: bool = False, sample_limit: int = 0,
+                   concurrency: int = DEFAULT_CONCURRENCY, use_cache: bool = True, force: bool = False) -> list[dict]:
+    """批次產生：先準備所有主題的 prompts，再並行呼叫 API，最後依序寫入"""
+    jobs = [prepare_topic(topic, skip_web=skip_web, sample_limit=sample_limit, force=force) for topic in topics]
+    ready = [job for job in jobs if "topic" in job]
+    skipped = sum(1 for job in jobs if job.get("skipped"))
+    if skipped:
+        print(f"\n⏭️  {skipped} 個主題未變動，已跳過")
+    prompts = [job[field] for job in ready for field in ("index_prompt", "guide_prompt")]
+
+    cached = sum(1 for prompt in prompts if use_cache and load_cached_response(prompt_key(prompt, MAX_TOKENS)) is not None)
+    print(f"\n🤖 並行產生 {len(prompts)} 份內容（快取命中 {cached}，{concurrency} 個連線）...")
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        contents = list(executor.map(lambda prompt: call_claude_api(prompt, use_cache=use_cache), prompts))
+
+    results = []
+    for i, job in enumerate(ready):
+        print(f"\n💾 {job['topic']['name']['zh']} ({job['topic']['topic_id']})")
+        results.append(write_topic_content(job, contents[2 * i], contents[2 * i + 1]))
     return results
 
 
@@ -597,14 +811,18 @@ def main():
     parser.add_argument("--skip-web", action="store_true", help="跳過網路搜尋")
     parser.add_argument("--dry-run", action="store_true", help="僅顯示會產生的內容，不實際執行")
     parser.add_argument("--sample", type=int, default=0, help="取樣上限（用於快速測試）")
+    parser.add_argument("--concurrency", "-j", type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"--all 時同時進行的 API 呼叫數（預設 {DEFAULT_CONCURRENCY}）")
+    parser.add_argument("--no-cache", action="store_true", help="忽略回應快取，重新呼叫 API")
+    parser.add_argument("--force", action="store_true", help="忽略輸出檔指紋，未變動的主題也重新產生")
     args = parser.parse_args()
 
     print("=" * 50)
     print("主題內容產生")
     print("=" * 50)
 
-    if not HAS_ANTHROPIC and not args.dry_run:
-        print("⚠️  需要安裝 anthropic 套件: pip install anthropic")
+    if not os.environ.get("ANTHROPIC_API_KEY") and not args.dry_run:
+        print("⚠️  ANTHROPIC_API_KEY 未設定，只能使用快取的回應")
         print("   或使用 --dry-run 模式查看資料摘要")
 
     # 載入主題
@@ -624,13 +842,25 @@ def main():
     if args.sample > 0:
         print(f"📊 取樣模式：每主題最多 {args.sample} 筆產品")
 
-    for topic in topics:
-        generate_content(
-            topic,
+    if len(topics) > 1 and not args.dry_run:
+        generate_batch(
+            topics,
             skip_web=args.skip_web,
-            dry_run=args.dry_run,
-            sample_limit=args.sample
+            sample_limit=args.sample,
+            concurrency=args.concurrency,
+            use_cache=not args.no_cache,
+            force=args.force
         )
+    else:
+        for topic in topics:
+            generate_content(
+                topic,
+                skip_web=args.skip_web,
+                dry_run=args.dry_run,
+                sample_limit=args.sample,
+                use_cache=not args.no_cache,
+                force=args.force
+            )
 
     print("\n" + "=" * 50)
     print("✅ 完成")
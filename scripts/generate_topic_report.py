@@ -11,16 +11,23 @@
   python3 scripts/generate_topic_report.py                    # 產出所有主題報告
   python3 scripts/generate_topic_report.py --topic exosomes   # 產出特定主題
   python3 scripts/generate_topic_report.py --dry-run          # Dry run 模式
+  python3 scripts/generate_topic_report.py --no-index         # 不使用索引，逐檔掃描
+
+預設使用 scripts/product_index.py 的倒排索引篩選候選產品，只讀取命中的產品檔。
 """
 
 import argparse
-import re
 import yaml
 from pathlib import Path
 from datetime import datetime
 from collections import defaultdict
 from typing import Optional
 
+from interaction_index import InteractionIndex
+from product_index import load_index
+from product_layout import iter_category_files
+from product_reader import ProductDocument
+
 
 # 路徑配置
 PROJECT_ROOT = Path(__file__).parent.parent
@@ -29,6 +36,9 @@ EXTRACTOR_DIR = PROJECT_ROOT / "docs" / "Extractor"
 OUTPUT_DIR = PROJECT_ROOT / "docs" / "Narrator" / "topic_tracking"
 DHI_DIR = EXTRACTOR_DIR / "dhi"
 
+# DHI 交互文獻索引（同一品類在一次執行中只列目錄一次）
+DHI_INDEX = InteractionIndex("dhi", DHI_DIR)
+
 # 主題與 DHI 類別對照
 TOPIC_DHI_CATEGORIES = {
     "fish-oil": ["omega_fatty_acid"],
@@ -69,59 +79,43 @@ def load_all_topics() -> list[dict]:
     return topics
 
 
+# 成分章節（依序全部納入）
+INGREDIENT_SECTIONS = ["成分", "機能性成分", "機能性関与成分", "Ingredients"]
+
+
 def parse_product_file(file_path: Path) -> dict:
     """解析產品 Markdown 檔案"""
-    content = file_path.read_text(encoding="utf-8")
+    doc = ProductDocument.from_file(file_path)
 
     # 檢查 REVIEW_NEEDED 標記
-    if "[REVIEW_NEEDED]" in content:
+    if doc is None or "[REVIEW_NEEDED]" in doc.content:
         return None
 
+    fm = doc.frontmatter
     product = {
         "file_path": str(file_path),
-        "content": content,
-        "name": "",
-        "brand": "",
-        "manufacturer": "",
+        "content": doc.content,
+        "name": fm.get("product_name", ""),
+        "brand": fm.get("brand", ""),
+        "manufacturer": fm.get("manufacturer", ""),
         "ingredients": [],
-        "form": "",
-        "layer": file_path.parent.parent.name,
-        "category": file_path.parent.name,
+        "form": fm.get("product_form", ""),
+        "layer": doc.layer,
+        "category": doc.category,
     }
 
-    # 解析 frontmatter
-    if content.startswith("---"):
-        parts = content.split("---", 2)
-        if len(parts) >= 3:
-            try:
-                fm = yaml.safe_load(parts[1])
-                if fm:
-                    product["name"] = fm.get("product_name", "")
-                    product["brand"] = fm.get("brand", "")
-                    product["manufacturer"] = fm.get("manufacturer", "")
-                    product["form"] = fm.get("product_form", "")
-            except yaml.YAMLError:
-                pass
-
     # 提取成分（從 ## 成分 或 ## 機能性成分 段落）
-    ingredient_patterns = [
-        r"## 成分\s*\n([\s\S]*?)(?=\n##|\Z)",
-        r"## 機能性成分\s*\n([\s\S]*?)(?=\n##|\Z)",
-        r"## 機能性関与成分\s*\n([\s\S]*?)(?=\n##|\Z)",
-        r"## Ingredients\s*\n([\s\S]*?)(?=\n##|\Z)",
-    ]
-
-    for pattern in ingredient_patterns:
-        match = re.search(pattern, content, re.IGNORECASE)
-        if match:
-            ingredients_text = match.group(1)
-            # 提取列表項目
-            for line in ingredients_text.split("\n"):
-                line = line.strip()
-                if line.startswith("- "):
-                    product["ingredients"].append(line[2:].strip())
-                elif line and not line.startswith("#"):
-                    product["ingredients"].append(line)
+    for name in INGREDIENT_SECTIONS:
+        ingredients_text = doc.section(name)
+        if ingredients_text is None:
+            continue
+        # 提取列表項目
+        for line in ingredients_text.split("\n"):
+            line = line.strip()
+            if line.startswith("- "):
+                product["ingredients"].append(line[2:].strip())
+            elif line and not line.startswith("#"):
+                product["ingredients"].append(line)
 
     return product
 
@@ -157,57 +151,33 @@ def match_product(product: dict, topic: dict) -> bool:
 
 def load_interaction_data(topic_id: str) -> list[dict]:
     """
-    從 docs/Extractor/dhi/{category}/*.md 讀取交互資料
+    自 DHI 交互文獻索引（interaction_index）取得交互資料
     根據主題 ID 篩選相關類別
     """
     interactions = []
     categories = TOPIC_DHI_CATEGORIES.get(topic_id, [])
 
-    if not categories:
-        return interactions
-
     for category in categories:
-        category_dir = DHI_DIR / category
-        if not category_dir.exists():
-            continue
-
-        for md_file in category_dir.glob("*.md"):
-            content = md_file.read_text(encoding="utf-8")
-
-            # 跳過 REVIEW_NEEDED（但仍解析以獲取資訊）
-            is_review_needed = "[REVIEW_NEEDED]" in content
-
-            # 解析 frontmatter
+        for entry in DHI_INDEX.entries(category):
+            # REVIEW_NEEDED 仍保留（標記後由呼叫端決定）
             interaction = {
-                "file_path": str(md_file),
-                "pmid": md_file.stem,
-                "is_review_needed": is_review_needed,
+                "file_path": str(DHI_DIR / category / entry["filename"]),
+                "pmid": entry["pmid"],
+                "is_review_needed": entry["review_needed"],
             }
 
-            if content.startswith("---") or content.startswith("[REVIEW_NEEDED]\n\n---"):
-                # 處理 [REVIEW_NEEDED] 標記後的 frontmatter
-                clean_content = content.replace("[REVIEW_NEEDED]\n\n", "")
-                parts = clean_content.split("---", 2)
-                if len(parts) >= 3:
-                    try:
-                        fm = yaml.safe_load(parts[1])
-                        if fm:
-                            interaction["title"] = fm.get("title", "")
-                            interaction["severity"] = fm.get("severity", "unknown")
-                            interaction["evidence_level"] = fm.get("evidence_level", 5)
-                            interaction["study_type"] = fm.get("study_type", "other")
-                            interaction["source_url"] = fm.get("source_url", "")
-                            interaction["journal"] = fm.get("journal", "")
-                            interaction["pub_date"] = fm.get("pub_date", "")
-                    except yaml.YAMLError:
-                        pass
-
-            # 提取摘要（用於推斷風險描述）
-            abstract_match = re.search(r"## 摘要\s*\n([\s\S]*?)(?=\n---|\Z)", content)
-            if abstract_match:
-                interaction["abstract"] = abstract_match.group(1).strip()
-            else:
-                interaction["abstract"] = ""
+            fm = entry["frontmatter"]
+            if fm is not None:
+                interaction["title"] = fm.get("title", "")
+                interaction["severity"] = fm.get("severity", "unknown")
+                interaction["evidence_level"] = fm.get("evidence_level", 5)
+                interaction["study_type"] = fm.get("study_type", "other")
+                interaction["source_url"] = fm.get("source_url", "")
+                interaction["journal"] = fm.get("journal", "")
+                interaction["pub_date"] = fm.get("pub_date", "")
+
+            # 摘要（用於推斷風險描述）
+            interaction["abstract"] = entry["abstract"]
 
             interactions.append(interaction)
 
@@ -317,7 +287,7 @@ def scan_products(topic: dict, dry_run: bool = False) -> list[dict]:
                 continue
 
             # 掃描產品檔案
-            for product_file in category_dir.glob("*.md"):
+            for product_file in iter_category_files(category_dir):
                 product = parse_product_file(product_file)
                 if product and match_product(product, topic):
                     matched_products.append(product)
@@ -325,6 +295,27 @@ def scan_products(topic: dict, dry_run: bool = False) -> list[dict]:
     return matched_products
 
 
+def scan_products_indexed(topic: dict, index) -> list[dict]:
+    """以倒排索引篩選候選產品，只讀取並確認候選檔案"""
+    keywords = topic.get("keywords", {})
+    exact_keywords = keywords.get("exact", [])
+    fuzzy_keywords = keywords.get("fuzzy", [])
+    category_filter = topic.get("category_filter", [])
+
+    candidates = set(index.search(exact_keywords, ("ingredient", "text"), category_filter))
+    candidates.update(index.search(fuzzy_keywords, ("text",), category_filter))
+
+    matched_products = []
+    for rel_path in sorted(candidates):
+        product = parse_product_file(EXTRACTOR_DIR / rel_path)
+        if product and match_product(product, topic):
+            # 報告只需要欄位統計，不保留全文
+            product.pop("content", None)
+            matched_products.append(product)
+
+    return matched_products
+
+
 def generate_report(topic: dict, products: list[dict]) -> str:
     """產生市場報告"""
     topic_id = topic["topic_id"]
@@ -449,6 +440,7 @@ def main():
     parser = argparse.ArgumentParser(description="主題報告產出腳本")
     parser.add_argument("--topic", help="指定主題 ID（不指定則處理所有主題）")
     parser.add_argument("--dry-run", action="store_true", help="Dry run 模式，僅顯示匹配結果")
+    parser.add_argument("--no-index", action="store_true", help="不使用產品索引，逐檔掃描")
     args = parser.parse_args()
 
     print("=" * 50)
@@ -465,6 +457,9 @@ def main():
 
     print(f"📋 載入 {len(topics)} 個主題定義")
 
+    # dry run 不寫入索引檔
+    index = None if args.no_index else load_index(save=not args.dry_run)
+
     for topic in topics:
         topic_id = topic["topic_id"]
         topic_name = topic["name"]["zh"]
@@ -474,7 +469,10 @@ def main():
         print(f"{'='*50}")
 
         # 掃描產品
-        products = scan_products(topic, args.dry_run)
+        if index is not None:
+            products = scan_products_indexed(topic, index)
+        else:
+            products = scan_products(topic, args.dry_run)
         print(f"✅ 匹配產品: {len(products)} 筆")
 
         if args.dry_run:
@@ -505,6 +503,8 @@ def main():
 
             print(f"📝 報告已寫入: {output_file.relative_to(PROJECT_ROOT)}")
 
+    DHI_INDEX.save()
+
     print("\n" + "=" * 50)
     print("✅ 完成")
     print("=" * 50)
@@ -11,6 +11,8 @@ from datetime import datetime
 from collections import defaultdict, Counter
 from typing import Dict, List, Set, Tuple
 
+from product_layout import iter_category_files
+
 # Base paths
 BASE_DIR = Path("/Users/lightman/weiqi.kids/agent.supplement-product")
 EXTRACTOR_DIR = BASE_DIR / "docs" / "Extractor"
@@ -141,7 +143,7 @@ def scan_layer(layer: str, topic: Dict) -> List[Dict]:
         if not category_dir.exists():
             continue
 
-        for md_file in category_dir.glob('*.md'):
+        for md_file in iter_category_files(category_dir):
             is_match, data = process_product(md_file, topic)
             if is_match:
                 data['layer'] = layer
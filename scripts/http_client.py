@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+"""
+共用 HTTP 用戶端
+
+各擷取腳本（fetch_pubmed、fetch_interactions、fetch_lnhpd_ingredients、
+fetch_ingredient_map、fetch_kr_hff）原本每個請求以 urlopen / requests.get
+建立新連線（每次重新 TLS 交握），速率限制與重試也各自實作。
+HttpClient 統一提供：
+
+- 連線池：依 (scheme, host, port) 保留 keep-alive 連線，執行緒安全；
+  重用的連線已被伺服器關閉時自動以新連線重送
+- 速率限制：每個 host 一個 RateLimiter，同一行程內所有用戶端共用
+  （set_host_rate() 設定每秒請求數）
+- 重試：連線錯誤、429 與 5xx 以指數退避加隨機抖動重試，遵守 Retry-After
+- gzip：送出 Accept-Encoding: gzip 並自動解壓
+- 轉址：GET 最多跟隨 5 次
+- 回應快取（cache=True）：.cache/http/ 保存回應本文與 ETag / Last-Modified，
+  再次請求時送出 If-None-Match / If-Modified-Since，304 時直接使用快取；
+  cache_ttl 秒內的快取不連線直接回傳
+- 代理：依 https_proxy / http_proxy 環境變數（HTTPS 以 CONNECT 通道）
+
+失敗（重試用盡或非重試狀態碼）一律拋出 HttpError（OSError 子類別），
+status 為 HTTP 狀態碼，連線錯誤時為 None。
+
+用法：
+    from http_client import HttpClient, HttpError, set_host_rate
+
+    set_host_rate("eutils.ncbi.nlm.nih.gov", 3)
+    client = HttpClient(user_agent="SupplementProductAgent/1.0", max_retries=3)
+    data = client.get(url, params={"db": "pubmed"}, timeout=30).json()
+    text = client.get(url, cache=True, cache_ttl=86400).text()
+"""
+
+import gzip
+import hashlib
+import http.client
+import json
+import os
+import random
+import ssl
+import sys
+import threading
+import time
+import zlib
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from urllib.parse import urlencode, urljoin, urlsplit
+from urllib.request import getproxies, proxy_bypass
+
+
+# 路徑配置
+PROJECT_ROOT = Path(__file__).parent.parent
+CACHE_DIR = PROJECT_ROOT / ".cache" / "http"
+
+DEFAULT_USER_AGENT = "SupplementProductIntelligence/1.0"
+DEFAULT_TIMEOUT = 60
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 2.0       # 第 n 次重試等待約 backoff × 2^(n-1) 秒（±50% 抖動）
+MAX_BACKOFF = 60.0
+MAX_REDIRECTS = 5
+DEFAULT_POOL_SIZE = 8       # 每個 host 保留的閒置連線數
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504, 529})  # 529：Anthropic API 過載
+REDIRECT_STATUSES = frozenset({301, 302, 303, 307, 308})
+
+# 重用的 keep-alive 連線可能已被伺服器關閉，遇到這些錯誤時以新連線重送一次
+STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected, http.client.BadStatusLine, BrokenPipeError, ConnectionResetError,
+)
+
+
+class HttpError(OSError):
+    """HTTP 請求失敗（status 為 None 表示連線錯誤）"""
+
+    def __init__(self, url: str, status: int = None, reason: str = "", body: bytes = b""):
+        self.url = url
+        self.status = status
+        self.body = body
+        message = f"HTTP {status} {reason}".strip() if status else (reason or "連線失敗")
+        super().__init__(f"{message}：{url}")
+
+
+class Response:
+    def __init__(self, url: str, status: int, headers: dict, body: bytes, from_cache: bool = False):
+        self.url = url
+        self.status = status
+        self.headers = headers      # 小寫標頭名稱 → 值
+        self.body = body
+        self.from_cache = from_cache
+
+    def text(self, encoding: str = "utf-8") -> str:
+        return self.body.decode(encoding)
+
+    def json(self):
+        return json.loads(self.body.decode("utf-8"))
+
+
+# ==========================================================
+# 速率限制
+# ==========================================================
+
+class RateLimiter:
+    """每秒請求數上限（依序分配請求時間點，執行緒安全）"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self.next_time = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            slot = max(time.monotonic(), self.next_time)
+            self.next_time = slot + self.interval
+        delay = slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def set_host_rate(host: str, rate: float):
+    """設定 host 的每秒請求數上限（0 或 None 為不限制）"""
+    with _limiters_lock:
+        _limiters[host] = RateLimiter(rate)
+
+
+def _limiter(host: str):
+    return _limiters.get(host)
+
+
+# ==========================================================
+# 連線池
+# ==========================================================
+
+class _Pool:
+    """單一 (scheme, host, port) 的 keep-alive 連線池"""
+
+    def __init__(self, scheme: str, host: str, port: int, max_idle: int):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.max_idle = max_idle
+        self.idle = []
+        self.lock = threading.Lock()
+        self.proxy = _proxy_for(scheme, host)
+
+    def acquire(self, timeout: float):
+        with self.lock:
+            conn = self.idle.pop() if self.idle else None
+        if conn is None:
+            conn = self._connect(timeout)
+        else:
+            conn.timeout = timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+        return conn
+
+    def release(self, conn):
+        with self.lock:
+            if len(self.idle) < self.max_idle:
+                self.idle.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for conn in idle:
+            conn.close()
+
+    def _connect(self, timeout: float):
+        if self.proxy:
+            proxy_host, proxy_port = self.proxy
+            if self.scheme == "https":
+                conn = http.client.HTTPSConnection(proxy_host, proxy_port, timeout=timeout,
+                                                   context=ssl.create_default_context())
+                conn.set_tunnel(self.host, self.port)
+                return conn
+            return http.client.HTTPConnection(proxy_host, proxy_port, timeout=timeout)
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(self.host, self.port, timeout=timeout,
+                                               context=ssl.create_default_context())
+        return http.client.HTTPConnection(self.host, self.port, timeout=timeout)
+
+
+def _proxy_for(scheme: str, host: str):
+    """環境變數中的代理 (host, port)；不使用代理時回傳 None"""
+    proxy = getproxies().get(scheme)
+    if not proxy or proxy_bypass(host):
+        return None
+    parts = urlsplit(proxy if "://" in proxy else f"http://{proxy}")
+    return parts.hostname, parts.port or 8080
+
+
+# ==========================================================
+# 回應快取
+# ==========================================================
+
+class ResponseCache:
+    """GET 回應的磁碟快取（{sha256(url)}.json 記錄標頭，.body 為本文）"""
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.dir = Path(cache_dir)
+
+    def _paths(self, url: str):
+        digest = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        base = self.dir / digest[:2] / digest
+        return base.with_suffix(".json"), base.with_suffix(".body")
+
+    def load(self, url: str):
+        """回傳 (meta, body)；不存在或損毀時回傳 (None, None)"""
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                body = f.read()
+        except (OSError, json.JSONDecodeError):
+            return None, None
+        if meta.get("url") != url:
+            return None, None
+        return meta, body
+
+    def store(self, url: str, response: Response):
+        meta_path, body_path = self._paths(url)
+        meta_path.parent.mkdir(parents=True, exist_ok=True)
+        meta = {
+            "url": url,
+            "stored_at": time.time(),
+            "etag": response.headers.get("etag"),
+            "last_modified": response.headers.get("last-modified"),
+            "content_type": response.headers.get("content-type"),
+        }
+        # 先寫本文再寫 meta，meta 存在即代表本文完整
+        for path, data, mode in ((body_path, response.body, "wb"),
+                                 (meta_path, json.dumps(meta).encode("utf-8"), "wb")):
+            tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+            with open(tmp_path, mode) as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+    def touch(self, url: str):
+        """304 重新驗證成功後更新 stored_at"""
+        meta_path, _ = self._paths(url)
+        meta, _ = self.load(url)
+        if meta is None:
+            return
+        meta["stored_at"] = time.time()
+        tmp_path = meta_path.with_name(f"{meta_path.name}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+
+
+# ==========================================================
+# 用戶端
+# ==========================================================
+
+class HttpClient:
+    """具連線池、速率限制、重試與快取的 HTTP 用戶端（執行緒安全）"""
+
+    def __init__(self, user_agent: str = DEFAULT_USER_AGENT, timeout: float = DEFAULT_TIMEOUT,
+                 max_retries: int = DEFAULT_RETRIES, backoff: float = DEFAULT_BACKOFF,
+                 pool_size: int = DEFAULT_POOL_SIZE, cache_dir=CACHE_DIR, verbose: bool = True):
+        self.user_agent = user_agent
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+        self.cache = ResponseCache(cache_dir)
+        self.verbose = verbose
+        self._pools = {}
+        self._pools_lock = threading.Lock()
+
+    def close(self):
+        with self._pools_lock:
+            pools, self._pools = self._pools, {}
+        for pool in pools.values():
+            pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ------------------------------------------------------------------
+
+    def get(self, url: str, params: dict = None, headers: dict = None, timeout: float = None,
+            retries: int = None, cache: bool = False, cache_ttl: float = None) -> Response:
+        """GET 請求；cache=True 時使用磁碟快取與條件式請求"""
+        if params:
+            url = f"{url}{'&' if '?' in url else '?'}{urlencode(params)}"
+        if not cache:
+            return self.request("GET", url, headers=headers, timeout=timeout, retries=retries)
+
+        meta, cached_body = self.cache.load(url)
+        if meta is not None and cache_ttl is not None and time.time() - meta["stored_at"] < cache_ttl:
+            return Response(url, 200, {"content-type": meta.get("content_type")}, cached_body, from_cache=True)
+
+        conditional = dict(headers or {})
+        if meta is not None:
+            if meta.get("etag"):
+                conditional["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                conditional["If-Modified-Since"] = meta["last_modified"]
+
+        response = self.request("GET", url, headers=conditional, timeout=timeout, retries=retries,
+                                allow_not_modified=meta is not None)
+        if response.status == 304:
+            self.cache.touch(url)
+            return Response(url, 200, {"content-type": meta.get("content_type")}, cached_body, from_cache=True)
+        self.cache.store(url, response)
+        return response
+
+    def post(self, url: str, json_body=None, data: bytes = None, headers: dict = None,
+             timeout: float = None, retries: int = None) -> Response:
+        """POST 請求（json_body 會序列化為 JSON）"""
+        headers = dict(headers or {})
+        if json_body is not None:
+            data = json.dumps(json_body, ensure_ascii=False).encode("utf-8")
+            headers.setdefault("Content-Type", "application/json")
+        return self.request("POST", url, body=data, headers=headers, timeout=timeout, retries=retries)
+
+    def request(self, method: str, url: str, body: bytes = None, headers: dict = None,
+                timeout: float = None, retries: int = None, allow_not_modified: bool = False) -> Response:
+        """送出請求，依重試策略處理失敗；非 2xx（及允許的 304）拋出 HttpError"""
+        retries = self.max_retries if retries is None else retries
+        timeout = timeout or self.timeout
+
+        for attempt in range(retries + 1):
+            try:
+                response = self._send_following_redirects(method, url, body, headers, timeout)
+            except HttpError:
+                # HttpError 是 OSError 的子類別；不支援的協定等永久錯誤不重試、不再包裝
+                raise
+            except (OSError, http.client.HTTPException) as e:
+                if attempt >= retries:
+                    raise HttpError(url, reason=str(e) or type(e).__name__) from e
+                self._sleep_before_retry(url, attempt, retries, str(e) or type(e).__name__)
+                continue
+
+            if 200 <= response.status < 300 or (allow_not_modified and response.status == 304):
+                return response
+            if response.status in RETRY_STATUSES and attempt < retries:
+                self._sleep_before_retry(url, attempt, retries, f"HTTP {response.status}",
+                                         response.headers.get("retry-after"))
+                continue
+            raise HttpError(url, response.status, http.client.responses.get(response.status, ""), response.body)
+
+    # ------------------------------------------------------------------
+
+    def _sleep_before_retry(self, url: str, attempt: int, retries: int, reason: str, retry_after: str = None):
+        delay = min(MAX_BACKOFF, self.backoff * (2 ** attempt)) * random.uniform(0.5, 1.5)
+        wait = _parse_retry_after(retry_after)
+        if wait is not None:
+            delay = max(delay, min(wait, MAX_BACKOFF))
+        if self.verbose:
+            host = urlsplit(url).hostname
+            print(f"  ⚠️  {host} 請求失敗（{reason}），{delay:.1f} 秒後重試 {attempt + 1}/{retries}",
+                  file=sys.stderr)
+        time.sleep(delay)
+
+    def _send_following_redirects(self, method, url, body, headers, timeout) -> Response:
+        for _ in range(MAX_REDIRECTS + 1):
+            response = self._send(method, url, body, headers, timeout)
+            location = response.headers.get("location")
+            if response.status not in REDIRECT_STATUSES or not location:
+                return response
+            url = urljoin(url, location)
+            if response.status == 303 or (response.status in (301, 302) and method == "POST"):
+                method, body = "GET", None
+        return response
+
+    def _pool(self, scheme: str, host: str, port: int) -> _Pool:
+        key = (scheme, host, port)
+        with self._pools_lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = self._pools[key] = _Pool(scheme, host, port, self.pool_size)
+        return pool
+
+    def _send(self, method, url, body, headers, timeout) -> Response:
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in ("http", "https"):
+            raise HttpError(url, reason=f"不支援的協定：{scheme}")
+        host = parts.hostname
+        port = parts.port or (443 if scheme == "https" else 80)
+        pool = self._pool(scheme, host, port)
+
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+        if pool.proxy and scheme == "http":
+            path = url  # 一般 HTTP 代理需要完整 URL
+
+        request_headers = {
+            "Host": parts.netloc,
+            "User-Agent": self.user_agent,
+            "Accept-Encoding": "gzip, deflate",
+            "Connection": "keep-alive",
+        }
+        request_headers.update(headers or {})
+
+        limiter = _limiter(host)
+        if limiter is not None:
+            limiter.wait()
+
+        conn = pool.acquire(timeout)
+        reused = conn.sock is not None
+        try:
+            try:
+                conn.request(method, path, body=body, headers=request_headers)
+                raw = conn.getresponse()
+            except STALE_CONNECTION_ERRORS:
+                if not reused:
+                    raise
+                conn.close()
+                conn.request(method, path, body=body, headers=request_headers)
+                raw = conn.getresponse()
+            data = raw.read()
+        except BaseException:
+            conn.close()
+            raise
+
+        response_headers = {name.lower(): value for name, value in raw.getheaders()}
+        if raw.will_close:
+            conn.close()
+        else:
+            pool.release(conn)
+
+        encoding = response_headers.get("content-encoding", "").lower()
+        if encoding == "gzip" and data:
+            data = gzip.decompress(data)
+        elif encoding == "deflate" and data:
+            try:
+                data = zlib.decompress(data)
+            except zlib.error:
+                data = zlib.decompress(data, -zlib.MAX_WBITS)
+        return Response(url, raw.status, response_headers, data)
+
+
+def _parse_retry_after(value: str):
+    """Retry-After（秒數或 HTTP 日期）→ 等待秒數"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
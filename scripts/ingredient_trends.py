@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+成分趨勢時間序列
+
+ingredient_radar 每期將完整的「成分 × 市場 × 品類」產品數寫入
+docs/Narrator/ingredient_radar/ingredient_trends.json.gz，
+recommend_topics.py 直接由此計算多期動能訊號，不再解析報告表格：
+
+- growth：最新一期相對上一期的成長率
+- acceleration：最新成長率減去前一期成長率
+- momentum：最近 N 期成長率平均
+- new_entrant：最新一期首次出現（先前各期皆為 0）
+
+儲存格式（欄式，gzip JSON）：
+
+    {
+      "version": 1,
+      "periods": ["2026-01", "2026-02"],
+      "products": {"2026-01": 12345, ...},
+      "ingredients": [...], "markets": [...], "categories": [...],
+      "cells": [[成分序號, 市場序號, 品類序號], ...],
+      "counts": [[各期產品數], ...]          # 與 cells 對齊
+    }
+
+有 NumPy 時以矩陣運算計算訊號，否則使用等價的純 Python 實作。
+
+用法：
+  python3 scripts/ingredient_trends.py              # 顯示儲存期間與訊號
+  python3 scripts/ingredient_trends.py --top 30     # 顯示前 30 個成分
+"""
+
+import argparse
+import gzip
+import json
+import os
+from collections import Counter
+from pathlib import Path
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # 使用純 Python 實作
+
+
+# 路徑配置
+PROJECT_ROOT = Path(__file__).parent.parent
+STORE_PATH = PROJECT_ROOT / "docs" / "Narrator" / "ingredient_radar" / "ingredient_trends.json.gz"
+
+# 格式變更時遞增
+STORE_VERSION = 1
+
+# momentum 預設平均期數
+DEFAULT_WINDOW = 3
+
+
+class TrendStore:
+    """成分 × 市場 × 品類 的逐期產品數"""
+
+    def __init__(self):
+        self.periods = []        # 依時間排序
+        self.products = {}       # period → 分析產品總數
+        self.keys = []           # (ingredient, market, category)
+        self.counts = []         # 與 keys 對齊，每列為各期產品數
+        self._key_index = {}
+
+    # ------------------------------------------------------------------
+    # 持久化
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def load(cls, path: Path = STORE_PATH) -> "TrendStore":
+        """載入儲存檔；不存在或版本不符時回傳空儲存"""
+        store = cls()
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, EOFError, json.JSONDecodeError):
+            return store
+
+        if data.get("version") != STORE_VERSION:
+            return store
+
+        ingredients = data["ingredients"]
+        markets = data["markets"]
+        categories = data["categories"]
+        store.periods = list(data["periods"])
+        store.products = dict(data.get("products", {}))
+        for (i, m, c), row in zip(data["cells"], data["counts"]):
+            key = (ingredients[i], markets[m], categories[c])
+            store._key_index[key] = len(store.keys)
+            store.keys.append(key)
+            store.counts.append(list(row))
+        return store
+
+    def save(self, path: Path = STORE_PATH):
+        """寫入儲存檔（先寫暫存檔再替換），並移除全為 0 的列"""
+        labels = ([], [], [])
+        positions = ({}, {}, {})
+        cells = []
+        counts = []
+        for key, row in zip(self.keys, self.counts):
+            if not any(row):
+                continue
+            cell = []
+            for axis, value in enumerate(key):
+                if value not in positions[axis]:
+                    positions[axis][value] = len(labels[axis])
+                    labels[axis].append(value)
+                cell.append(positions[axis][value])
+            cells.append(cell)
+            counts.append(row)
+
+        data = {
+            "version": STORE_VERSION,
+            "periods": self.periods,
+            "products": self.products,
+            "ingredients": labels[0],
+            "markets": labels[1],
+            "categories": labels[2],
+            "cells": cells,
+            "counts": counts,
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        # mtime=0 讓相同內容產生相同位元組，避免無意義的 git 變更
+        with open(tmp_path, "wb") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as f:
+                f.write(json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        os.replace(tmp_path, path)
+
+    # ------------------------------------------------------------------
+    # 寫入
+    # ------------------------------------------------------------------
+
+    def record(self, period: str, cells: Counter, total_products: int):
+        """寫入一期資料；同一期重複執行時整欄覆蓋"""
+        if period in self.periods:
+            col = self.periods.index(period)
+            for row in self.counts:
+                row[col] = 0
+        else:
+            self.periods.append(period)
+            self.periods.sort()
+            col = self.periods.index(period)
+            for row in self.counts:
+                row.insert(col, 0)
+
+        width = len(self.periods)
+        for key, count in cells.items():
+            row_id = self._key_index.get(key)
+            if row_id is None:
+                row_id = self._key_index[key] = len(self.keys)
+                self.keys.append(key)
+                self.counts.append([0] * width)
+            self.counts[row_id][col] = count
+        self.products[period] = total_products
+
+    # ------------------------------------------------------------------
+    # 查詢
+    # ------------------------------------------------------------------
+
+    def ingredient_series(self, periods: list = None) -> tuple[list, list, list]:
+        """彙總為成分序列，回傳 (成分, 期間, 每成分各期產品數)"""
+        periods = periods or self.periods
+        cols = [self.periods.index(p) for p in periods]
+        totals = {}
+        for (ingredient, _, _), row in zip(self.keys, self.counts):
+            series = totals.setdefault(ingredient, [0] * len(cols))
+            for j, col in enumerate(cols):
+                series[j] += row[col]
+        names = sorted(totals)
+        return names, list(periods), [totals[name] for name in names]
+
+    def ingredient_markets(self, period: str) -> dict:
+        """指定期間各成分出現的市場"""
+        col = self.periods.index(period)
+        markets = {}
+        for (ingredient, market, _), row in zip(self.keys, self.counts):
+            if row[col]:
+                markets.setdefault(ingredient, set()).add(market)
+        return markets
+
+
+# ==========================================================
+# 訊號計算
+# ==========================================================
+
+def _ranks(counts: list) -> list:
+    """依產品數遞減排名（1 起算）；0 產品者排名為 0，同數依成分名稱順序"""
+    order = sorted(range(len(counts)), key=lambda i: -counts[i])
+    ranks = [0] * len(counts)
+    for rank, i in enumerate(order, 1):
+        if counts[i] > 0:
+            ranks[i] = rank
+    return ranks
+
+
+def _growth_rates_numpy(matrix):
+    prev = matrix[:, :-1]
+    return (matrix[:, 1:] - prev) / np.maximum(prev, 1)
+
+
+def _signals_numpy(series: list, window: int) -> dict:
+    matrix = np.asarray(series, dtype=np.float64).reshape(len(series), -1)
+    periods = matrix.shape[1]
+    zeros = np.zeros(len(series))
+    if periods < 2:
+        return {"growth": zeros, "acceleration": zeros, "momentum": zeros, "new_entrant": zeros.astype(bool)}
+
+    growth = _growth_rates_numpy(matrix)
+    latest = growth[:, -1]
+    acceleration = latest - growth[:, -2] if periods >= 3 else zeros
+    momentum = growth[:, -window:].mean(axis=1)
+    new_entrant = (matrix[:, -1] > 0) & (matrix[:, :-1].sum(axis=1) == 0)
+    return {"growth": latest, "acceleration": acceleration, "momentum": momentum, "new_entrant": new_entrant}
+
+
+def _signals_python(series: list, window: int) -> dict:
+    size = len(series)
+    periods = len(series[0]) if series else 0
+    if periods < 2:
+        return {"growth": [0.0] * size, "acceleration": [0.0] * size,
+                "momentum": [0.0] * size, "new_entrant": [False] * size}
+
+    growth, acceleration, momentum, new_entrant = [], [], [], []
+    for row in series:
+        rates = [(row[t] - row[t - 1]) / max(row[t - 1], 1) for t in range(1, periods)]
+        growth.append(rates[-1])
+        acceleration.append(rates[-1] - rates[-2] if len(rates) >= 2 else 0.0)
+        recent = rates[-window:]
+        momentum.append(sum(recent) / len(recent))
+        new_entrant.append(row[-1] > 0 and not any(row[:-1]))
+    return {"growth": growth, "acceleration": acceleration, "momentum": momentum, "new_entrant": new_entrant}
+
+
+def compute_signals(store: TrendStore, periods: list = None, window: int = DEFAULT_WINDOW) -> list[dict]:
+    """計算各成分最新一期的動能訊號（依最新產品數排序）
+
+    Args:
+        store: 趨勢儲存
+        periods: 納入計算的期間（預設全部）
+        window: momentum 平均的成長率期數
+    """
+    names, periods, series = store.ingredient_series(periods)
+    if not names:
+        return []
+
+    compute = _signals_numpy if np is not None else _signals_python
+    signals = compute(series, window)
+
+    current = [row[-1] for row in series]
+    previous = [row[-2] if len(row) >= 2 else 0 for row in series]
+    ranks = _ranks(current)
+    prev_ranks = _ranks(previous)
+    markets = store.ingredient_markets(periods[-1])
+
+    results = []
+    for i, name in enumerate(names):
+        if not current[i]:
+            continue
+        results.append({
+            "ingredient": name,
+            "period": periods[-1],
+            "count": current[i],
+            "prev_count": previous[i],
+            "rank": ranks[i],
+            "prev_rank": prev_ranks[i] or None,
+            "growth": round(float(signals["growth"][i]), 4),
+            "acceleration": round(float(signals["acceleration"][i]), 4),
+            "momentum": round(float(signals["momentum"][i]), 4),
+            "new_entrant": bool(signals["new_entrant"][i]),
+            "markets": sorted(markets.get(name, ())),
+        })
+    results.sort(key=lambda r: r["rank"])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="成分趨勢時間序列")
+    parser.add_argument("--top", type=int, default=20, help="顯示前 N 個成分")
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW, help="momentum 平均期數")
+    args = parser.parse_args()
+
+    store = TrendStore.load()
+    if not store.periods:
+        print(f"❌ 尚無趨勢資料：{STORE_PATH}")
+        return
+
+    print(f"📈 期間：{', '.join(store.periods)}（{len(store.keys)} 個 成分×市場×品類）")
+    print(f"   計算方式：{'NumPy' if np is not None else '純 Python'}")
+    print()
+    print(f"| {'排名':^4} | {'成分':<24} | {'產品數':>7} | {'成長':>8} | {'加速':>8} | {'新進':^4} |")
+    for item in compute_signals(store, window=args.window)[:args.top]:
+        print(
+            f"| {item['rank']:^4} | {item['ingredient'][:24]:<24} | {item['count']:>7,} "
+            f"| {item['growth']:>+8.1%} | {item['acceleration']:>+8.1%} "
+            f"| {'✓' if item['new_entrant'] else '':^4} |"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+交互作用文獻索引
+
+指南與報告需要的交互文獻欄位（PMID、嚴重程度、證據等級、品類、摘要）
+原本每個主題都重新列出 docs/Extractor/{dhi,dfi,ddi}/{category}/ 並逐檔解析
+frontmatter，共用品類（如 general）在一次執行中會被讀取多次。
+
+本模組為每個品類維護一份索引：
+  .cache/interaction_index/{type}/{category}.json
+  檔名 → (mtime_ns, size, 項目)
+
+- extract_interactions.py 萃取完成後更新索引，只讀取新增或變動的檔案
+- 查詢時先列目錄比對 mtime/size（人工移除 [REVIEW_NEEDED] 等修改會重新讀取），
+  未變動的檔案直接採用索引；同一品類在一次執行中只處理一次
+- 項目順序與目錄列舉順序相同（與原本的 glob 一致）
+
+項目欄位：
+  filename、pmid（檔名主幹）、review_needed（內文含 [REVIEW_NEEDED]）、
+  frontmatter（FRONTMATTER_FIELDS 中存在的欄位；無 frontmatter 時為 None；
+  日期等非 JSON 型別的值轉為字串，新讀取與自索引載入的項目相同）、
+  abstract（「## 摘要」至下一個 --- 之間的文字）
+
+用法：
+    from interaction_index import InteractionIndex
+
+    index = InteractionIndex("dhi")
+    for entry in index.entries("omega_fatty_acid"):
+        ...
+    index.save()
+
+  python3 scripts/interaction_index.py                # 更新 dhi、dfi、ddi 索引
+  python3 scripts/interaction_index.py dhi --rebuild  # 重建指定類型
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from pathlib import Path
+
+from frontmatter import load_frontmatter
+
+
+# 路徑配置
+PROJECT_ROOT = Path(__file__).parent.parent
+EXTRACTOR_DIR = PROJECT_ROOT / "docs" / "Extractor"
+INDEX_DIR = PROJECT_ROOT / ".cache" / "interaction_index"
+
+# 索引格式變更時遞增
+INDEX_VERSION = 1
+
+INTERACTION_TYPES = ("dhi", "dfi", "ddi")
+
+REVIEW_MARKER = "[REVIEW_NEEDED]"
+
+# 索引保留的 frontmatter 欄位
+FRONTMATTER_FIELDS = (
+    "title", "severity", "evidence_level", "study_type",
+    "source_url", "journal", "pub_date", "category",
+)
+
+# 索引項目可保留原樣的值型別（其餘轉為字串）
+JSON_SCALARS = (str, int, float, bool, type(None))
+
+ABSTRACT_RE = re.compile(r"## 摘要\s*\n([\s\S]*?)(?=\n---|\Z)")
+
+# 指南使用的摘要長度
+EXCERPT_LENGTH = 500
+
+
+def plain_value(value):
+    """frontmatter 值 → JSON 型別（YAML 解析出的日期等轉為字串）"""
+    if isinstance(value, JSON_SCALARS):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [plain_value(item) for item in value]
+    if isinstance(value, dict):
+        return {str(key): plain_value(item) for key, item in value.items()}
+    return str(value)
+
+
+def read_entry(path) -> dict:
+    """讀取一個交互文獻檔，回傳索引項目"""
+    path = Path(path)
+    content = path.read_text(encoding="utf-8")
+    entry = {
+        "filename": path.name,
+        "pmid": path.stem,
+        "review_needed": REVIEW_MARKER in content,
+        "frontmatter": None,
+        "abstract": "",
+    }
+
+    if content.startswith("---") or content.startswith(f"{REVIEW_MARKER}\n\n---"):
+        parts = content.replace(f"{REVIEW_MARKER}\n\n", "").split("---", 2)
+        if len(parts) >= 3:
+            fm = load_frontmatter(parts[1])
+            if fm:
+                entry["frontmatter"] = {key: plain_value(fm[key]) for key in FRONTMATTER_FIELDS if key in fm}
+
+    match = ABSTRACT_RE.search(content)
+    if match:
+        entry["abstract"] = match.group(1).strip()
+    return entry
+
+
+def abstract_excerpt(abstract: str, limit: int = EXCERPT_LENGTH) -> str:
+    """摘要至下一個 ## 標題為止，取前 limit 字"""
+    return abstract.split("\n##", 1)[0].strip()[:limit]
+
+
+class InteractionIndex:
+    """單一交互類型（dhi/dfi/ddi）的文獻索引，依品類分檔載入"""
+
+    def __init__(self, interaction_type: str, base_dir=None, rebuild: bool = False):
+        self.type = interaction_type
+        self.base_dir = Path(base_dir) if base_dir else EXTRACTOR_DIR / interaction_type
+        self.index_dir = INDEX_DIR / interaction_type
+        self.rebuild = rebuild
+        self.files = {}       # 品類 → {檔名: (mtime_ns, size, 項目)}
+        self.fresh = set()    # 本次執行已比對過目錄的品類
+        self.dirty = set()
+        self.reread = 0
+
+    def _load(self, category: str) -> dict:
+        if self.rebuild:
+            return {}
+        try:
+            with open(self.index_dir / f"{category}.json", "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+        if data.get("version") != INDEX_VERSION:
+            return {}
+        return {name: tuple(info) for name, info in data.get("files", {}).items()}
+
+    def _refresh(self, category: str):
+        """列出品類目錄，mtime/size 變動或新增的檔案才重新讀取"""
+        cached = self.files[category]
+        files = {}
+        try:
+            with os.scandir(self.base_dir / category) as it:
+                for dir_entry in it:
+                    name = dir_entry.name
+                    if not name.endswith(".md") or name.startswith(".") or not dir_entry.is_file():
+                        continue
+                    st = dir_entry.stat()
+                    info = cached.get(name)
+                    if not info or info[0] != st.st_mtime_ns or info[1] != st.st_size:
+                        info = (st.st_mtime_ns, st.st_size, read_entry(dir_entry.path))
+                        self.reread += 1
+                        self.dirty.add(category)
+                    files[name] = info
+        except FileNotFoundError:
+            pass
+        if len(files) != len(cached):
+            self.dirty.add(category)
+        self.files[category] = files
+
+    def entries(self, category: str) -> list[dict]:
+        """品類的索引項目（依目錄列舉順序；品類目錄不存在時為空）"""
+        if category not in self.files:
+            self.files[category] = self._load(category)
+        if category not in self.fresh:
+            self._refresh(category)
+            self.fresh.add(category)
+        return [info[2] for info in self.files[category].values()]
+
+    def categories(self) -> list[str]:
+        if not self.base_dir.is_dir():
+            return []
+        return sorted(
+            entry.name for entry in os.scandir(self.base_dir)
+            if entry.is_dir() and entry.name != "raw" and not entry.name.startswith(".")
+        )
+
+    def refresh(self) -> int:
+        """更新所有品類，回傳項目總數"""
+        return sum(len(self.entries(category)) for category in self.categories())
+
+    def save(self):
+        """寫入有變動的品類索引（先寫暫存檔再替換）"""
+        if not self.dirty:
+            return
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        for category in sorted(self.dirty):
+            path = self.index_dir / f"{category}.json"
+            tmp_path = path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": INDEX_VERSION, "files": self.files[category]}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        self.dirty.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="更新交互作用文獻索引")
+    parser.add_argument("types", nargs="*", metavar="TYPE", help=f"交互類型（預設 {' '.join(INTERACTION_TYPES)}）")
+    parser.add_argument("--rebuild", action="store_true", help="忽略既有索引，重新讀取所有檔案")
+    args = parser.parse_args()
+
+    for interaction_type in args.types or INTERACTION_TYPES:
+        if interaction_type not in INTERACTION_TYPES:
+            print(f"❌ 未知交互類型：{interaction_type}", file=sys.stderr)
+            sys.exit(1)
+        index = InteractionIndex(interaction_type, rebuild=args.rebuild)
+        total = index.refresh()
+        index.save()
+        print(f"📇 {interaction_type}：{total} 筆，{len(index.files)} 個品類（重新讀取 {index.reread} 筆）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+原始快照 JSONL 讀寫
+
+docs/Extractor/*/raw/ 下的快照（dsld-*.jsonl、hff-*.jsonl、ingredients-*.jsonl …）
+以 Zstandard 壓縮為 .jsonl.zst 保存。萃取、比對與擷取腳本一律經由
+open_jsonl() 開檔：
+
+- 讀取：依檔頭魔數判斷是否為 zstd（符號連結 latest.jsonl 指向 .zst 亦可），
+  跨多個 frame 連續解壓
+- 寫入：路徑以 .zst 結尾時以多執行緒壓縮寫入，否則為一般文字檔
+
+壓縮需要 zstandard 套件；未安裝時 snapshot_path() 回傳未壓縮路徑、
+compress_file() 保留原檔，讀取 .zst 檔則會提示安裝。
+設定環境變數 RAW_SNAPSHOT_COMPRESSION=off 可停用壓縮。
+
+用法：
+  python3 scripts/jsonl_io.py compress docs/Extractor/us_dsld/raw/dsld-*.jsonl
+  python3 scripts/jsonl_io.py cat docs/Extractor/kr_hff/raw/latest.jsonl | jq .
+  python3 scripts/jsonl_io.py count docs/Extractor/kr_hff/raw/hff-2026-02-04.jsonl.zst
+"""
+
+import argparse
+import glob
+import io
+import os
+import shutil
+import sys
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None  # 僅能讀寫未壓縮 JSONL
+
+
+ZSTD_SUFFIX = ".zst"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+# 壓縮等級（1–22）；10 在壓縮率與速度間取平衡
+COMPRESSION_LEVEL = 10
+
+COPY_CHUNK = 1 << 20
+
+
+def compression_enabled() -> bool:
+    """是否以 .zst 寫出新快照"""
+    if zstandard is None:
+        return False
+    return os.environ.get("RAW_SNAPSHOT_COMPRESSION", "on").lower() not in ("off", "0", "false", "no")
+
+
+def is_zstd(path) -> bool:
+    """依檔頭判斷是否為 zstd 壓縮檔"""
+    try:
+        with open(path, "rb") as f:
+            return f.read(4) == ZSTD_MAGIC
+    except OSError:
+        return False
+
+
+def _require_zstandard(path):
+    if zstandard is None:
+        raise RuntimeError(f"讀寫 {path} 需要 zstandard 套件：pip install zstandard")
+
+
+def open_jsonl(path, mode: str = "r", errors: str = "strict"):
+    """開啟 JSONL 快照（文字模式），透明處理 .zst 壓縮
+
+    Args:
+        path: 檔案路徑
+        mode: "r"、"w" 或 "a"（.zst 附加時寫入新的 frame）
+        errors: 文字解碼錯誤處理方式
+    """
+    path = os.fspath(path)
+    if mode == "r":
+        if not is_zstd(path):
+            return open(path, "r", encoding="utf-8", errors=errors)
+        _require_zstandard(path)
+        raw = open(path, "rb")
+        reader = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=True)
+        return io.TextIOWrapper(io.BufferedReader(reader, COPY_CHUNK), encoding="utf-8", errors=errors)
+
+    if mode not in ("w", "a"):
+        raise ValueError(f"不支援的模式：{mode}")
+    if not path.endswith(ZSTD_SUFFIX):
+        return open(path, mode, encoding="utf-8", errors=errors)
+    _require_zstandard(path)
+    raw = open(path, mode + "b")
+    compressor = zstandard.ZstdCompressor(level=COMPRESSION_LEVEL, threads=-1)
+    writer = compressor.stream_writer(raw, closefd=True)
+    return io.TextIOWrapper(writer, encoding="utf-8", errors=errors, write_through=False)
+
+
+def snapshot_path(path) -> str:
+    """新快照的輸出路徑：可壓縮時加上 .zst"""
+    path = os.fspath(path)
+    if compression_enabled() and not path.endswith(ZSTD_SUFFIX):
+        return path + ZSTD_SUFFIX
+    return path
+
+
+def strip_suffix(path) -> str:
+    """移除 .zst 與 .jsonl 副檔名（取得快照名稱，如 fish-oil-2026-02-04）"""
+    name = os.path.basename(os.fspath(path))
+    if name.endswith(ZSTD_SUFFIX):
+        name = name[:-len(ZSTD_SUFFIX)]
+    if name.endswith(".jsonl"):
+        name = name[:-len(".jsonl")]
+    return name
+
+
+def find_snapshots(pattern: str) -> list[str]:
+    """依 glob 樣式（如 raw/hff-*.jsonl）尋找快照，包含 .zst 版本
+
+    同名快照同時存在壓縮與未壓縮版本時只回傳壓縮版本。
+    """
+    found = {}
+    for path in glob.glob(pattern) + glob.glob(pattern + ZSTD_SUFFIX):
+        base = path[:-len(ZSTD_SUFFIX)] if path.endswith(ZSTD_SUFFIX) else path
+        if base not in found or path.endswith(ZSTD_SUFFIX):
+            found[base] = path
+    return sorted(found.values())
+
+
+def latest_snapshot(pattern: str):
+    """最新修改的快照；找不到時回傳 None"""
+    files = find_snapshots(pattern)
+    return max(files, key=os.path.getmtime) if files else None
+
+
+def compress_file(path, keep: bool = False) -> str:
+    """壓縮快照為 .zst（先寫暫存檔再替換），回傳壓縮後路徑
+
+    已是 zstd 或未安裝 zstandard 時回傳原路徑。
+    """
+    path = os.fspath(path)
+    if zstandard is None or is_zstd(path):
+        return path
+
+    target = path + ZSTD_SUFFIX
+    tmp_path = target + ".tmp"
+    compressor = zstandard.ZstdCompressor(level=COMPRESSION_LEVEL, threads=-1)
+    with open(path, "rb") as src, open(tmp_path, "wb") as dst:
+        compressor.copy_stream(src, dst, read_size=COPY_CHUNK, write_size=COPY_CHUNK)
+    shutil.copystat(path, tmp_path)
+    os.replace(tmp_path, target)
+    if not keep:
+        os.remove(path)
+    return target
+
+
+def count_lines(path) -> int:
+    """計算快照行數（與 wc -l 相同）"""
+    count = 0
+    if not is_zstd(path):
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(COPY_CHUNK), b""):
+                count += block.count(b"\n")
+        return count
+    _require_zstandard(path)
+    with open(path, "rb") as raw:
+        reader = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True)
+        for block in iter(lambda: reader.read(COPY_CHUNK), b""):
+            count += block.count(b"\n")
+    return count
+
+
+def cat(path, out=None):
+    """將快照解壓輸出（供 shell 管線使用）"""
+    out = out or sys.stdout.buffer
+    if not is_zstd(path):
+        with open(path, "rb") as f:
+            shutil.copyfileobj(f, out, COPY_CHUNK)
+        return
+    _require_zstandard(path)
+    with open(path, "rb") as raw:
+        zstandard.ZstdDecompressor().copy_stream(raw, out, read_size=COPY_CHUNK, write_size=COPY_CHUNK)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="原始快照 JSONL 讀寫工具")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_compress = sub.add_parser("compress", help="壓縮快照為 .jsonl.zst（輸出壓縮後路徑）")
+    p_compress.add_argument("files", nargs="+")
+    p_compress.add_argument("--keep", action="store_true", help="保留未壓縮原檔")
+
+    p_cat = sub.add_parser("cat", help="解壓輸出到 stdout")
+    p_cat.add_argument("file")
+
+    p_count = sub.add_parser("count", help="計算行數")
+    p_count.add_argument("file")
+
+    args = parser.parse_args()
+
+    try:
+        if args.command == "compress":
+            enabled = compression_enabled()
+            if not enabled:
+                print("⚠️  未安裝 zstandard 或已停用壓縮，保留未壓縮檔案", file=sys.stderr)
+            for path in args.files:
+                print(compress_file(path, keep=args.keep) if enabled else path)
+        elif args.command == "cat":
+            cat(args.file)
+        elif args.command == "count":
+            print(count_lines(args.file))
+    except (OSError, RuntimeError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+文獻統計引擎
+
+generate_literature_report.calculate_statistics() 原本逐篇文獻以巢狀 defaultdict
+累加各項統計，進階研究方向則對每篇文獻逐一以關鍵詞做子字串比對。
+
+本模組先將文獻載入欄式表（LiteratureFrame），再以分組計數產生所有統計：
+
+- 類別欄（study_type）：每篇一個整數代碼
+- 多值欄（claim_categories、ingredients_mentioned）：所有值的代碼依文獻順序
+  排成一個陣列，另以 offsets 記錄每篇的起訖（CSR 格式）
+- 證據等級、研究類型、功效分類、成分：代碼欄的計數（Counter，C 實作）
+- 成分 × 功效：每篇 (成分, 功效) 配對的座標 ing × 功效數 + cat 的計數（稀疏矩陣）
+- 成分兩兩組合：cooccurrence.CooccurrenceEngine（有 scipy 時為稀疏矩陣 XᵀX）
+- 進階研究方向：關鍵詞與子類型各編譯為 rule_engine.KeywordRules，
+  關鍵詞不再逐篇 .lower()，命中的方向才比對子類型
+
+代碼依首次出現順序配置，計數結果的鍵順序與原本逐篇累加相同，
+報告中同數量項目的排序因此不變。
+
+用法：
+    from literature_stats import LiteratureFrame
+
+    frame = LiteratureFrame(articles)
+    stats = frame.statistics(advanced_topics)   # advanced_topics 可為 None
+"""
+
+from collections import Counter
+from itertools import accumulate, chain
+
+from cooccurrence import CooccurrenceEngine
+from rule_engine import KeywordRules
+
+
+# 證據等級無法解析時的預設值
+DEFAULT_LEVEL = 5
+
+# 每個進階研究方向保留的代表性文獻數
+ADVANCED_SAMPLE_SIZE = 10
+
+
+def _as_list(value) -> list:
+    """多值欄：單一字串視為一個值"""
+    return [value] if isinstance(value, str) else value
+
+
+def _level(value) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return DEFAULT_LEVEL
+
+
+class CategoricalColumn:
+    """類別欄：每筆一個整數代碼，代碼依值首次出現的順序配置"""
+
+    def __init__(self, values: list):
+        vocab = {}
+        # len(vocab) 在 setdefault 之前取值，新值的代碼即為目前的詞彙數
+        self.codes = [vocab.setdefault(value, len(vocab)) for value in values]
+        self.names = list(vocab)
+
+    def __len__(self):
+        return len(self.names)
+
+    def counts(self) -> dict:
+        """值 → 筆數（依首次出現順序）"""
+        names = self.names
+        return {names[code]: count for code, count in Counter(self.codes).items()}
+
+
+class MultiValueColumn(CategoricalColumn):
+    """多值類別欄：codes 依文獻順序攤平，offsets[i]:offsets[i+1] 為第 i 篇的值"""
+
+    def __init__(self, rows: list):
+        super().__init__(list(chain.from_iterable(rows)))
+        self.offsets = list(accumulate(map(len, rows), initial=0))
+
+
+class AdvancedTopicMatcher:
+    """進階研究方向的關鍵詞編譯為一個規則表；命中的方向才比對其子類型"""
+
+    def __init__(self, topics: dict):
+        self.keys = list(topics)
+        self.rules = KeywordRules([
+            ([kw.lower() for kw in config.get("keywords", [])], key) for key, config in topics.items()
+        ])
+        self.subtypes = [
+            KeywordRules([([kw.lower() for kw in keywords], subtype)
+                          for subtype, keywords in config.get("subtypes", {}).items()])
+            for config in topics.values()
+        ]
+
+    def match(self, text: str) -> list:
+        """命中的 (方向, [子類型, ...])，依設定順序"""
+        found = self.rules.matches(text)
+        if not found:
+            return []
+        result = []
+        for index in sorted(found):
+            subtypes = self.subtypes[index]
+            result.append((self.keys[index], [subtypes.labels[i] for i in sorted(subtypes.matches(text))]))
+        return result
+
+
+class LiteratureFrame:
+    """文獻的欄式表示"""
+
+    def __init__(self, articles: list):
+        self.articles = articles
+        self.levels = [_level(a.get("evidence_level", DEFAULT_LEVEL)) for a in articles]
+        self.study_types = CategoricalColumn([a.get("study_type", "other") for a in articles])
+        self.categories = MultiValueColumn([_as_list(a.get("claim_categories", [])) for a in articles])
+        ingredients = [_as_list(a.get("ingredients_mentioned", [])) for a in articles]
+        self.ingredients = MultiValueColumn(ingredients)
+        self.cooccurrence = CooccurrenceEngine()
+        for row in ingredients:
+            self.cooccurrence.add(row)
+
+    def __len__(self):
+        return len(self.articles)
+
+    def ingredient_category(self) -> dict:
+        """成分 → 功效 → 文獻數（每篇的成分 × 功效配對，重複值照計）"""
+        width = len(self.categories)
+        cat_codes, cat_offsets = self.categories.codes, self.categories.offsets
+        ing_codes, ing_offsets = self.ingredients.codes, self.ingredients.offsets
+        coords = []
+        for row in range(len(self.articles)):
+            cats = cat_codes[cat_offsets[row]:cat_offsets[row + 1]]
+            if not cats:
+                continue
+            for ing in ing_codes[ing_offsets[row]:ing_offsets[row + 1]]:
+                base = ing * width
+                coords.extend(base + cat for cat in cats)
+
+        result = {}
+        ing_names, cat_names = self.ingredients.names, self.categories.names
+        for coord, count in Counter(coords).items():
+            ing, cat = divmod(coord, width)
+            result.setdefault(ing_names[ing], {})[cat_names[cat]] = count
+        return result
+
+    def advanced_topics(self, topics: dict) -> dict:
+        """進階研究方向 → {"count", "articles"（前 10 篇）, "subtypes"}"""
+        matcher = AdvancedTopicMatcher(topics)
+        result = {}
+        for article in self.articles:
+            text = f"{article.get('title', '')} {article.get('abstract_text', '')}".lower()
+            for key, subtypes in matcher.match(text):
+                entry = result.get(key)
+                if entry is None:
+                    entry = result[key] = {"count": 0, "articles": [], "subtypes": {}}
+                entry["count"] += 1
+                if len(entry["articles"]) < ADVANCED_SAMPLE_SIZE:
+                    entry["articles"].append(article)
+                for subtype in subtypes:
+                    entry["subtypes"][subtype] = entry["subtypes"].get(subtype, 0) + 1
+        return result
+
+    def statistics(self, advanced_topics: dict = None) -> dict:
+        """calculate_statistics() 的統計結果"""
+        levels = self.levels
+        return {
+            "total": len(self.articles),
+            "by_evidence_level": dict(Counter(levels)),
+            "by_study_type": self.study_types.counts(),
+            "by_claim_category": self.categories.counts(),
+            "by_ingredient": self.ingredients.counts(),
+            "ingredient_category": self.ingredient_category(),
+            "level_1_articles": [a for a, level in zip(self.articles, levels) if level == 1],
+            "level_2_articles": [a for a, level in zip(self.articles, levels) if level == 2],
+            "advanced_topics": self.advanced_topics(advanced_topics) if advanced_topics else {},
+            "cooccurrence": self.cooccurrence.matrix(),
+        }
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+產品倒排索引
+
+從 docs/Extractor/{layer}/{category}/*.md（含分片子目錄）建立持久化倒排索引，
+供主題報告以索引查詢取代逐檔全文掃描：
+
+- 成分索引：成分段落的正規化 token → 產品 ID
+- 文字索引：產品名稱、聲明等全文 token → 產品 ID
+
+Token 規則：
+- 拉丁字母/數字：NFKC + 小寫後以非英數字元切詞
+- 中日韓文字：連續字元切為二字元組（單字時保留單字）
+
+查詢結果為候選集合，涵蓋以子字串比對會命中的所有產品（拉丁詞可命中
+token 的一部分，如 "folate" 命中 "methylfolate"），需再以原文確認。
+
+索引以 pickle 存於 .cache/product_index.pkl，依檔案 mtime/size
+增量更新；只有新增或變動的產品檔會重新讀取。
+
+用法：
+  python3 scripts/product_index.py             # 增量更新索引
+  python3 scripts/product_index.py --rebuild   # 重新建立索引
+  python3 scripts/product_index.py --stats     # 顯示索引統計
+"""
+
+import argparse
+import bisect
+import os
+import pickle
+import re
+import unicodedata
+from pathlib import Path
+
+from product_layout import Layout
+from product_reader import ProductDocument
+
+
+# 路徑配置
+PROJECT_ROOT = Path(__file__).parent.parent
+EXTRACTOR_DIR = PROJECT_ROOT / "docs" / "Extractor"
+INDEX_PATH = PROJECT_ROOT / ".cache" / "product_index.pkl"
+
+# 索引格式變更時遞增
+INDEX_VERSION = 1
+
+# 納入索引的產品 Layer
+PRODUCT_LAYERS = ("us_dsld", "ca_lnhpd", "kr_hff", "jp_fnfc", "jp_foshu", "tw_hf")
+
+WORD_RE = re.compile(r"[0-9a-z]+")
+CJK_RE = re.compile(r"[\u3040-\u30ff\u3400-\u9fff\uac00-\ud7af\uf900-\ufaff]+")
+INGREDIENT_SECTIONS = ("成分", "機能性成分", "機能性関与成分", "Ingredients")
+
+# 寫入索引檔的欄位
+PERSISTED_FIELDS = (
+    "version", "next_id", "paths", "docs", "forward", "ingredient_postings", "text_postings",
+)
+
+
+def normalize(text: str) -> str:
+    """NFKC 正規化並轉小寫"""
+    return unicodedata.normalize("NFKC", text).lower()
+
+
+def tokenize(text: str) -> set[str]:
+    """將文字切為索引 token"""
+    text = normalize(text)
+    tokens = set(WORD_RE.findall(text))
+    for run in CJK_RE.findall(text):
+        if len(run) == 1:
+            tokens.add(run)
+        else:
+            tokens.update(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def document_tokens(content: str) -> tuple[set[str], set[str]]:
+    """回傳 (成分 token, 全文 token)"""
+    doc = ProductDocument(content)
+    ingredient_text = "\n".join(doc.section(name) or "" for name in INGREDIENT_SECTIONS)
+    return tokenize(ingredient_text), tokenize(content)
+
+
+def iter_product_files(extractor_dir: Path = EXTRACTOR_DIR):
+    """逐一產出 (相對路徑, layer, category, stat)"""
+    for layer in PRODUCT_LAYERS:
+        layer_dir = extractor_dir / layer
+        if not layer_dir.is_dir():
+            continue
+        for category, path in Layout.load(layer_dir).iter_files():
+            rel_path = path.relative_to(extractor_dir).as_posix()
+            yield rel_path, layer, category, path.stat()
+
+
+class ProductIndex:
+    """產品倒排索引（成分 + 全文）"""
+
+    def __init__(self, extractor_dir: Path = EXTRACTOR_DIR):
+        self.extractor_dir = extractor_dir
+        self.version = INDEX_VERSION
+        self.next_id = 0
+        self.paths = {}          # rel_path → doc_id
+        self.docs = {}           # doc_id → (rel_path, layer, category, mtime_ns, size, indexed)
+        self.forward = {}        # doc_id → (成分 token, 全文 token)
+        self.ingredient_postings = {}
+        self.text_postings = {}
+        self._vocab = None
+
+    # ------------------------------------------------------------------
+    # 持久化
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def load(cls, path: Path = INDEX_PATH, extractor_dir: Path = EXTRACTOR_DIR) -> "ProductIndex":
+        """載入索引；不存在或版本不符時回傳空索引"""
+        index = cls(extractor_dir)
+        try:
+            with open(path, "rb") as f:
+                state = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return index
+
+        if isinstance(state, dict) and state.get("version") == INDEX_VERSION:
+            for key in PERSISTED_FIELDS:
+                setattr(index, key, state[key])
+        return index
+
+    def save(self, path: Path = INDEX_PATH):
+        """寫入索引（先寫暫存檔再替換）
+
+        只序列化基本型別，避免 pickle 綁定執行時的模組名稱（__main__）。
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        state = {key: getattr(self, key) for key in PERSISTED_FIELDS}
+        with open(tmp_path, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    # ------------------------------------------------------------------
+    # 增量更新
+    # ------------------------------------------------------------------
+
+    def _add(self, doc_id: int, ingredient_tokens: set, text_tokens: set):
+        for token in ingredient_tokens:
+            self.ingredient_postings.setdefault(token, set()).add(doc_id)
+        for token in text_tokens:
+            self.text_postings.setdefault(token, set()).add(doc_id)
+        self.forward[doc_id] = (frozenset(ingredient_tokens), frozenset(text_tokens))
+
+    def _remove(self, doc_id: int):
+        ingredient_tokens, text_tokens = self.forward.pop(doc_id, ((), ()))
+        for postings, tokens in (
+            (self.ingredient_postings, ingredient_tokens),
+            (self.text_postings, text_tokens),
+        ):
+            for token in tokens:
+                ids = postings.get(token)
+                if ids is not None:
+                    ids.discard(doc_id)
+                    if not ids:
+                        del postings[token]
+
+    def refresh(self) -> dict:
+        """依 mtime/size 增量更新索引，回傳變動統計"""
+        stats = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+        seen = set()
+
+        for rel_path, layer, category, st in iter_product_files(self.extractor_dir):
+            seen.add(rel_path)
+            doc_id = self.paths.get(rel_path)
+            if doc_id is not None:
+                _, _, _, mtime_ns, size, _ = self.docs[doc_id]
+                if mtime_ns == st.st_mtime_ns and size == st.st_size:
+                    stats["unchanged"] += 1
+                    continue
+                self._remove(doc_id)
+                stats["updated"] += 1
+            else:
+                doc_id = self.next_id
+                self.next_id += 1
+                self.paths[rel_path] = doc_id
+                stats["added"] += 1
+
+            try:
+                content = (self.extractor_dir / rel_path).read_text(encoding="utf-8")
+            except (OSError, UnicodeDecodeError):
+                content = ""
+
+            # REVIEW_NEEDED 產品不納入索引，但記錄 stat 以免重複讀取
+            indexed = bool(content) and "[REVIEW_NEEDED]" not in content
+            if indexed:
+                self._add(doc_id, *document_tokens(content))
+            self.docs[doc_id] = (rel_path, layer, category, st.st_mtime_ns, st.st_size, indexed)
+
+        for rel_path in list(self.paths):
+            if rel_path not in seen:
+                doc_id = self.paths.pop(rel_path)
+                self._remove(doc_id)
+                del self.docs[doc_id]
+                stats["removed"] += 1
+
+        if stats["added"] or stats["updated"] or stats["removed"]:
+            self._vocab = None
+        return stats
+
+    # ------------------------------------------------------------------
+    # 查詢
+    # ------------------------------------------------------------------
+
+    def _postings(self, field: str) -> dict:
+        return self.ingredient_postings if field == "ingredient" else self.text_postings
+
+    def _sorted_vocab(self, field: str) -> tuple[list[str], str, list[int]]:
+        """(排序後的 token, 以換行串接的 token 字串, 各 token 在字串中的起點)"""
+        if self._vocab is None:
+            self._vocab = {}
+        if field not in self._vocab:
+            vocab = sorted(self._postings(field))
+            starts, offset = [], 0
+            for token in vocab:
+                starts.append(offset)
+                offset += len(token) + 1
+            self._vocab[field] = (vocab, "\n".join(vocab), starts)
+        return self._vocab[field]
+
+    def _prefix_postings(self, field: str, prefix: str) -> set[int]:
+        postings = self._postings(field)
+        vocab = self._sorted_vocab(field)[0]
+        result = set()
+        i = bisect.bisect_left(vocab, prefix)
+        while i < len(vocab) and vocab[i].startswith(prefix):
+            result |= postings[vocab[i]]
+            i += 1
+        return result
+
+    def _infix_postings(self, field: str, word: str, suffix: bool = False) -> set[int]:
+        """包含 word（suffix 時為以 word 結尾）的 token 所屬產品
+
+        以 str.find 掃描串接後的 token 字串；token 只含英數字與 CJK，
+        換行分隔符不會被命中。
+        """
+        postings = self._postings(field)
+        vocab, blob, starts = self._sorted_vocab(field)
+        result = set()
+        pos = blob.find(word)
+        while pos != -1:
+            i = bisect.bisect_right(starts, pos) - 1
+            token = vocab[i]
+            if not suffix or token.endswith(word):
+                result |= postings[token]
+            pos = blob.find(word, starts[i] + len(token) + 1)
+        return result
+
+    def _char_postings(self, field: str, char: str) -> set[int]:
+        """單一 CJK 字元：合併含該字元的所有二字元組"""
+        postings = self._postings(field)
+        result = set(postings.get(char, ()))
+        for token, ids in postings.items():
+            if len(token) == 2 and char in token:
+                result |= ids
+        return result
+
+    def lookup(self, keyword: str, field: str = "text") -> set[int]:
+        """查詢可能包含關鍵詞的產品 ID（候選集合，需再以原文確認）
+
+        結果涵蓋所有以子字串比對會命中的產品（match_product 的語意）：
+        關鍵詞在原文中出現時，其第一個拉丁詞必為某 token 的字尾、最後一個詞
+        必為某 token 的字首、中間的詞必為完整 token；只有一個詞時可位於 token
+        任意位置（"glucosamine" 可命中 "n-acetylglucosamine" 的 "acetylglucosamine"）。
+        CJK 關鍵詞以二字元組交集比對。
+        """
+        postings = self._postings(field)
+        text = normalize(keyword)
+        words = WORD_RE.findall(text)
+        runs = CJK_RE.findall(text)
+
+        candidate_sets = []
+        last = len(words) - 1
+        for i, word in enumerate(words):
+            if last == 0:
+                candidate_sets.append(self._infix_postings(field, word))
+            elif i == 0:
+                candidate_sets.append(self._infix_postings(field, word, suffix=True))
+            elif i == last:
+                candidate_sets.append(self._prefix_postings(field, word))
+            else:
+                candidate_sets.append(postings.get(word, set()))
+        for run in runs:
+            if len(run) == 1:
+                candidate_sets.append(self._char_postings(field, run))
+            else:
+                for i in range(len(run) - 1):
+                    candidate_sets.append(postings.get(run[i:i + 2], set()))
+
+        if not candidate_sets:
+            return set()
+
+        candidate_sets.sort(key=len)
+        result = set(candidate_sets[0])
+        for ids in candidate_sets[1:]:
+            result &= ids
+            if not result:
+                break
+        return result
+
+    def search(self, keywords: list[str], fields: tuple = ("ingredient", "text"),
+               categories: list[str] = None) -> list[str]:
+        """回傳任一關鍵詞命中的產品相對路徑（依路徑排序）"""
+        doc_ids = set()
+        for keyword in keywords:
+            for field in fields:
+                doc_ids |= self.lookup(keyword, field)
+
+        paths = []
+        for doc_id in doc_ids:
+            rel_path, _, category, _, _, indexed = self.docs[doc_id]
+            if not indexed:
+                continue
+            if categories and category not in categories:
+                continue
+            paths.append(rel_path)
+        return sorted(paths)
+
+
+def load_index(rebuild: bool = False, save: bool = True, verbose: bool = True) -> ProductIndex:
+    """載入並增量更新索引"""
+    index = ProductIndex(EXTRACTOR_DIR) if rebuild else ProductIndex.load()
+    stats = index.refresh()
+    if verbose:
+        print(
+            f"🗂️ 產品索引：{len(index.docs)} 筆"
+            f"（新增 {stats['added']}、更新 {stats['updated']}、刪除 {stats['removed']}）"
+        )
+    if save and (rebuild or stats["added"] or stats["updated"] or stats["removed"]):
+        index.save()
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="產品倒排索引")
+    parser.add_argument("--rebuild", action="store_true", help="重新建立索引")
+    parser.add_argument("--stats", action="store_true", help="顯示索引統計")
+    args = parser.parse_args()
+
+    index = load_index(rebuild=args.rebuild)
+
+    if args.stats:
+        indexed = sum(1 for d in index.docs.values() if d[5])
+        print(f"  已索引產品：{indexed}")
+        print(f"  成分 token：{len(index.ingredient_postings)}")
+        print(f"  全文 token：{len(index.text_postings)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+產品 Layer 輸出目錄配置
+
+產品文件的邏輯位址為 (category, 檔名)，例如 (vitamins_minerals, 12345.md)。
+實際存放位置依 Layer 的配置而定：
+
+- flat（預設）：docs/Extractor/{layer}/{category}/{檔名}
+- sharded：docs/Extractor/{layer}/{category}/{分片}/{檔名}
+  分片為檔名 MD5 的前 width 個十六進位字元（width=2 時 256 個分片），
+  us_dsld、ca_lnhpd 單一品類數萬筆時，每個目錄仍只有數百筆
+
+配置記錄在 docs/Extractor/{layer}/.layout.json，不存在時為 flat。
+萃取（extract_runtime）依配置決定寫入路徑；分析腳本以
+iter_category_files() 列出品類下的產品檔，兩種配置皆適用。
+只有名稱長度等於 Layer 分片寬度的十六進位子目錄視為分片（flat 時不進入子目錄），
+品類下的其他子目錄（例如 b12/）不會被當成分片。
+
+用法：
+    from product_layout import Layout, iter_category_files
+
+    layout = Layout.load(EXTRACTOR_DIR / "us_dsld")
+    layout.path("vitamins_minerals", "12345.md")      # 實際路徑
+    for md_file in iter_category_files(category_dir):  # 列出產品檔
+        ...
+
+  python3 scripts/product_layout.py status                     # 各 Layer 配置與目錄大小
+  python3 scripts/product_layout.py migrate us_dsld ca_lnhpd   # 改為分片配置並搬移檔案
+  python3 scripts/product_layout.py migrate us_dsld --flat     # 還原為單層目錄
+  python3 scripts/product_layout.py resolve us_dsld vitamins_minerals/12345.md
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from functools import lru_cache
+from pathlib import Path
+
+
+# 路徑配置
+PROJECT_ROOT = Path(__file__).parent.parent
+EXTRACTOR_DIR = PROJECT_ROOT / "docs" / "Extractor"
+
+LAYOUT_FILE = ".layout.json"
+
+# 預設分片寬度（十六進位字元數）
+DEFAULT_SHARD_WIDTH = 2
+
+# 可用的分片寬度
+SHARD_WIDTHS = range(1, 5)
+
+HEX_DIGITS = frozenset("0123456789abcdef")
+
+# 產品 Layer
+PRODUCT_LAYERS = ("us_dsld", "ca_lnhpd", "kr_hff", "jp_fnfc", "jp_foshu", "tw_hf")
+
+
+def shard_of(filename: str, width: int = DEFAULT_SHARD_WIDTH) -> str:
+    """檔名 → 分片目錄名稱"""
+    return hashlib.md5(filename.encode("utf-8")).hexdigest()[:width]
+
+
+def is_shard_dir(name: str, widths=SHARD_WIDTHS) -> bool:
+    """目錄名稱是否為分片（長度屬於 widths 的小寫十六進位字元）"""
+    return len(name) in widths and all(c in HEX_DIGITS for c in name)
+
+
+@lru_cache(maxsize=None)
+def _layer_shard_widths(layer_dir: str) -> tuple:
+    return Layout.load(layer_dir).shard_widths()
+
+
+def layer_and_category(path) -> tuple[str, str]:
+    """產品檔路徑 → (layer, category)，略過分片目錄
+
+    上層目錄只有在所屬 Layer 為 sharded 且名稱符合分片寬度時才視為分片；
+    各 Layer 的配置在一次執行中只讀取一次。
+    """
+    parent = Path(path).parent
+    if is_shard_dir(parent.name, _layer_shard_widths(str(parent.parent.parent))):
+        parent = parent.parent
+    return parent.parent.name, parent.name
+
+
+def iter_category_files(category_dir, widths=None):
+    """列出品類目錄下的產品 .md 檔（含分片子目錄）
+
+    widths 為視為分片的目錄名稱長度；預設依所屬 Layer 的配置（flat 時不進入子目錄）。
+    """
+    category_dir = Path(category_dir)
+    if widths is None:
+        widths = Layout.load(category_dir.parent).shard_widths()
+    try:
+        entries = list(os.scandir(category_dir))
+    except OSError:
+        return
+    for entry in entries:
+        if entry.name.endswith(".md") and entry.is_file():
+            yield category_dir / entry.name
+        elif widths and entry.is_dir() and is_shard_dir(entry.name, widths):
+            with os.scandir(entry.path) as children:
+                for child in children:
+                    if child.name.endswith(".md") and child.is_file():
+                        yield category_dir / entry.name / child.name
+
+
+class Layout:
+    """Layer 的輸出目錄配置"""
+
+    def __init__(self, layer_dir, sharded: bool = False, width: int = DEFAULT_SHARD_WIDTH):
+        self.layer_dir = Path(layer_dir)
+        self.sharded = sharded
+        self.width = width
+
+    @classmethod
+    def load(cls, layer_dir) -> "Layout":
+        """讀取 .layout.json；不存在或格式錯誤時為 flat"""
+        layout = cls(layer_dir)
+        try:
+            with open(layout.layer_dir / LAYOUT_FILE, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return layout
+        if data.get("scheme") == "sharded":
+            layout.sharded = True
+            layout.width = int(data.get("width", DEFAULT_SHARD_WIDTH))
+        return layout
+
+    def save(self):
+        """寫入 .layout.json（flat 時移除設定檔）"""
+        path = self.layer_dir / LAYOUT_FILE
+        if not self.sharded:
+            if path.exists():
+                path.unlink()
+            return
+        self.layer_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"scheme": "sharded", "width": self.width}, f)
+            f.write("\n")
+        os.replace(tmp_path, path)
+
+    def shard_widths(self) -> tuple:
+        """視為分片的目錄名稱長度（flat 時為空）"""
+        return (self.width,) if self.sharded else ()
+
+    def describe(self) -> str:
+        return f"sharded（{self.width} 字元）" if self.sharded else "flat"
+
+    def rel_path(self, category: str, filename: str) -> str:
+        """邏輯位址 → 相對於 Layer 目錄的路徑"""
+        if self.sharded:
+            return os.path.join(category, shard_of(filename, self.width), filename)
+        return os.path.join(category, filename)
+
+    def path(self, category: str, filename: str) -> Path:
+        """邏輯位址 → 實際路徑"""
+        return self.layer_dir / self.rel_path(category, filename)
+
+    def resolve(self, logical: str):
+        """'{category}/{檔名}' → 實際路徑；不存在時回傳 None
+
+        依目前配置找不到時，也嘗試另一種配置（搬移中途仍可定位）。
+        """
+        category, _, filename = logical.strip("/").rpartition("/")
+        category = category.split("/")[0]
+        for candidate in (self.path(category, filename),
+                          self.layer_dir / category / filename,
+                          self.layer_dir / category / shard_of(filename, self.width) / filename):
+            if candidate.is_file():
+                return candidate
+        return None
+
+    def categories(self) -> list[str]:
+        if not self.layer_dir.is_dir():
+            return []
+        return sorted(
+            entry.name for entry in os.scandir(self.layer_dir)
+            if entry.is_dir() and entry.name != "raw" and not entry.name.startswith(".")
+        )
+
+    def iter_files(self):
+        """逐一產出 (category, 實際路徑)"""
+        for category in self.categories():
+            for path in iter_category_files(self.layer_dir / category, self.shard_widths()):
+                yield category, path
+
+
+# ==========================================================
+# 搬移
+# ==========================================================
+
+def migrate(layer_dir, sharded: bool, width: int = DEFAULT_SHARD_WIDTH, dry_run: bool = False) -> dict:
+    """將 Layer 的產品檔搬移到目標配置
+
+    先搬移檔案再寫入配置；中斷後重新執行即可繼續。
+    來源涵蓋目前配置與目標配置寬度的分片目錄（配置在搬移完成後才寫入，
+    中斷時檔案可能分散在兩者之中）。
+    檔案以 rename 搬移，mtime 不變（update.sh 的增量判斷不受影響）。
+    """
+    target = Layout(layer_dir, sharded=sharded, width=width)
+    widths = set(Layout.load(layer_dir).shard_widths()) | set(target.shard_widths())
+    stats = {"moved": 0, "kept": 0, "conflicts": 0}
+
+    sources = [
+        (category, path)
+        for category in target.categories()
+        for path in iter_category_files(target.layer_dir / category, widths)
+    ]
+    for category, path in sources:
+        dest = target.path(category, path.name)
+        if path == dest:
+            stats["kept"] += 1
+            continue
+        if dest.exists():
+            print(f"  ⚠️  目標已存在，保留原檔：{path}", file=sys.stderr)
+            stats["conflicts"] += 1
+            continue
+        if not dry_run:
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            os.rename(path, dest)
+        stats["moved"] += 1
+
+    if not dry_run:
+        # 移除搬空的子目錄
+        for category in target.categories():
+            category_dir = target.layer_dir / category
+            for entry in os.scandir(category_dir):
+                if entry.is_dir() and is_shard_dir(entry.name, widths):
+                    try:
+                        os.rmdir(entry.path)
+                    except OSError:
+                        pass
+        target.save()
+    return stats
+
+
+def directory_sizes(layout: Layout) -> dict:
+    """各品類的檔案數與單一目錄最大檔案數"""
+    sizes = {}
+    for category in layout.categories():
+        per_dir = {}
+        for path in iter_category_files(layout.layer_dir / category, layout.shard_widths()):
+            per_dir[path.parent] = per_dir.get(path.parent, 0) + 1
+        sizes[category] = (sum(per_dir.values()), max(per_dir.values(), default=0))
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="產品 Layer 輸出目錄配置")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_status = sub.add_parser("status", help="顯示各 Layer 配置與目錄大小")
+    p_status.add_argument("layers", nargs="*", metavar="LAYER")
+
+    p_migrate = sub.add_parser("migrate", help="搬移到分片（或單層）配置")
+    p_migrate.add_argument("layers", nargs="+", metavar="LAYER")
+    p_migrate.add_argument("--flat", action="store_true", help="還原為單層目錄")
+    p_migrate.add_argument("--width", type=int, default=DEFAULT_SHARD_WIDTH,
+                           help=f"分片寬度（十六進位字元數，預設 {DEFAULT_SHARD_WIDTH}）")
+    p_migrate.add_argument("--dry-run", action="store_true", help="只顯示將搬移的數量")
+
+    p_resolve = sub.add_parser("resolve", help="邏輯位址（category/檔名）→ 實際路徑")
+    p_resolve.add_argument("layer")
+    p_resolve.add_argument("paths", nargs="+", metavar="CATEGORY/FILE")
+
+    args = parser.parse_args()
+
+    if args.command == "resolve":
+        layout = Layout.load(EXTRACTOR_DIR / args.layer)
+        missing = 0
+        for logical in args.paths:
+            path = layout.resolve(logical)
+            if path is None:
+                print(f"❌ 找不到：{logical}", file=sys.stderr)
+                missing += 1
+            else:
+                print(path)
+        sys.exit(1 if missing else 0)
+
+    if args.command == "status":
+        for layer in args.layers or PRODUCT_LAYERS:
+            layout = Layout.load(EXTRACTOR_DIR / layer)
+            print(f"▶ {layer}：{layout.describe()}")
+            for category, (total, largest) in directory_sizes(layout).items():
+                print(f"    - {category}: {total:,} 筆（單一目錄最多 {largest:,} 筆）")
+        return
+
+    if args.width not in SHARD_WIDTHS:
+        print("❌ --width 須介於 1–4", file=sys.stderr)
+        sys.exit(1)
+    for layer in args.layers:
+        layer_dir = EXTRACTOR_DIR / layer
+        if not layer_dir.is_dir():
+            print(f"❌ Layer 目錄不存在：{layer_dir}", file=sys.stderr)
+            sys.exit(1)
+        target = "flat" if args.flat else f"sharded（{args.width} 字元）"
+        print(f"▶ {layer} → {target}{'（dry run）' if args.dry_run else ''}")
+        stats = migrate(layer_dir, sharded=not args.flat, width=args.width, dry_run=args.dry_run)
+        print(f"  搬移：{stats['moved']:,}，已在目標位置：{stats['kept']:,}，衝突：{stats['conflicts']:,}")
+
+
+if __name__ == "__main__":
+    main()
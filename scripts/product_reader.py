@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+產品 Markdown 共用讀取器
+
+所有分析腳本共用的產品檔解析：讀檔時以單一編譯正規表示式掃描一次，
+記錄每個 `## 章節` 的位置；章節內容、frontmatter 與清單項目在存取時
+才切出並快取，未使用的章節不會被處理。
+
+各 Layer 的成分章節：
+
+| Layer | 章節 | 屬性 |
+|-------|------|------|
+| us_dsld, ca_lnhpd | ## 成分 | ingredients_text |
+| jp_foshu, jp_fnfc | ## 機能性成分 | functional_ingredients |
+| kr_hff | ## 規格基準 | specification |
+| tw_hf | ## 保健功效成分 | health_ingredients |
+
+用法：
+    from product_reader import ProductDocument
+
+    doc = ProductDocument.from_file(path)
+    if not doc.review_needed:
+        doc.frontmatter.get("product_name")
+        doc.ingredient_section()      # 依 layer 取成分章節
+        doc.bullets("成分")           # "- " 開頭的項目
+"""
+
+import re
+from pathlib import Path
+from typing import Optional
+
+from frontmatter import load_frontmatter
+from product_layout import layer_and_category
+
+
+# 章節標題（## 與 ### 皆視為章節邊界，與原本 (?=\n##) 的切分一致）
+HEADER_RE = re.compile(r"^##+[ \t]*(.*?)[ \t]*\r?$", re.MULTILINE)
+
+REVIEW_MARKER = "[REVIEW_NEEDED]"
+
+# 各 Layer 的成分章節
+LAYER_INGREDIENT_SECTION = {
+    "us_dsld": "成分",
+    "ca_lnhpd": "成分",
+    "kr_hff": "規格基準",
+    "jp_foshu": "機能性成分",
+    "jp_fnfc": "機能性成分",
+    "tw_hf": "保健功效成分",
+}
+
+
+class ProductDocument:
+    """單一產品 Markdown 的延遲解析檢視"""
+
+    __slots__ = ("content", "path", "_spans", "_frontmatter", "_cache")
+
+    def __init__(self, content: str, path: Optional[Path] = None):
+        self.content = content
+        self.path = Path(path) if path is not None else None
+        self._spans = None
+        self._frontmatter = None
+        self._cache = {}
+
+    @classmethod
+    def from_file(cls, path) -> Optional["ProductDocument"]:
+        """讀取產品檔；讀取失敗時回傳 None"""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return cls(f.read(), path)
+        except (OSError, UnicodeDecodeError):
+            return None
+
+    # ------------------------------------------------------------------
+    # 基本屬性
+    # ------------------------------------------------------------------
+
+    @property
+    def review_needed(self) -> bool:
+        return self.content.lstrip().startswith(REVIEW_MARKER)
+
+    @property
+    def layer(self) -> str:
+        return layer_and_category(self.path)[0] if self.path else ""
+
+    @property
+    def category(self) -> str:
+        return layer_and_category(self.path)[1] if self.path else ""
+
+    @property
+    def frontmatter(self) -> dict:
+        """frontmatter 欄位（略過開頭的 [REVIEW_NEEDED] 標記）"""
+        if self._frontmatter is None:
+            text = self.content
+            if text.startswith(REVIEW_MARKER):
+                text = text[len(REVIEW_MARKER):].lstrip("\n")
+            self._frontmatter = {}
+            if text.startswith("---"):
+                parts = text.split("---", 2)
+                if len(parts) >= 3:
+                    self._frontmatter = load_frontmatter(parts[1])
+        return self._frontmatter
+
+    # ------------------------------------------------------------------
+    # 章節
+    # ------------------------------------------------------------------
+
+    def _index_sections(self) -> dict:
+        """單次掃描建立 {章節名稱: (起點, 終點)}；同名章節取第一個"""
+        spans = {}
+        content = self.content
+        matches = list(HEADER_RE.finditer(content))
+        for i, match in enumerate(matches):
+            start = match.end() + 1
+            end = matches[i + 1].start() - 1 if i + 1 < len(matches) else len(content)
+            spans.setdefault(match.group(1).lower(), (start, max(start, end)))
+        return spans
+
+    @property
+    def section_names(self) -> list[str]:
+        if self._spans is None:
+            self._spans = self._index_sections()
+        return list(self._spans)
+
+    def has_section(self, name: str) -> bool:
+        if self._spans is None:
+            self._spans = self._index_sections()
+        return name.lower() in self._spans
+
+    def section(self, name: str) -> Optional[str]:
+        """取得章節內容（不含標題行）；章節不存在時回傳 None"""
+        key = name.lower()
+        if key in self._cache:
+            return self._cache[key]
+        if self._spans is None:
+            self._spans = self._index_sections()
+        span = self._spans.get(key)
+        text = self.content[span[0]:span[1]] if span else None
+        self._cache[key] = text
+        return text
+
+    def bullets(self, name: str) -> list[str]:
+        """章節中以 "- " 開頭的項目（已去除前綴與空白）"""
+        text = self.section(name)
+        if not text:
+            return []
+        items = []
+        for line in text.split("\n"):
+            line = line.strip()
+            if line.startswith("- "):
+                items.append(line[2:].strip())
+        return items
+
+    def ingredient_section(self, layer: Optional[str] = None) -> Optional[str]:
+        """依 Layer 取得成分章節"""
+        name = LAYER_INGREDIENT_SECTION.get(layer or self.layer, "成分")
+        return self.section(name)
+
+    # ------------------------------------------------------------------
+    # 各 Layer 欄位
+    # ------------------------------------------------------------------
+
+    @property
+    def ingredients_text(self) -> Optional[str]:
+        """## 成分（us_dsld、ca_lnhpd）"""
+        return self.section("成分")
+
+    @property
+    def functional_ingredients(self) -> Optional[str]:
+        """## 機能性成分（jp_foshu、jp_fnfc）"""
+        return self.section("機能性成分")
+
+    @property
+    def specification(self) -> Optional[str]:
+        """## 規格基準（kr_hff）"""
+        return self.section("規格基準")
+
+    @property
+    def health_ingredients(self) -> Optional[str]:
+        """## 保健功效成分（tw_hf）"""
+        return self.section("保健功效成分")
+
+    @property
+    def main_function(self) -> Optional[str]:
+        """## 主要功能（kr_hff）"""
+        return self.section("主要功能")
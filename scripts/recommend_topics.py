@@ -3,15 +3,18 @@
 主題推薦腳本
 
 功能：
-1. 讀取 ingredient_radar 報告，取得成分排名
-2. 比對上期報告，計算成長趨勢
+1. 讀取成分趨勢儲存（ingredient_trends.json.gz），取得完整成分排名
+2. 計算多期成長率、加速度與新進榜訊號
 3. 排除已追蹤主題 (topics/*.yaml)
 4. 輸出推薦清單
 
+趨勢儲存少於兩期時，改為解析最新兩期 ingredient_radar 報告的 Top 20 表格。
+
 用法：
-  python3 scripts/recommend_topics.py              # 輸出推薦清單
-  python3 scripts/recommend_topics.py --json       # JSON 格式輸出
-  python3 scripts/recommend_topics.py --top 10     # 顯示前 10 個推薦
+  python3 scripts/recommend_topics.py                     # 輸出推薦清單
+  python3 scripts/recommend_topics.py --json              # JSON 格式輸出
+  python3 scripts/recommend_topics.py --top 10            # 顯示前 10 個推薦
+  python3 scripts/recommend_topics.py --source reports    # 強制解析報告表格
 """
 
 import argparse
@@ -23,6 +26,8 @@ from datetime import datetime
 from collections import defaultdict
 from typing import Optional
 
+from ingredient_trends import TrendStore, compute_signals, DEFAULT_WINDOW
+
 
 # 路徑配置
 PROJECT_ROOT = Path(__file__).parent.parent
@@ -52,6 +57,19 @@ MARKET_FLAGS = {
     "jp_foshu": "🇯🇵",
 }
 
+# 趨勢儲存的市場代碼
+MARKET_LABELS = {
+    "us": "🇺🇸 US",
+    "ca": "🇨🇦 CA",
+    "kr": "🇰🇷 KR",
+    "jp": "🇯🇵 JP",
+    "tw": "🇹🇼 TW",
+}
+
+# 趨勢推薦門檻
+TREND_POOL = 50          # 只考慮最新一期前 N 名
+MIN_GROWTH = 0.2         # 產品數成長率門檻
+
 
 def load_existing_topics() -> set:
     """載入現有追蹤主題的關鍵詞"""
@@ -124,13 +142,44 @@ def get_latest_reports() -> tuple[Optional[dict], Optional[dict]]:
     return current, previous
 
 
+def is_tracked(ingredient_lower: str, existing_keywords: set) -> bool:
+    """成分是否已被現有主題追蹤（含別名比對）"""
+    for kw in existing_keywords:
+        if kw in ingredient_lower or ingredient_lower in kw:
+            return True
+
+        # 檢查別名
+        for canonical, aliases in INGREDIENT_ALIASES.items():
+            if kw == canonical or kw in [a.lower() for a in aliases]:
+                if ingredient_lower == canonical or ingredient_lower in [a.lower() for a in aliases]:
+                    return True
+    return False
+
+
+def suggest_keywords(ingredient: str) -> dict:
+    """產生建議關鍵詞"""
+    ingredient_lower = ingredient.lower()
+    suggested_keywords = {
+        "exact": [ingredient],
+        "fuzzy": [],
+    }
+
+    # 加入已知別名
+    for canonical, aliases in INGREDIENT_ALIASES.items():
+        if ingredient_lower == canonical or ingredient_lower in [a.lower() for a in aliases]:
+            suggested_keywords["exact"].extend([canonical] + aliases)
+            break
+
+    return suggested_keywords
+
+
 def calculate_recommendations(
     current: dict,
     previous: Optional[dict],
     existing_keywords: set,
     top_n: int = 5
 ) -> list[dict]:
-    """計算推薦主題"""
+    """計算推薦主題（報告表格模式）"""
     recommendations = []
 
     # 建立上期排名對照
@@ -145,20 +194,7 @@ def calculate_recommendations(
         ingredient_lower = ingredient.lower()
 
         # 跳過已追蹤的成分
-        is_tracked = False
-        for kw in existing_keywords:
-            if kw in ingredient_lower or ingredient_lower in kw:
-                is_tracked = True
-                break
-
-            # 檢查別名
-            for canonical, aliases in INGREDIENT_ALIASES.items():
-                if kw == canonical or kw in [a.lower() for a in aliases]:
-                    if ingredient_lower == canonical or ingredient_lower in [a.lower() for a in aliases]:
-                        is_tracked = True
-                        break
-
-        if is_tracked:
+        if is_tracked(ingredient_lower, existing_keywords):
             continue
 
         # 計算推薦原因
@@ -183,25 +219,13 @@ def calculate_recommendations(
             reasons.append(f"跨國熱門 ({market_count}市場)")
 
         if reasons:
-            # 產生建議關鍵詞
-            suggested_keywords = {
-                "exact": [ingredient],
-                "fuzzy": [],
-            }
-
-            # 加入已知別名
-            for canonical, aliases in INGREDIENT_ALIASES.items():
-                if ingredient_lower == canonical or ingredient_lower in [a.lower() for a in aliases]:
-                    suggested_keywords["exact"].extend([canonical] + aliases)
-                    break
-
             recommendations.append({
                 "ingredient": ingredient,
                 "rank": item["rank"],
                 "reasons": reasons,
                 "rank_change": rank_change,
                 "markets": markets,
-                "suggested_keywords": suggested_keywords,
+                "suggested_keywords": suggest_keywords(ingredient),
             })
 
     # 排序：優先成長趨勢，其次跨國熱門
@@ -210,32 +234,111 @@ def calculate_recommendations(
     return recommendations[:top_n]
 
 
+def calculate_trend_recommendations(
+    signals: list[dict],
+    existing_keywords: set,
+    top_n: int = 5,
+    pool: int = TREND_POOL,
+) -> list[dict]:
+    """計算推薦主題（趨勢儲存模式）
+
+    signals 為 ingredient_trends.compute_signals() 的結果，排名涵蓋
+    上期所有成分，不受報告 Top 20 截斷影響。
+    """
+    recommendations = []
+
+    for item in signals:
+        if item["rank"] > pool:
+            break
+
+        ingredient = item["ingredient"]
+        if is_tracked(ingredient.lower(), existing_keywords):
+            continue
+
+        reasons = []
+        rank_change = item["prev_rank"] - item["rank"] if item["prev_rank"] else 0
+
+        # 成長趨勢
+        if rank_change >= 5:
+            reasons.append(f"成長趨勢 (+{rank_change}位)")
+        if item["prev_count"] and item["growth"] >= MIN_GROWTH:
+            reasons.append(f"產品數成長 (+{item['growth']:.0%})")
+            if item["acceleration"] > 0:
+                reasons.append("加速成長")
+
+        # 新進榜（先前各期皆未出現）
+        if item["new_entrant"]:
+            reasons.append("新進榜")
+
+        # 跨國熱門
+        market_count = len(item["markets"])
+        if market_count >= 3:
+            reasons.append(f"跨國熱門 ({market_count}市場)")
+
+        if reasons:
+            recommendations.append({
+                "ingredient": ingredient,
+                "rank": item["rank"],
+                "reasons": reasons,
+                "rank_change": rank_change,
+                "markets": ", ".join(MARKET_LABELS.get(m, m) for m in item["markets"]),
+                "count": item["count"],
+                "growth": item["growth"],
+                "acceleration": item["acceleration"],
+                "momentum": item["momentum"],
+                "suggested_keywords": suggest_keywords(ingredient),
+            })
+
+    # 排序：優先成長趨勢，其次推薦原因數、動能
+    recommendations.sort(key=lambda x: (-x["rank_change"], -len(x["reasons"]), -x["momentum"]))
+
+    return recommendations[:top_n]
+
+
 def main():
     parser = argparse.ArgumentParser(description="主題推薦腳本")
     parser.add_argument("--json", action="store_true", help="JSON 格式輸出")
     parser.add_argument("--top", type=int, default=5, help="顯示前 N 個推薦")
+    parser.add_argument("--source", choices=["auto", "store", "reports"], default="auto",
+                        help="資料來源：趨勢儲存或報告表格（auto：儲存達兩期時使用儲存）")
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW, help="動能平均期數")
     args = parser.parse_args()
 
     # 載入現有主題
     existing_keywords = load_existing_topics()
 
-    # 取得報告
-    current, previous = get_latest_reports()
+    store = TrendStore.load() if args.source != "reports" else TrendStore()
+    use_store = len(store.periods) >= 2 or (args.source == "store" and store.periods)
 
-    if not current:
-        print("❌ 找不到 ingredient_radar 報告")
-        return
+    if use_store:
+        signals = compute_signals(store, window=args.window)
+        recommendations = calculate_trend_recommendations(signals, existing_keywords, args.top)
+        current = {"period": store.periods[-1]}
+        previous = {"period": store.periods[-2]} if len(store.periods) >= 2 else None
+    else:
+        if args.source == "store":
+            print("❌ 趨勢儲存沒有資料，請先執行 generate_ingredient_radar.py")
+            return
 
-    # 計算推薦
-    recommendations = calculate_recommendations(
-        current, previous, existing_keywords, args.top
-    )
+        # 取得報告
+        current, previous = get_latest_reports()
+
+        if not current:
+            print("❌ 找不到 ingredient_radar 報告")
+            return
+
+        # 計算推薦
+        recommendations = calculate_recommendations(
+            current, previous, existing_keywords, args.top
+        )
 
     if args.json:
         output = {
             "generated_at": datetime.now().isoformat(),
+            "source": "store" if use_store else "reports",
             "current_period": current.get("period", ""),
             "previous_period": previous.get("period", "") if previous else None,
+            "periods": store.periods if use_store else None,
             "recommendations": recommendations,
         }
         print(json.dumps(output, ensure_ascii=False, indent=2))
@@ -244,6 +347,8 @@ def main():
         print("📊 推薦新增追蹤主題")
         print("=" * 60)
         print(f"分析期間: {current.get('period', 'N/A')}")
+        if use_store:
+            print(f"趨勢資料: {len(store.periods)} 期 ({store.periods[0]} ~ {store.periods[-1]})")
         print(f"已追蹤主題關鍵詞: {len(existing_keywords)} 個")
         print()
 
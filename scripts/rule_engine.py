@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""
+關鍵字規則編譯器
+
+各 Layer 萃取腳本以規則表推斷 category / product_form：
+
+    CATEGORY_RULES = [(["乳酸菌", "ビフィズス菌"], "probiotics"), ...]
+
+原本逐條規則、逐個關鍵字做子字串比對。KeywordRules 將整張規則表
+編譯為單一正規表示式（依關鍵字字首樹組成，同位置優先取最長關鍵字），
+每個欄位只以 findall 掃描一次；再以「關鍵字 → 其所含關鍵字所屬規則」
+的對照補回被較長關鍵字涵蓋的命中，並對部分重疊的關鍵字補做子字串
+比對，結果與逐條比對完全相同。first() / any() 命中即停止；關鍵字少於
+LINEAR_SCAN_LIMIT 時 first() / any() / matches() 改以攤平後的關鍵字清單
+逐一比對（此時比正規表示式快）：
+
+- classify()：命中 0 個分類 → default，1 個 → 該分類，多個 → multi
+- first()：依規則表順序，第一條命中的規則
+- any()：是否命中任一關鍵字
+
+比對區分大小寫；需不分大小寫的 Layer 沿用原本先 .lower() 的做法。
+
+KeywordDictionaries 將多張規則表（如嚴重程度、藥物類別、研究類型）
+合併編譯，一次掃描即取得每張表命中的所有標籤（依規則表順序）。
+
+用法：
+    from rule_engine import KeywordRules
+
+    CATEGORY_MATCHER = KeywordRules(CATEGORY_RULES)
+    CATEGORY_MATCHER.classify(text)               # "probiotics" / "specialty" / "other"
+
+    TAGGER = KeywordDictionaries({"severity": SEVERITY_RULES, "drug_class": DRUG_RULES})
+    TAGGER.tag(text)      # {"severity": ["major"], "drug_class": ["statin", "thyroid"]}
+    TAGGER.first(text)    # {"severity": "major", "drug_class": "statin"}
+
+  python3 scripts/rule_engine.py --benchmark            # 各 Layer 以合成樣本比較
+  python3 scripts/rule_engine.py --benchmark kr_hff     # 有 raw/latest.jsonl 時以實際資料比較
+"""
+
+import argparse
+import importlib
+import json
+import os
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+
+# first() / any() 在關鍵字少於此數時改為逐一比對
+LINEAR_SCAN_LIMIT = 32
+
+
+class KeywordRules:
+    """編譯後的關鍵字規則表"""
+
+    def __init__(self, rules: list):
+        self.labels = [label for _, label in rules]
+
+        owners = {}  # 關鍵字 → 規則序號
+        for index, (keywords, _) in enumerate(rules):
+            for keyword in keywords:
+                if keyword:
+                    owners.setdefault(keyword, set()).add(index)
+
+        # 命中某關鍵字即表示其所含的其他關鍵字也出現，預先併入其規則
+        self._rules_of = {}
+        for keyword in owners:
+            indices = set()
+            for other, other_indices in owners.items():
+                if other in keyword:
+                    indices |= other_indices
+            self._rules_of[keyword] = indices
+        self._labels_of = {
+            keyword: frozenset(self.labels[i] for i in indices) for keyword, indices in self._rules_of.items()
+        }
+        self._first_of = {keyword: min(indices) for keyword, indices in self._rules_of.items()}
+
+        # 關鍵字間有部分重疊（A 的字尾是 B 的字首）時，不重疊的掃描會在命中 A 後
+        # 跳過 B 的起點；命中 A 時再以子字串比對確認這些 B
+        self._overlaps = {}
+        for keyword in owners:
+            followers = [other for other in owners if _partial_overlap(keyword, other)]
+            if followers:
+                self._overlaps[keyword] = followers
+        self._findall = re.compile(_trie_pattern(owners)).findall if owners else None
+
+        # first() / any() 命中即停止；關鍵字少時逐一子字串比對比正規表示式快（matches() 亦同）
+        self._ordered = [(keyword, label) for keywords, label in rules for keyword in keywords if keyword]
+        self._linear = len(self._ordered) < LINEAR_SCAN_LIMIT
+        # matches() 逐一比對時，略過包含同規則較短關鍵字者（較短者必然也命中）
+        self._owners = [
+            (keyword, indices) for keyword, indices in owners.items()
+            if not self._linear or not indices <= set().union(
+                *(other_indices for other, other_indices in owners.items() if other != keyword and other in keyword)
+            )
+        ]
+
+    def _found(self, text: str) -> list:
+        """欄位中出現的關鍵字（可重複）"""
+        if not text or self._findall is None:
+            return []
+        found = self._findall(text)
+        if found and self._overlaps:
+            # 每個候選關鍵字只比對一次（已由掃描命中者不再比對）
+            unique = set(found)
+            candidates = set()
+            for keyword in unique:
+                followers = self._overlaps.get(keyword)
+                if followers:
+                    candidates.update(followers)
+            candidates -= unique
+            found = list(unique)
+            found.extend(other for other in candidates if other in text)
+        return found
+
+    def matches(self, text: str) -> set:
+        """命中的規則序號"""
+        found = set()
+        if self._linear:
+            if text:
+                for keyword, indices in self._owners:
+                    if not indices <= found and keyword in text:
+                        found |= indices
+            return found
+        for keyword in set(self._found(text)):
+            found |= self._rules_of[keyword]
+        return found
+
+    def classify(self, text: str, default: str = "other", multi: str = "specialty") -> str:
+        """命中單一分類時回傳該分類，多個分類時回傳 multi"""
+        found = self._found(text)
+        if not found:
+            return default
+        labels = self._labels_of[found[0]]
+        for keyword in found:
+            if labels is not self._labels_of[keyword]:
+                labels = labels | self._labels_of[keyword]
+        if len(labels) == 1:
+            return next(iter(labels))
+        return multi
+
+    def first(self, text: str, default: str = "other") -> str:
+        """依規則表順序取第一條命中的規則"""
+        if self._linear:
+            if text:
+                for keyword, label in self._ordered:
+                    if keyword in text:
+                        return label
+            return default
+        found = self._found(text)
+        if not found:
+            return default
+        return self.labels[min(map(self._first_of.__getitem__, found))]
+
+    def any(self, text: str) -> bool:
+        """是否命中任一關鍵字"""
+        if self._linear:
+            return bool(text) and any(keyword in text for keyword, _ in self._ordered)
+        return bool(self._found(text))
+
+
+class KeywordDictionaries:
+    """多張規則表合併編譯，一次掃描取得各表的命中標籤"""
+
+    def __init__(self, dictionaries: dict):
+        combined = []
+        self._spans = {}
+        for name, rules in dictionaries.items():
+            start = len(combined)
+            combined.extend(rules)
+            self._spans[name] = (start, len(combined))
+        self._rules = KeywordRules(combined)
+        self._name_of = [name for name, (start, end) in self._spans.items() for _ in range(start, end)]
+
+    def tag(self, text: str) -> dict:
+        """各規則表命中的所有標籤（依規則表順序，未命中為空 list）"""
+        tags = {name: [] for name in self._spans}
+        for index in sorted(self._rules.matches(text)):
+            labels = tags[self._name_of[index]]
+            label = self._rules.labels[index]
+            if label not in labels:
+                labels.append(label)
+        return tags
+
+    def first(self, text: str, default=None) -> dict:
+        """各規則表第一條命中的規則（與 KeywordRules.first 相同），未命中為 default"""
+        return {name: labels[0] if labels else default for name, labels in self.tag(text).items()}
+
+
+def _partial_overlap(a: str, b: str) -> bool:
+    """a 的某個字尾是 b 的字首，且 b 延伸超出 a"""
+    for i in range(1, len(a)):
+        tail = a[i:]
+        if len(tail) < len(b) and b.startswith(tail):
+            return True
+    return False
+
+
+def _trie_pattern(keywords) -> str:
+    """將關鍵字組成字首樹形式的正規表示式（同位置較長者優先）"""
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        if "" in node:
+            # 關鍵字在此結束：先嘗試延伸，再接受較短者
+            return f"(?:{'|'.join(branches)}|)"
+        if len(branches) == 1:
+            return branches[0]
+        return f"(?:{'|'.join(branches)})"
+
+    return build(trie)
+
+
+# ==========================================================
+# 逐條比對（原本的實作，供基準比較與驗證）
+# ==========================================================
+
+def naive_classify(rules: list, text: str, default: str = "other", multi: str = "specialty") -> str:
+    if not text:
+        return default
+    matched = set()
+    for keywords, label in rules:
+        for keyword in keywords:
+            if keyword in text:
+                matched.add(label)
+                break
+    if not matched:
+        return default
+    if len(matched) == 1:
+        return matched.pop()
+    return multi
+
+
+def naive_first(rules: list, text: str, default: str = "other") -> str:
+    if not text:
+        return default
+    for keywords, label in rules:
+        for keyword in keywords:
+            if keyword in text:
+                return label
+    return default
+
+
+def naive_any(rules: list, text: str) -> bool:
+    return any(keyword in text for keywords, _ in rules for keyword in keywords)
+
+
+# ==========================================================
+# 基準比較
+# ==========================================================
+
+PROJECT_ROOT = Path(__file__).parent.parent
+EXTRACTOR_DIR = PROJECT_ROOT / "docs" / "Extractor"
+
+
+def _kr_item(rec):
+    return rec.get("item", rec)
+
+
+def _dsld_hint_text(rec):
+    module = importlib.import_module("extract_us_dsld")
+    return module.ingredient_hint_text(rec.get("allIngredients", []))
+
+
+def _dsld_form_text(rec):
+    state = rec.get("physicalState")
+    if isinstance(state, list):
+        state = state[0] if state else {}
+    return (state or {}).get("langualCodeDescription", "").lower() if isinstance(state, dict) else ""
+
+
+# Layer → [(名稱, 規則表屬性, 比對方式, 欄位取值函式)]
+BENCHMARK_LAYERS = {
+    "us_dsld": [
+        ("form", "FORM_RULES", "first", _dsld_form_text),
+        ("hints", "INGREDIENT_HINT_RULES", "any", _dsld_hint_text),
+    ],
+    "ca_lnhpd": [
+        ("category", "CATEGORY_RULES", "classify", lambda r: str(r.get("product_name") or "").lower()),
+        ("form", "FORM_RULES", "first", lambda r: str(r.get("dosage_form") or "").lower()),
+    ],
+    "kr_hff": [
+        ("category", "CATEGORY_RULES", "classify", lambda r: str(_kr_item(r).get("MAIN_FNCTN") or "").strip()),
+        ("form", "FORM_RULES", "first", lambda r: str(_kr_item(r).get("SUNGSANG") or "").strip()),
+    ],
+    "jp_foshu": [
+        ("category", "CATEGORY_RULES", "classify", lambda r: str(r.get("functional_ingredient") or "").strip()),
+        ("form", "FORM_RULES", "first", lambda r: str(r.get("food_type") or "").strip()),
+    ],
+    "jp_fnfc": [
+        ("category", "CATEGORY_RULES", "classify", lambda r: str(r.get("機能性関与成分名") or "").strip()),
+    ],
+    "tw_hf": [
+        ("category", "CATEGORY_RULES", "classify", lambda r: str(r.get("保健功效") or "").strip()),
+        ("form", "FORM_RULES", "first", lambda r: str(r.get("中文品名") or "").strip()),
+    ],
+}
+
+NAIVE = {"classify": naive_classify, "first": naive_first, "any": naive_any}
+
+
+def synthetic_texts(rules: list, count: int, seed: int = 0) -> list[str]:
+    """以規則關鍵字與填充字元組成樣本（含 0–3 個關鍵字）"""
+    rng = random.Random(seed)
+    keywords = [kw for kws, _ in rules for kw in kws]
+    filler = "abcdefghij 成分抽出物配合エキス함유추출물 "
+    texts = []
+    for _ in range(count):
+        parts = ["".join(rng.choice(filler) for _ in range(rng.randint(5, 60)))]
+        for _ in range(rng.randint(0, 3)):
+            parts.append(rng.choice(keywords))
+            parts.append("".join(rng.choice(filler) for _ in range(rng.randint(0, 20))))
+        texts.append("".join(parts))
+    return texts
+
+
+def sample_records(layer: str, limit: int) -> list:
+    """讀取 raw/latest.jsonl 的前 limit 筆紀錄（不存在時回傳空清單）"""
+    path = EXTRACTOR_DIR / layer / "raw" / "latest.jsonl"
+    if not path.exists():
+        return []
+    from jsonl_io import open_jsonl
+
+    records = []
+    with open_jsonl(path, errors="replace") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+            if len(records) >= limit:
+                break
+    return records
+
+
+def benchmark_layer(layer: str, limit: int, rounds: int):
+    module = importlib.import_module(f"extract_{layer}")
+    records = sample_records(layer, limit)
+    source = f"raw/latest.jsonl {len(records)} 筆" if records else f"合成樣本 {limit} 筆"
+    print(f"▶ {layer}（{source}）")
+
+    for name, attr, mode, field in BENCHMARK_LAYERS[layer]:
+        rules = getattr(module, attr)
+        texts = [field(r) for r in records] if records else synthetic_texts(rules, limit)
+        compiled = KeywordRules(rules)
+        naive_fn = NAIVE[mode]
+        compiled_fn = getattr(compiled, mode)
+
+        mismatches = sum(1 for t in texts if naive_fn(rules, t) != compiled_fn(t))
+
+        def timed(fn):
+            start = time.perf_counter()
+            for _ in range(rounds):
+                for text in texts:
+                    fn(text)
+            return time.perf_counter() - start
+
+        naive_time = timed(lambda t: naive_fn(rules, t))
+        compiled_time = timed(compiled_fn)
+        total = len(texts) * rounds
+        keywords = sum(len(kws) for kws, _ in rules)
+        print(f"  {name:<8}（{len(rules)} 條規則、{keywords} 個關鍵字）")
+        print(f"    逐條比對：{naive_time:.3f}s（{total / naive_time:,.0f} 筆/秒）")
+        print(f"    編譯規則：{compiled_time:.3f}s（{total / compiled_time:,.0f} 筆/秒）")
+        print(f"    加速：{naive_time / compiled_time:.1f}x，結果不一致：{mismatches}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="關鍵字規則編譯器")
+    parser.add_argument("--benchmark", nargs="*", metavar="LAYER",
+                        help=f"與逐條比對比較效能（預設全部：{', '.join(BENCHMARK_LAYERS)}）")
+    parser.add_argument("--limit", type=int, default=20000, help="每個 Layer 的樣本數")
+    parser.add_argument("--rounds", type=int, default=3, help="重複輪數")
+    args = parser.parse_args()
+
+    if args.benchmark is None:
+        parser.print_help()
+        return
+
+    layers = args.benchmark or list(BENCHMARK_LAYERS)
+    for layer in layers:
+        if layer not in BENCHMARK_LAYERS:
+            print(f"❌ 未知 Layer：{layer}", file=sys.stderr)
+            sys.exit(1)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    for layer in layers:
+        benchmark_layer(layer, args.limit, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
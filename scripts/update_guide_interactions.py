@@ -6,13 +6,15 @@
   python3 scripts/update_guide_interactions.py              # 更新所有主題
   python3 scripts/update_guide_interactions.py --topic fish-oil  # 更新特定主題
   python3 scripts/update_guide_interactions.py --dry-run    # 僅顯示，不寫入
+
+交互文獻取自 scripts/interaction_index.py 的索引（.cache/interaction_index/）。
 """
 
 import argparse
 import re
-import yaml
 from pathlib import Path
-from collections import defaultdict
+
+from interaction_index import InteractionIndex, abstract_excerpt
 
 PROJECT_ROOT = Path(__file__).parent.parent
 DHI_DIR = PROJECT_ROOT / "docs" / "Extractor" / "dhi"
@@ -20,6 +22,13 @@ DFI_DIR = PROJECT_ROOT / "docs" / "Extractor" / "dfi"
 DDI_DIR = PROJECT_ROOT / "docs" / "Extractor" / "ddi"
 GUIDES_DIR = PROJECT_ROOT / "docs" / "reports"
 
+# 交互文獻索引（同一品類在一次執行中只列目錄一次，未變動的檔案不重新解析）
+INDEXES = {
+    "dhi": InteractionIndex("dhi", DHI_DIR),
+    "dfi": InteractionIndex("dfi", DFI_DIR),
+    "ddi": InteractionIndex("ddi", DDI_DIR),
+}
+
 # 主題與交互類別對照
 TOPIC_INTERACTION_MAP = {
     "fish-oil": {
@@ -145,46 +154,30 @@ TOPIC_INTERACTION_MAP = {
 }
 
 
-def load_interaction_files(base_dir: Path, categories: list) -> list:
-    """載入指定類別的交互作用檔案"""
+def load_interaction_files(index: InteractionIndex, categories: list) -> list:
+    """自交互索引取得指定類別的交互作用（略過 REVIEW_NEEDED 與無標題者）"""
     interactions = []
 
     for category in categories:
-        category_dir = base_dir / category
-        if not category_dir.exists():
-            continue
-
-        for md_file in category_dir.glob("*.md"):
-            content = md_file.read_text(encoding="utf-8")
-
+        for entry in index.entries(category):
             # 跳過 REVIEW_NEEDED
-            if "[REVIEW_NEEDED]" in content:
+            if entry["review_needed"]:
                 continue
 
-            # 解析 frontmatter
-            interaction = {"file": str(md_file), "pmid": md_file.stem}
-
-            clean_content = content.replace("[REVIEW_NEEDED]\n\n", "")
-            if clean_content.startswith("---"):
-                parts = clean_content.split("---", 2)
-                if len(parts) >= 3:
-                    try:
-                        fm = yaml.safe_load(parts[1])
-                        if fm:
-                            interaction["title"] = fm.get("title", "")
-                            interaction["severity"] = fm.get("severity", "unknown")
-                            interaction["evidence_level"] = fm.get("evidence_level", 5)
-                            interaction["source_url"] = fm.get("source_url", "")
-                            interaction["category"] = fm.get("category", category)
-                    except yaml.YAMLError:
-                        pass
-
-            # 提取摘要
-            abstract_match = re.search(r"## 摘要\s*\n([\s\S]*?)(?=\n---|\n##|\Z)", content)
-            if abstract_match:
-                interaction["abstract"] = abstract_match.group(1).strip()[:500]
-            else:
-                interaction["abstract"] = ""
+            interaction = {
+                "file": str(index.base_dir / category / entry["filename"]),
+                "pmid": entry["pmid"],
+            }
+
+            fm = entry["frontmatter"]
+            if fm is not None:
+                interaction["title"] = fm.get("title", "")
+                interaction["severity"] = fm.get("severity", "unknown")
+                interaction["evidence_level"] = fm.get("evidence_level", 5)
+                interaction["source_url"] = fm.get("source_url", "")
+                interaction["category"] = fm.get("category", category)
+
+            interaction["abstract"] = abstract_excerpt(entry["abstract"])
 
             if interaction.get("title"):
                 interactions.append(interaction)
@@ -216,9 +209,9 @@ def generate_interaction_section(topic_id: str, topic_config: dict) -> str:
     topic_name = topic_config["name"]
 
     # 載入各類交互資料
-    dhi_data = load_interaction_files(DHI_DIR, topic_config.get("dhi", []))
-    dfi_data = load_interaction_files(DFI_DIR, topic_config.get("dfi", []))
-    ddi_data = load_interaction_files(DDI_DIR, topic_config.get("ddi", []))
+    dhi_data = load_interaction_files(INDEXES["dhi"], topic_config.get("dhi", []))
+    dfi_data = load_interaction_files(INDEXES["dfi"], topic_config.get("dfi", []))
+    ddi_data = load_interaction_files(INDEXES["ddi"], topic_config.get("ddi", []))
 
     all_interactions = dhi_data + dfi_data + ddi_data
 
@@ -338,6 +331,9 @@ def main():
         if update_guide(topic_id, args.dry_run):
             updated += 1
 
+    for index in INDEXES.values():
+        index.save()
+
     print("\n" + "=" * 50)
     print(f"✅ 完成：更新 {updated}/{len(topics)} 個指南")
     print("=" * 50)
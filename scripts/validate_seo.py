@@ -12,6 +12,12 @@ SEO 驗證腳本
     python3 scripts/validate_seo.py
     python3 scripts/validate_seo.py --verbose
     python3 scripts/validate_seo.py --fix  # 嘗試自動修復（未來功能）
+    python3 scripts/validate_seo.py --jobs 8  # 多程序驗證（冷啟動）
+    python3 scripts/validate_seo.py --json    # 機器可讀輸出（供 CI 使用）
+    python3 scripts/validate_seo.py --no-cache
+
+驗證結果快取於 .cache/validate_seo.json，以檔案內容雜湊、seo/config.yaml
+與本腳本的雜湊為鍵；未變動的頁面直接沿用上次結果，不再重新解析 frontmatter。
 """
 
 import os
@@ -19,7 +25,10 @@ import re
 import sys
 import json
 import yaml
+import hashlib
 import argparse
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from pathlib import Path
 from dataclasses import dataclass, field
 from typing import Optional
@@ -29,6 +38,10 @@ from typing import Optional
 PROJECT_ROOT = Path(__file__).parent.parent
 REPORTS_DIR = PROJECT_ROOT / "docs" / "reports"
 SEO_CONFIG_PATH = PROJECT_ROOT / "seo" / "config.yaml"
+CACHE_PATH = PROJECT_ROOT / ".cache" / "validate_seo.json"
+
+# 快取格式變更時遞增（驗證規則變更由 rules_digest() 的腳本雜湊自動偵測）
+CACHE_VERSION = 1
 
 
 @dataclass
@@ -39,6 +52,16 @@ class ValidationResult:
     passed: bool = True
     errors: list = field(default_factory=list)
     warnings: list = field(default_factory=list)
+    cached: bool = False
+
+    def to_dict(self) -> dict:
+        return {
+            "file": str(self.file_path),
+            "passed": self.passed,
+            "errors": self.errors,
+            "warnings": self.warnings,
+            "cached": self.cached,
+        }
 
 
 @dataclass
@@ -178,8 +201,58 @@ def validate_file(file_path: Path, verbose: bool = False) -> ValidationResult:
     return result
 
 
-def validate_all(verbose: bool = False) -> ValidationSummary:
-    """驗證所有報告檔案"""
+def file_digest(file_path: Path) -> str:
+    """計算檔案內容的 SHA-256"""
+    try:
+        return hashlib.sha256(file_path.read_bytes()).hexdigest()
+    except OSError:
+        return ""
+
+
+def rules_digest() -> str:
+    """SEO 設定與驗證腳本本身的雜湊；任一變動即使快取失效"""
+    digest = hashlib.sha256()
+    digest.update(file_digest(SEO_CONFIG_PATH).encode("ascii"))
+    digest.update(Path(__file__).read_bytes())
+    return digest.hexdigest()
+
+
+def load_cache(config_hash: str) -> dict:
+    """載入驗證快取；版本、SEO 設定或驗證腳本不符時回傳空快取"""
+    try:
+        data = json.loads(CACHE_PATH.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+    if data.get("version") != CACHE_VERSION or data.get("config_hash") != config_hash:
+        return {}
+    return data.get("entries", {})
+
+
+def save_cache(config_hash: str, entries: dict):
+    """寫入驗證快取（先寫暫存檔再替換，避免中斷時留下半份檔案）"""
+    CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = CACHE_PATH.with_suffix(".tmp")
+    tmp_path.write_text(
+        json.dumps(
+            {"version": CACHE_VERSION, "config_hash": config_hash, "entries": entries},
+            ensure_ascii=False,
+        ),
+        encoding="utf-8",
+    )
+    os.replace(tmp_path, CACHE_PATH)
+
+
+def validate_all(
+    verbose: bool = False, use_cache: bool = True, jobs: int = 1
+) -> ValidationSummary:
+    """驗證所有報告檔案
+
+    Args:
+        verbose: 是否輸出詳細資訊
+        use_cache: 是否沿用內容未變動頁面的上次驗證結果
+        jobs: 驗證程序數（>1 時使用 ProcessPoolExecutor）
+    """
     summary = ValidationSummary()
 
     # 收集所有 .md 檔案
@@ -194,10 +267,51 @@ def validate_all(verbose: bool = False) -> ValidationSummary:
 
     summary.total = len(report_files)
 
+    config_hash = rules_digest()
+    cache = load_cache(config_hash) if use_cache else {}
+    new_cache = {}
+
+    results = {}
+    pending = []
     for file_path in sorted(report_files):
-        result = validate_file(file_path, verbose)
+        rel_path = str(file_path.relative_to(PROJECT_ROOT))
+        digest = file_digest(file_path)
+        entry = cache.get(rel_path)
+
+        if entry and entry.get("hash") == digest:
+            results[file_path] = ValidationResult(
+                file_path=file_path,
+                passed=entry["passed"],
+                errors=entry["errors"],
+                warnings=entry["warnings"],
+                cached=True,
+            )
+        else:
+            pending.append(file_path)
+        new_cache[rel_path] = {"hash": digest}
+
+    if jobs > 1 and len(pending) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            chunksize = max(1, len(pending) // (jobs * 4))
+            for file_path, result in zip(
+                pending, executor.map(
+                    validate_file, pending, repeat(verbose, len(pending)), chunksize=chunksize
+                )
+            ):
+                results[file_path] = result
+    else:
+        for file_path in pending:
+            results[file_path] = validate_file(file_path, verbose)
+
+    for file_path in sorted(report_files):
+        result = results[file_path]
         summary.results.append(result)
 
+        rel_path = str(file_path.relative_to(PROJECT_ROOT))
+        new_cache[rel_path].update(
+            passed=result.passed, errors=result.errors, warnings=result.warnings
+        )
+
         if not result.passed:
             summary.failed += 1
         elif result.warnings:
@@ -205,9 +319,37 @@ def validate_all(verbose: bool = False) -> ValidationSummary:
         else:
             summary.passed += 1
 
+    if use_cache:
+        save_cache(config_hash, new_cache)
+
     return summary
 
 
+def summary_to_json(summary: ValidationSummary) -> str:
+    """輸出機器可讀的驗證結果（changed 為本次實際重新驗證的頁面）"""
+    results = []
+    for result in summary.results:
+        item = result.to_dict()
+        item["file"] = str(result.file_path.relative_to(PROJECT_ROOT))
+        results.append(item)
+
+    return json.dumps(
+        {
+            "summary": {
+                "total": summary.total,
+                "passed": summary.passed,
+                "warnings": summary.warnings,
+                "failed": summary.failed,
+                "revalidated": sum(1 for r in summary.results if not r.cached),
+            },
+            "changed": [r["file"] for r in results if not r["cached"]],
+            "results": results,
+        },
+        ensure_ascii=False,
+        indent=2,
+    )
+
+
 def print_summary(summary: ValidationSummary, verbose: bool = False):
     """輸出驗證摘要"""
     print("\n" + "=" * 60)
@@ -258,6 +400,13 @@ def main():
         "--fix", action="store_true", help="嘗試自動修復問題（未來功能）"
     )
     parser.add_argument("--file", type=str, help="驗證特定檔案")
+    parser.add_argument(
+        "--jobs", "-j", type=int, default=1, help="平行驗證程序數（預設 1）"
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="忽略快取，重新驗證所有頁面"
+    )
+    parser.add_argument("--json", action="store_true", help="以 JSON 格式輸出結果")
 
     args = parser.parse_args()
 
@@ -289,8 +438,13 @@ def main():
         sys.exit(0 if result.passed else 1)
 
     # 驗證所有檔案
-    summary = validate_all(args.verbose)
-    success = print_summary(summary, args.verbose)
+    summary = validate_all(args.verbose, use_cache=not args.no_cache, jobs=args.jobs)
+
+    if args.json:
+        print(summary_to_json(summary))
+        success = summary.failed == 0
+    else:
+        success = print_summary(summary, args.verbose)
 
     sys.exit(0 if success else 1)
 